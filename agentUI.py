@@ -1,51 +1,113 @@
 # agentUI.py
 """
 This is a frontend UI for the Insurance Approval Agent.input will be the claim ID and invokes the langgraph workflow
+The compiled workflow is a cached resource (built once per server, not on every rerun), results are cached per claim
+for the session, and the page is driven by workflow.stream: each agent's result renders as soon as its node
+finishes and the explanation appears token by token.
 """
 import streamlit as st
-from langgraph_workflow import build_graph
-
-# Build the workflow graph once
-workflow_graph = build_graph()
-workflow = workflow_graph.compile()
+from data_loader import get_data_version
+from instrumentation import claim_trace
+from langgraph_workflow import compile_workflow, STREAM_TOKENS
 
 # Set page configuration
 st.set_page_config(page_title="Insurance Approval Agent", layout="wide")
 
-# Main content
-st.title("🏥 Insurance Approval Agent")
-st.write("Submit a Claim ID to run through the multi-agent workflow (Validation → Eligibility → Policy → Fraud → Explanation).")
+NODE_LABELS = {
+    "validation_agent": "Validation",
+    "eligibility_agent": "Eligibility",
+    "policy_agent_node": "Policy",
+    "fraud_agent": "Fraud Detection",
+    "final_decision": "Final Decision",
+    "explanation_agent": "Explanation",
+    "rejection_explanation": "Explanation (templated)",
+}
 
-# Sidebar
-st.sidebar.header("⚙️ Settings")
-test_claim_id = st.sidebar.text_input("Enter Claim ID", value="C20003")
 
-if st.sidebar.button("Run Workflow"):
-    with st.spinner("Processing claim through all agents..."):
-        initial_state = {"claim_id": test_claim_id}
-        result = workflow.invoke(initial_state)
+# Build the workflow graph once per server process; Streamlit reruns reuse it
+@st.cache_resource(show_spinner="Building the workflow...")
+def get_workflow():
+    return compile_workflow()
 
-    # Final Results
-    st.success("✅ Workflow completed")
 
-    st.subheader("📌 Final Decision")
-    st.write(f"**Status:** {result.get('status', 'Unknown')}")
+def result_key(claim_id):
+    # results go stale when the underlying claims data is reloaded
+    return (claim_id, get_data_version())
 
+
+def make_sections():
+    """Placeholders in display order, filled in as the nodes finish"""
+    st.subheader("📌 Final Decision")
+    sections = {"status": st.empty()}
     st.subheader("📝 Human Explanation")
-    st.write(result.get("explanation", "No explanation available."))
+    sections["explanation"] = st.empty()
+    with st.expander("🔍 Validation Result", expanded=True):
+        sections["validation_result"] = st.empty()
+    with st.expander("🧾 Eligibility Result", expanded=True):
+        sections["eligibility_result"] = st.empty()
+    with st.expander("📑 Policy Evidence"):
+        sections["policy_response"] = st.empty()
+    with st.expander("🚨 Fraud Detection Result"):
+        sections["fraud_result"] = st.empty()
+    return sections
 
-    # Expanders for details
-    with st.expander("🔍 Validation Result"):
-        st.json(result.get("validation_result", {}))
 
-    with st.expander("🧾 Eligibility Result"):
-        st.json(result.get("eligibility_result", {}))
+def render(sections, result):
+    """Render whatever parts of the result are available so far"""
+    if "status" in result:
+        sections["status"].write(f"**Status:** {result['status']}")
+    if "explanation" in result:
+        sections["explanation"].write(result["explanation"])
+    if "validation_result" in result:
+        sections["validation_result"].json(result["validation_result"])
+    if "eligibility_result" in result:
+        sections["eligibility_result"].json(result["eligibility_result"])
+    if "policy_response" in result:
+        sections["policy_response"].write(result["policy_response"])
+    if "fraud_result" in result:
+        sections["fraud_result"].json(result["fraud_result"])
 
-    with st.expander("📑 Policy Evidence"):
-        st.write(result.get("policy_response", "No policy response"))
 
-    with st.expander("🚨 Fraud Detection Result"):
-        st.json(result.get("fraud_result", {}))
+def stream_claim(workflow, claim_id, sections, progress):
+    """Run the workflow for one claim, rendering each node's output as soon as it completes"""
+    result = {"claim_id": claim_id}
+    explanation = ""
+    config = {"configurable": {STREAM_TOKENS: True}}
+    with claim_trace(claim_id):
+        for mode, chunk in workflow.stream({"claim_id": claim_id}, config=config, stream_mode=["updates", "custom"]):
+            if mode == "custom":
+                explanation += chunk.get("token", "")
+                sections["explanation"].markdown(explanation + "▌")
+                continue
+            for node, update in chunk.items():
+                result.update(update or {})
+                progress.write(f"✔️ {NODE_LABELS.get(node, node)} done")
+            render(sections, result)
+    return result
+
+
+# Main content
+st.title("🏥 Insurance Approval Agent")
+st.write("Submit a Claim ID to run through the multi-agent workflow (Validation → Eligibility → Policy → Fraud → Explanation).")
+
+# Sidebar
+st.sidebar.header("⚙️ Settings")
+test_claim_id = st.sidebar.text_input("Enter Claim ID", value="C20003")
+rerun = st.sidebar.checkbox("Ignore cached result", value=False)
+
+results = st.session_state.setdefault("results", {})
+
+if st.sidebar.button("Run Workflow"):
+    key = result_key(test_claim_id)
+    if key in results and not rerun:
+        st.success("✅ Workflow completed (cached for this session)")
+        render(make_sections(), results[key])
+    else:
+        workflow = get_workflow()
+        progress = st.status("Processing claim through all agents...", expanded=True)
+        sections = make_sections()
+        results[key] = stream_claim(workflow, test_claim_id, sections, progress)
+        progress.update(label="✅ Workflow completed", state="complete", expanded=False)
 
 else:
     st.info("👈 Enter a Claim ID and click **Run Workflow** to begin.")
@@ -0,0 +1,249 @@
+# src/batch_runner.py
+"""
+Bulk claim adjudication: runs many claims through the compiled langgraph workflow with a bounded number of
+claims in flight, a timeout and retries per claim, and writes the outcomes in bulk to a CSV shaped like
+data/claim_decisions.csv (claim_id, patient_id, procedure_code, status, reason). Throughput is reported at the end.
+
+    python batch_runner.py --all --concurrency 16
+    python batch_runner.py --file pending_ids.txt --mode async --timeout 60 --retries 2
+    python batch_runner.py --claims C20001 C20003 --output data/batch_decisions.csv
+    python batch_runner.py --all --checkpoint     # rerun after a crash resumes each claim where it stopped
+
+In async mode the graph is built with async nodes, so every claim runs as a coroutine on one event loop and the
+LLM calls are awaited through the shared scheduler. Duplicate claim IDs in flight at the same time share one run.
+In thread mode a claim's timeout starts when a worker thread picks it up, not while it waits in the executor queue.
+A thread cannot be killed, so an attempt that times out keeps running: the retry waits on that same run (a new run
+would join it through the workflow's single-flight anyway) and only starts over once it has failed. The executor has
+--workers threads (default: concurrency x attempts), so threads stuck in hung calls don't starve the next claims.
+"""
+import argparse
+import asyncio
+import csv
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from claim_store import get_claim_store
+from data_loader import load_table
+from instrumentation import latency_summary, TRACE_PATH
+from checkpoints import get_checkpointer, open_async_checkpointer, WORKFLOW_CHECKPOINT_PATH
+from langgraph_workflow import compile_workflow, run_claim, arun_claim
+
+DECISION_COLUMNS = ["claim_id", "patient_id", "procedure_code", "status", "reason"]
+STATUS_ERROR = "Error"
+
+
+def decision_reason(result):
+    """Pick the reason for the decision from whichever agent settled it"""
+    validation = result.get("validation_result") or {}
+    if not validation.get("valid", False):
+        return validation.get("error")
+    fraud = result.get("fraud_result") or {}
+    if fraud.get("fraud_flag"):
+        return fraud.get("reason")
+    eligibility = result.get("eligibility_result") or {}
+    return eligibility.get("reason")
+
+
+def decision_row(claim_id, result=None, error=None):
+    claim = get_claim_store().get_claim(claim_id) or {}
+    if error is not None:
+        status, reason = STATUS_ERROR, error
+    else:
+        status, reason = result.get("status", "Unknown"), decision_reason(result)
+    return {
+        "claim_id": claim_id,
+        "patient_id": claim.get("patient_id"),
+        "procedure_code": claim.get("procedure_code"),
+        "status": status,
+        "reason": reason,
+    }
+
+
+class DecisionWriter:
+    """Buffers decision rows and appends them to the output CSV in bulk"""
+
+    def __init__(self, path, flush_every=500, append=False):
+        self.path = path
+        self.flush_every = flush_every
+        self._rows = []
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # append keeps the rows of an earlier (interrupted) run and only adds the header to a new file
+        if not (append and os.path.exists(path) and os.path.getsize(path)):
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                csv.DictWriter(f, fieldnames=DECISION_COLUMNS).writeheader()
+
+    def add(self, row):
+        self._rows.append(row)
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._rows:
+            return
+        with open(self.path, "a", newline="", encoding="utf-8") as f:
+            csv.DictWriter(f, fieldnames=DECISION_COLUMNS).writerows(self._rows)
+        self._rows = []
+
+
+async def _adjudicate(claim_id, run_once, semaphore, timeout, retries, retry_backoff):
+    """Run one claim with a timeout per attempt and exponential backoff between retries"""
+    async with semaphore:
+        last_error = None
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(retry_backoff * 2 ** (attempt - 1))
+            try:
+                result = await run_once(claim_id, timeout)
+                return decision_row(claim_id, result)
+            except asyncio.TimeoutError:
+                last_error = f"Timed out after {timeout}s (attempt {attempt + 1})"
+            except Exception as e:
+                last_error = f"{type(e).__name__}: {e}"
+        return decision_row(claim_id, error=last_error)
+
+
+async def run_batch_async(claim_ids, output, concurrency=8, mode="thread", timeout=120.0, retries=2,
+                          retry_backoff=1.0, workflow=None, checkpoint=None, writer=None, workers=None):
+    """
+    Adjudicate claim_ids with at most `concurrency` claims in flight; returns a throughput summary.
+    checkpoint is the path of a checkpoint file (see checkpoints.py): finished nodes are saved per claim and
+    claims checkpointed by an earlier run are resumed or reused instead of started over.
+    Pass a DecisionWriter to append to an output shared by several calls (output is then ignored).
+    workers sizes the thread pool in thread mode (default concurrency * (retries + 1)).
+    """
+    async_checkpointer = None
+    if workflow is None:
+        checkpointer = None
+        if checkpoint and mode == "async":
+            checkpointer = async_checkpointer = open_async_checkpointer(checkpoint)
+        elif checkpoint:
+            checkpointer = get_checkpointer(checkpoint)
+        workflow = compile_workflow(use_async=(mode == "async"), checkpointer=checkpointer)
+    semaphore = asyncio.Semaphore(concurrency)
+    writer = writer or DecisionWriter(output)
+    executor = None
+
+    if mode == "async":
+        async def run_once(claim_id, timeout):
+            return await asyncio.wait_for(arun_claim(workflow, claim_id), timeout=timeout)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers or concurrency * (retries + 1))
+        loop = asyncio.get_running_loop()
+        running = {}    # claim_id -> the attempt still running in a worker thread
+
+        async def run_once(claim_id, timeout):
+            future = running.get(claim_id)
+            if future is not None and future.done() and not future.cancelled() and future.exception() is None:
+                # the attempt that timed out has finished since: use its result instead of adjudicating again
+                running.pop(claim_id, None)
+                return future.result()
+            if future is None or future.done():
+                picked_up = asyncio.Event()
+
+                def work():
+                    loop.call_soon_threadsafe(picked_up.set)
+                    return run_claim(workflow, claim_id)
+                future = running[claim_id] = asyncio.wrap_future(executor.submit(work), loop=loop)
+                # time spent queued for a free worker does not count against the timeout
+                waiter = asyncio.ensure_future(picked_up.wait())
+                await asyncio.wait({waiter, future}, return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+            result = await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+            running.pop(claim_id, None)
+            return result
+
+    started = time.perf_counter()
+    statuses = Counter()
+    try:
+        tasks = [
+            asyncio.create_task(_adjudicate(claim_id, run_once, semaphore, timeout, retries, retry_backoff))
+            for claim_id in claim_ids
+        ]
+        for task in asyncio.as_completed(tasks):
+            row = await task
+            statuses[row["status"]] += 1
+            writer.add(row)
+    finally:
+        writer.flush()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if async_checkpointer is not None:
+            await async_checkpointer.conn.close()
+
+    elapsed = time.perf_counter() - started
+    total = sum(statuses.values())
+    return {
+        "claims": total,
+        "elapsed_seconds": round(elapsed, 3),
+        "claims_per_second": round(total / elapsed, 3) if elapsed else None,
+        "statuses": dict(statuses),
+        "output": writer.path,
+        "latency": latency_summary(),
+    }
+
+
+def run_batch(claim_ids, output, **kwargs):
+    return asyncio.run(run_batch_async(claim_ids, output, **kwargs))
+
+
+def read_claim_ids(path):
+    """One claim ID per line, or a CSV with a claim_id column"""
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if lines and "," in lines[0] and "claim_id" in lines[0].split(","):
+        column = lines[0].split(",").index("claim_id")
+        return [line.split(",")[column] for line in lines[1:]]
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adjudicate claims in bulk through the langgraph workflow.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--claims", nargs="+", help="claim IDs to adjudicate")
+    source.add_argument("--file", help="file with one claim ID per line (or a CSV with a claim_id column)")
+    source.add_argument("--all", action="store_true", help="adjudicate every claim in the claims table")
+    parser.add_argument("--output", default="data/batch_decisions.csv", help="results CSV")
+    parser.add_argument("--concurrency", type=int, default=8, help="claims in flight at once")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="thread mode pool size (default: concurrency x (retries + 1))")
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per claim attempt")
+    parser.add_argument("--retries", type=int, default=2, help="retries after a failed or timed-out attempt")
+    parser.add_argument("--retry-backoff", type=float, default=1.0, help="base seconds for exponential backoff")
+    parser.add_argument("--checkpoint", nargs="?", const=WORKFLOW_CHECKPOINT_PATH, default=None, metavar="PATH",
+                        help=f"checkpoint every node so a rerun resumes unfinished claims (default file: {WORKFLOW_CHECKPOINT_PATH})")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        claim_ids = load_table("claims", ["claim_id"])["claim_id"].dropna().drop_duplicates().tolist()
+    elif args.file:
+        claim_ids = read_claim_ids(args.file)
+    else:
+        claim_ids = args.claims
+
+    summary = run_batch(
+        claim_ids,
+        args.output,
+        concurrency=args.concurrency,
+        workers=args.workers,
+        mode=args.mode,
+        timeout=args.timeout,
+        retries=args.retries,
+        retry_backoff=args.retry_backoff,
+        checkpoint=args.checkpoint,
+    )
+    print(f"Adjudicated {summary['claims']} claims in {summary['elapsed_seconds']}s "
+          f"({summary['claims_per_second']} claims/s) -> {summary['output']}")
+    for status, count in sorted(summary["statuses"].items()):
+        print(f"  {status}: {count}")
+    print("Latency per node / call (ms):")
+    for name, row in summary["latency"].items():
+        print(f"  {name:40s} n={row['samples']:<6} p50={row['p50_ms']} p95={row['p95_ms']} p99={row['p99_ms']}")
+    if TRACE_PATH:
+        print(f"Per-claim traces appended to {TRACE_PATH}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/fakes.py
+"""
+Offline stand-ins for the external services, so the benchmarks are reproducible and need no API keys:
+FakeChatModel (fake_llm.py) for the three Gemini clients, FakeEmbeddings for the embedding model and
+FakeVectorStore for Pinecone. All of them answer deterministically and sleep for a configurable latency.
+
+configure_environment() must run before the repository modules are imported (their settings are read from the
+environment at import time); install_fakes() then swaps the services in through the registry.
+"""
+import hashlib
+import json
+import os
+import time
+from local_vectorstore import HashEmbeddings, LocalVectorIndex
+
+INDEX_NAME = "insurance-policies"
+
+
+def configure_environment(workdir):
+    """Point caches, indexes and traces at `workdir` and lift the LLM quotas (the fakes have none)"""
+    os.environ.update({
+        "VECTOR_BACKEND": "local",
+        "EMBEDDING_BACKEND": "hash",
+        "LOCAL_INDEX_DIR": os.path.join(workdir, "policy_index"),
+        "INGESTION_MANIFEST_DIR": os.path.join(workdir, "ingestion"),
+        "COLUMNAR_DIR": os.path.join(workdir, "columnar"),
+        "EMBEDDING_CACHE_PATH": "",
+        "LLM_CACHE_PATH": "",
+        "VISIT_LEDGER_PATH": "",
+        "TRACE_PATH": "",
+        "LLM_REQUESTS_PER_MINUTE": "1000000000",
+        "LLM_TOKENS_PER_MINUTE": "1000000000000",
+        "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY", "offline"),
+    })
+
+
+# 1. Chat model
+def eligibility_responder(prompt):
+    """JSON eligibility answer derived from the prompt hash: about 80% eligible"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+    eligible = digest[0] < 205
+    return json.dumps({
+        "eligible": eligible,
+        "reason": "Meets the plan criteria" if eligible else "Does not meet the plan criteria",
+        "prior_auth_required": bool(digest[1] & 1),
+    })
+
+
+def text_responder(label):
+    def respond(prompt):
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+        return f"{label} summary {digest}: the claim was reviewed against the plan policy."
+    return respond
+
+
+# 2. Embeddings and vector store
+class FakeEmbeddings(HashEmbeddings):
+    """HashEmbeddings plus a fixed latency per embedding call (one call per batch)"""
+
+    def __init__(self, dimension=384, latency=0.0):
+        super().__init__(dimension)
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class FakeVectorStore(LocalVectorIndex):
+    """The local index with a fixed latency per search, standing in for a Pinecone round-trip"""
+
+    def __init__(self, path, embedding, latency=0.0):
+        super().__init__(path, embedding)
+        self.latency = latency
+
+    def similarity_search_with_score(self, query, k=3, filter=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return super().similarity_search_with_score(query, k=k, filter=filter)
+
+    async def asimilarity_search(self, query, k=3, filter=None):
+        return self.similarity_search(query, k=k, filter=filter)
+
+
+def install_fakes(policy_docs, llm_latency=0.0, embedding_latency=0.0, search_latency=0.0):
+    """
+    Register fake chat models for the three agents and a fake embedding client and vector store, ingest the
+    policy docs into it, and mark the policy vector store service as built. Returns the fake models by agent.
+    """
+    import registry
+    import vectordb
+    import eligibility_agent
+    import explanation_agent
+    import policy_agent
+    from embedding_service import get_embedding_service
+    from fake_llm import FakeChatModel
+
+    models = {
+        "eligibility": FakeChatModel(responder=eligibility_responder, latency=llm_latency),
+        "policy": FakeChatModel(responder=text_responder("Policy"), latency=llm_latency),
+        "explanation": FakeChatModel(responder=text_responder("Explanation"), latency=llm_latency),
+    }
+    registry.override(eligibility_agent.LLM_SERVICE, models["eligibility"])
+    registry.override(policy_agent.LLM_SERVICE, models["policy"])
+    registry.override(explanation_agent.LLM_SERVICE, models["explanation"])
+
+    embeddings = get_embedding_service("hash")
+    embeddings.client = FakeEmbeddings(embeddings.client.dimension, latency=embedding_latency)
+    store = FakeVectorStore(os.path.join(vectordb.LOCAL_INDEX_DIR, INDEX_NAME), embeddings, latency=search_latency)
+    # the store get_local_index() hands out; the local backend has no other hook for a custom index class
+    vectordb._local_indexes[INDEX_NAME] = store
+    registry.override(policy_agent.VECTORSTORE_SERVICE, vectordb.sync_vectorstore(INDEX_NAME, "local", policy_docs))
+    policy_agent.clear_context_cache()
+    return models
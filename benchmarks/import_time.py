@@ -0,0 +1,96 @@
+# benchmarks/import_time.py
+"""
+Cold-start benchmark: imports the workflow module in fresh interpreters and reports how long it takes.
+It also checks that the import stayed lazy: no LLM client, Pinecone client or IPython loaded and nothing built in
+the service registry. Exits non-zero when a check fails or the median exceeds --max-seconds.
+
+    python benchmarks/import_time.py --runs 5 --max-seconds 3
+    python benchmarks/import_time.py --module batch_runner --top 15
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that only the first claim (or warmup()) should pull in
+LAZY_MODULES = ["langchain_google_genai", "google.genai", "pinecone", "langchain_pinecone", "langchain_community",
+                "IPython"]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+import registry
+print(json.dumps({{
+    "seconds": elapsed,
+    "loaded": [name for name in {lazy!r} if name in sys.modules],
+    "built": [name for name in registry.registered() if registry.is_ready(name)],
+}}))
+"""
+
+
+def measure(module, runs=5):
+    """Import `module` in `runs` fresh interpreters; returns per-run timings and whatever was loaded eagerly"""
+    code = _PROBE.format(module=module, lazy=LAZY_MODULES)
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "module": module,
+        "runs": [round(result["seconds"], 4) for result in results],
+        "median_seconds": round(statistics.median(result["seconds"] for result in results), 4),
+        "min_seconds": round(min(result["seconds"] for result in results), 4),
+        "eager_modules": sorted({name for result in results for name in result["loaded"]}),
+        "built_services": sorted({name for result in results for name in result["built"]}),
+    }
+
+
+def slowest_imports(module, top=10):
+    """The `top` slowest imports by cumulative time, from python -X importtime"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=REPO_ROOT, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return [(name, round(cumulative / 1e6, 4)) for cumulative, name in sorted(rows, reverse=True)[:top]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of the workflow.")
+    parser.add_argument("--module", default="langgraph_workflow")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail when the median import is slower")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest imports")
+    args = parser.parse_args(argv)
+
+    report = measure(args.module, args.runs)
+    print(json.dumps(report, indent=2))
+    if args.top:
+        for name, seconds in slowest_imports(args.module, args.top):
+            print(f"  {seconds:8.4f}s  {name}")
+
+    failures = []
+    if report["eager_modules"]:
+        failures.append(f"imported eagerly: {', '.join(report['eager_modules'])}")
+    if report["built_services"]:
+        failures.append(f"services built at import: {', '.join(report['built_services'])}")
+    if args.max_seconds is not None and report["median_seconds"] > args.max_seconds:
+        failures.append(f"median import {report['median_seconds']}s > {args.max_seconds}s")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline benchmark suite: generates (or reuses) a synthetic dataset, swaps Gemini, the embedding model and
+Pinecone for the deterministic fakes in fakes.py, and runs these scenarios:
+
+    load                    load the tables and build the claim store, fraud features, rule table and visit index
+    validate_claims         validate_claims() per claim over a sample
+    validate_claims_batch   validate_claims_batch() over every claim in one vectorized pass
+    fraud_agent             fraud_agent() per claim over a sample
+    eligibility_agent       eligibility_agent() per claim over a sample (rule engine or fake LLM)
+    workflow                build_graph() compiled once, then full runs over a sample with --concurrency in flight
+
+Each scenario reports throughput, per-call latency percentiles, p50/p95/p99 per graph node and external call (from
+instrumentation.latency_summary) and peak memory (process RSS high-water mark, plus tracemalloc's peak for the
+scenario with --trace-memory). The results go to a JSON file; --compare an earlier file to print throughput ratios
+and fail when a scenario got slower than --max-regression allows.
+
+    python benchmarks/run_benchmarks.py --claims 100000 --llm-latency 0.02
+    python benchmarks/run_benchmarks.py --claims 100000 --compare .cache/benchmarks/baseline.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:     # Windows
+    resource = None
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCHMARK_DIR)
+
+import fakes
+import synthetic_data
+
+SCENARIOS = ["load", "validate_claims", "validate_claims_batch", "fraud_agent", "eligibility_agent", "workflow"]
+WORKDIR = os.path.join(REPO_ROOT, ".cache", "bench")
+RESULTS_DIR = os.path.join(REPO_ROOT, ".cache", "benchmarks")
+
+
+# 1. Dataset
+def prepare_dataset(workdir, claims, seed, plans):
+    """Generate the dataset once per (claims, seed, plans) and reuse it on later runs"""
+    output = os.path.join(workdir, f"data-{claims}-{seed}-{plans}")
+    marker = os.path.join(output, "dataset.json")
+    if os.path.exists(marker):
+        with open(marker, encoding="utf-8") as f:
+            return json.load(f)
+    started = time.perf_counter()
+    summary = synthetic_data.generate(output, claims=claims, plans=plans, seed=seed)
+    summary["generate_seconds"] = round(time.perf_counter() - started, 3)
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    return summary
+
+
+def use_dataset(dataset):
+    import data_loader
+    for name in ("patients", "claims", "rules"):
+        data_loader.DATA_FILES[name] = dataset["paths"][name]
+    data_loader.reload_data()
+
+
+def sample_claim_ids(size, seed):
+    """A deterministic sample of claim IDs (every claim when size >= the table)"""
+    import numpy as np
+    from data_loader import load_table
+    claim_ids = load_table("claims", ["claim_id"])["claim_id"].dropna().drop_duplicates().tolist()
+    if size >= len(claim_ids):
+        return claim_ids
+    picks = np.sort(np.random.default_rng(seed).choice(len(claim_ids), size, replace=False))
+    return [claim_ids[i] for i in picks]
+
+
+# 2. Measurement
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def measure(name, body, trace_memory=False):
+    """Run body() -> (items, per-call ms or None, extra dict) and wrap it in throughput, latency and memory stats"""
+    from instrumentation import latency_summary, reset_stats, summarize
+    gc.collect()
+    reset_stats()
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        items, call_ms, extra = body()
+    finally:
+        elapsed = time.perf_counter() - started
+        traced_peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    result = {
+        "scenario": name,
+        "items": items,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_per_second": round(items / elapsed, 2) if elapsed else None,
+        "latency_ms": summarize(call_ms) if call_ms else None,
+        "spans": latency_summary(),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": round(traced_peak / 2 ** 20, 1) if traced_peak is not None else None,
+    }
+    result.update(extra)
+    return result
+
+
+def timed_calls(fn, items):
+    call_ms = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        call_ms.append(round((time.perf_counter() - started) * 1000, 3))
+    return call_ms
+
+
+# 3. Scenarios
+def scenario_load(args, claim_ids):
+    from claim_store import get_claim_store
+    from data_loader import reload_data
+    from eligibility_rules import get_decision_table
+    from fraud_features import get_fraud_feature_store
+    from visit_index import get_visit_index
+
+    def body():
+        reload_data()
+        steps = {}
+        for step, build in (("claim_store", get_claim_store), ("fraud_features", get_fraud_feature_store),
+                            ("decision_table", get_decision_table), ("visit_index", get_visit_index)):
+            started = time.perf_counter()
+            build()
+            steps[step] = round(time.perf_counter() - started, 4)
+        return len(get_claim_store().claims_df), None, {"steps_seconds": steps}
+    return body
+
+
+def scenario_validate_claims(args, claim_ids):
+    from validation_agent import validate_claims
+    return lambda: (len(claim_ids), timed_calls(validate_claims, claim_ids), {})
+
+
+def scenario_validate_claims_batch(args, claim_ids):
+    from claim_store import get_claim_store
+    from validation_agent import validate_claims_batch
+
+    def body():
+        frame = get_claim_store().claims_df
+        results = validate_claims_batch(frame)
+        return len(frame), None, {"invalid": sum(not result["valid"] for result in results.values())}
+    return body
+
+
+def scenario_fraud_agent(args, claim_ids):
+    from fraud_detection_agent import fraud_agent
+
+    def body():
+        flagged = []
+        call_ms = timed_calls(lambda claim_id: flagged.append(fraud_agent(claim_id)["fraud_flag"]), claim_ids)
+        return len(claim_ids), call_ms, {"flagged": sum(flagged)}
+    return body
+
+
+def scenario_eligibility_agent(args, claim_ids):
+    from eligibility_agent import eligibility_agent
+
+    def body():
+        decided_by = {}
+
+        def run(claim_id):
+            result = eligibility_agent(claim_id)
+            key = result.get("decided_by", "other") if isinstance(result, dict) else "not_found"
+            decided_by[key] = decided_by.get(key, 0) + 1
+        return len(claim_ids), timed_calls(run, claim_ids), {"decided_by": decided_by}
+    return body
+
+
+def scenario_workflow(args, claim_ids):
+    from langgraph_workflow import compile_workflow, run_claim, arun_claim
+    claim_ids = claim_ids[:args.workflow_sample]
+
+    def body():
+        started = time.perf_counter()
+        workflow = compile_workflow(use_async=(args.mode == "async"))
+        compile_seconds = round(time.perf_counter() - started, 4)
+        if args.mode == "async":
+            async def run_all():
+                semaphore = asyncio.Semaphore(args.concurrency)
+
+                async def run(claim_id):
+                    async with semaphore:
+                        started = time.perf_counter()
+                        result = await arun_claim(workflow, claim_id)
+                        return round((time.perf_counter() - started) * 1000, 3), result.get("status")
+                return await asyncio.gather(*(run(claim_id) for claim_id in claim_ids))
+            runs = asyncio.run(run_all())
+        else:
+            def run(claim_id):
+                started = time.perf_counter()
+                result = run_claim(workflow, claim_id)
+                return round((time.perf_counter() - started) * 1000, 3), result.get("status")
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                runs = list(executor.map(run, claim_ids))
+        call_ms = [ms for ms, _ in runs]
+        statuses = dict(Counter(status for _, status in runs))
+        return len(claim_ids), call_ms, {"compile_seconds": compile_seconds, "statuses": statuses,
+                                         "mode": args.mode, "concurrency": args.concurrency}
+    return body
+
+
+SCENARIO_BUILDERS = {
+    "load": scenario_load,
+    "validate_claims": scenario_validate_claims,
+    "validate_claims_batch": scenario_validate_claims_batch,
+    "fraud_agent": scenario_fraud_agent,
+    "eligibility_agent": scenario_eligibility_agent,
+    "workflow": scenario_workflow,
+}
+
+
+# 4. Results
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, max_regression=None):
+    """Throughput ratio (current / baseline) per scenario; returns the scenarios slower than max_regression allows"""
+    previous = {row["scenario"]: row for row in baseline["scenarios"]}
+    regressions = []
+    print(f"\n{'scenario':24s} {'baseline/s':>12s} {'current/s':>12s} {'ratio':>7s}")
+    for row in results["scenarios"]:
+        old = previous.get(row["scenario"])
+        if not old or not old.get("throughput_per_second") or not row.get("throughput_per_second"):
+            continue
+        ratio = row["throughput_per_second"] / old["throughput_per_second"]
+        print(f"{row['scenario']:24s} {old['throughput_per_second']:12.1f} {row['throughput_per_second']:12.1f} "
+              f"{ratio:7.2f}")
+        if max_regression is not None and ratio < 1 - max_regression:
+            regressions.append(row["scenario"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark scenarios on synthetic data.")
+    parser.add_argument("--claims", type=int, default=10_000, help="synthetic claims (1k .. 5M)")
+    parser.add_argument("--plans", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--sample", type=int, default=2000, help="claims per per-claim scenario")
+    parser.add_argument("--workflow-sample", type=int, default=200, help="claims run through the whole workflow")
+    parser.add_argument("--concurrency", type=int, default=8, help="workflow claims in flight")
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread", help="workflow execution mode")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per fake LLM call")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="seconds per fake embedding call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="seconds per fake vector search")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peaks (slower)")
+    parser.add_argument("--workdir", default=WORKDIR, help="datasets, columnar cache and the fake index")
+    parser.add_argument("--output", default=None, help="results JSON (default: .cache/benchmarks/<time>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results JSON to compare throughput against")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="fail when a scenario's throughput drops by more than this fraction vs --compare")
+    args = parser.parse_args(argv)
+
+    # the repository modules read their settings at import time, so the environment comes first
+    fakes.configure_environment(args.workdir)
+    dataset = prepare_dataset(args.workdir, args.claims, args.seed, args.plans)
+    use_dataset(dataset)
+    fakes.install_fakes(dataset["paths"]["policy_docs"], args.llm_latency, args.embedding_latency,
+                        args.search_latency)
+    claim_ids = sample_claim_ids(args.sample, args.seed)
+
+    results = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "arguments": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "dataset": dataset,
+        "scenarios": [],
+    }
+    # the load scenario runs first so the other scenarios see warm tables
+    for name in sorted(args.scenarios, key=SCENARIOS.index):
+        row = measure(name, SCENARIO_BUILDERS[name](args, claim_ids), args.trace_memory)
+        results["scenarios"].append(row)
+        latency = row["latency_ms"] or {}
+        percentiles = f"p50={latency['p50_ms']}ms p99={latency['p99_ms']}ms" if latency else "-"
+        memory = f"rss={row['peak_rss_mb']}MB"
+        if row["peak_traced_mb"] is not None:
+            memory += f" traced={row['peak_traced_mb']}MB"
+        print(f"{name:24s} {row['items']:>9} items {row['elapsed_seconds']:>9.3f}s "
+              f"{row['throughput_per_second']:>12.1f}/s  {percentiles}  {memory}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{args.claims}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        for name in regressions:
+            print(f"FAIL: {name} throughput dropped by more than {args.max_regression:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
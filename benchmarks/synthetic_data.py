@@ -0,0 +1,202 @@
+# benchmarks/synthetic_data.py
+"""
+Synthetic insurance data for the benchmarks: patients.csv, claims.csv and insurance_rules.csv with the same columns
+and formats as data/, plus one policy document per plan under policyDocs/. Everything is drawn from a seeded NumPy
+generator, so the same arguments always give byte-identical files. Claims are written in chunks, so 5M claims need
+no more memory than one chunk.
+
+A small share of the claims is made invalid (missing fields, bad codes, non-positive amounts, unknown patients),
+duplicated or already approved, so validation, fraud and visit-limit paths all see work; the rules mix clear-cut
+rows the rule engine decides with rows that need the LLM.
+
+    python benchmarks/synthetic_data.py --claims 1000000 --output .cache/bench/1m
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+
+PROCEDURES = [
+    ("HCPCS_G0296", "Physical Therapy"),
+    ("CPT_72148", "MRI Lumbar Spine"),
+    ("CPT_99213", "Office Visit"),
+    ("CPT_70551", "MRI Brain"),
+    ("CPT_93000", "Electrocardiogram (EKG)"),
+    ("CPT_11721", "Ingrown Toenail Surgery"),
+    ("CPT_97110", "Therapeutic Exercise"),
+    ("CPT_70450", "CT Head/Brain"),
+    ("CPT_99396", "Annual Wellness Visit"),
+    ("CPT_95806", "Sleep Study (Polysomnography)"),
+    ("CPT_45378", "Colonoscopy"),
+    ("CPT_90658", "Influenza Vaccine"),
+    ("CPT_36415", "Blood Draw/Lab Collection"),
+    ("CPT_81002", "Urinalysis"),
+    ("CPT_20610", "Joint Injection"),
+    ("CPT_47562", "Laparoscopic Cholecystectomy"),
+]
+DIAGNOSES = ["ICD10_M51.26", "ICD10_J45.909", "ICD10_G40.909", "ICD10_I10", "ICD10_L60.0", "ICD10_E11.9",
+             "ICD10_M17.11", "ICD10_K80.20", "ICD10_G47.33", "ICD10_Z00.00"]
+CONDITIONS = ["none", "Hypertension", "Diabetes", "Asthma", "Heart Disease", "Obesity", "Hypertension;Diabetes"]
+STATES = ["TX", "CA", "NY", "FL", "IL", "WA", "OH", "GA", "PA", "AZ"]
+FIRST_NAMES = ["John", "Mary", "Robert", "Linda", "James", "Patricia", "Michael", "Barbara", "David", "Susan"]
+LAST_NAMES = ["Smith", "Johnson", "Lee", "Martinez", "Davis", "Brown", "Clark", "Lopez", "Wilson", "Moore"]
+
+CHUNK_ROWS = 500_000
+START_DATE = "2025-01-01"
+DAYS = 365
+
+
+def plan_ids(count):
+    """MedicareA, MedicareB, MedicareC, then Plan04, Plan05, ..."""
+    names = ["MedicareA", "MedicareB", "MedicareC"]
+    return names[:count] + [f"Plan{i:02d}" for i in range(len(names) + 1, count + 1)]
+
+
+# 1. Patients and rules
+def make_patients(count, plans, rng):
+    ids = np.char.add("P", np.char.zfill(np.arange(1, count + 1).astype(str), 7))
+    return pd.DataFrame({
+        "patient_id": ids,
+        "name": np.char.add(np.char.add(rng.choice(FIRST_NAMES, count), " "), rng.choice(LAST_NAMES, count)),
+        "age": rng.integers(0, 100, count),
+        "gender": rng.choice(["M", "F"], count),
+        "plan_id": rng.choice(plans, count),
+        "deductible_remaining": rng.integers(0, 60, count) * 50,
+        "oop_remaining": rng.integers(0, 200, count) * 50,
+        "chronic_conditions": rng.choice(CONDITIONS, count),
+        "enrollment_state": rng.choice(STATES, count),
+    })
+
+
+def make_rules(plans, rng):
+    """One rule per (plan, procedure): about 10% not covered, 25% that need the LLM (diagnosis or conditional note)"""
+    rows = []
+    for plan_id in plans:
+        for code, name in PROCEDURES:
+            covered = rng.random() >= 0.1
+            prior_auth = bool(rng.random() < 0.5)
+            diagnosis = str(rng.choice(DIAGNOSES)).replace("ICD10_", "") if rng.random() < 0.15 else "none"
+            notes = "Covered if medically necessary" if rng.random() < 0.1 else (
+                "Prior auth required" if prior_auth else "Routine coverage; no prior auth")
+            rows.append({
+                "plan_id": plan_id,
+                "procedure_code": code,
+                "procedure_name": name,
+                "covered": "Yes" if covered else "No",
+                "prior_auth": "Yes" if prior_auth else "No",
+                "min_age": int(rng.choice([0, 0, 6, 18, 40, 50])),
+                "max_age": 120,
+                "diagnosis_required": diagnosis,
+                "max_visits_per_year": int(rng.choice([1, 2, 4, 10, 20])),
+                "notes": notes if covered else f"Not covered under {plan_id}",
+            })
+    return pd.DataFrame(rows)
+
+
+def policy_document(plan_id, rules):
+    """Plain-text policy for one plan, in the layout of data/policyDocs"""
+    lines = [f"{plan_id} Plan Policy Document", ""]
+    for rule in rules.itertuples(index=False):
+        code = rule.procedure_code.replace("_", " ")
+        lines.append(f"{rule.procedure_name} ({code}):")
+        if rule.covered == "No":
+            lines.append(f"- Not covered under {plan_id}")
+        else:
+            lines.append(f"- Covered for ages {rule.min_age} to {rule.max_age}")
+            if rule.diagnosis_required != "none":
+                lines.append(f"- Requires a documented diagnosis of {rule.diagnosis_required}")
+            auth = "Prior authorization required" if rule.prior_auth == "Yes" else "No prior authorization required"
+            lines.append(f"- {auth}")
+            lines.append(f"- Max visits per year: {rule.max_visits_per_year}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# 2. Claims
+def make_claims(first, count, patient_count, providers, rng, invalid_rate=0.02, duplicate_rate=0.01,
+                approved_rate=0.05):
+    """Claims first .. first + count - 1; the id, patient and date columns are vectorized draws"""
+    numbers = np.arange(first + 1, first + count + 1)
+    frame = pd.DataFrame({
+        "claim_id": np.char.add("C", np.char.zfill(numbers.astype(str), 9)),
+        "patient_id": np.char.add("P", np.char.zfill(rng.integers(1, patient_count + 1, count).astype(str), 7)),
+        "procedure_code": rng.choice([code for code, _ in PROCEDURES], count),
+        "diagnosis_code": rng.choice(DIAGNOSES, count),
+        "claim_amount": np.round(rng.lognormal(6.0, 1.2, count)).astype(np.int64) + 1,
+        "date": rng.integers(0, DAYS, count),
+        "provider": np.char.add("Dr ", rng.integers(1, providers + 1, count).astype(str)),
+        "status": np.where(rng.random(count) < approved_rate, "Approved", "Pending"),
+    })
+
+    # a. duplicates: same patient, procedure, provider and date as the previous claim
+    duplicate = np.flatnonzero(rng.random(count) < duplicate_rate)
+    duplicate = duplicate[duplicate > 0]
+    for column in ["patient_id", "procedure_code", "provider", "date"]:
+        frame.loc[duplicate, column] = frame[column].to_numpy()[duplicate - 1]
+
+    # b. invalid rows, one defect each
+    invalid = np.flatnonzero(rng.random(count) < invalid_rate)
+    defects = rng.integers(0, 5, len(invalid))
+    frame.loc[invalid[defects == 0], "diagnosis_code"] = None
+    frame.loc[invalid[defects == 1], "procedure_code"] = "XYZ_00000"
+    frame.loc[invalid[defects == 2], "diagnosis_code"] = "BAD_CODE"
+    frame.loc[invalid[defects == 3], "claim_amount"] = 0
+    frame.loc[invalid[defects == 4], "patient_id"] = "P9999999"
+
+    # one formatted label per day of the year instead of formatting every row
+    labels = pd.date_range(START_DATE, periods=DAYS, freq="D").strftime("%m/%d/%y").to_numpy()
+    frame["date"] = labels[frame["date"].to_numpy()]
+    return frame
+
+
+def generate(output, claims=1000, patients=None, plans=3, providers=None, seed=0, chunk_rows=CHUNK_ROWS,
+             invalid_rate=0.02, duplicate_rate=0.01, approved_rate=0.05):
+    """Write the synthetic tables and policy docs to `output`; returns the file paths and row counts"""
+    rng = np.random.default_rng(seed)
+    patients = patients or max(100, claims // 4)
+    providers = providers or max(10, claims // 500)
+    plans = plan_ids(plans)
+    os.makedirs(os.path.join(output, "policyDocs"), exist_ok=True)
+    paths = {
+        "patients": os.path.join(output, "patients.csv"),
+        "claims": os.path.join(output, "claims.csv"),
+        "rules": os.path.join(output, "insurance_rules.csv"),
+        "policy_docs": os.path.join(output, "policyDocs"),
+    }
+
+    make_patients(patients, plans, rng).to_csv(paths["patients"], index=False)
+    rules = make_rules(plans, rng)
+    rules.to_csv(paths["rules"], index=False)
+    for plan_id, plan_rules in rules.groupby("plan_id", sort=False):
+        with open(os.path.join(paths["policy_docs"], f"{plan_id}_policy.txt"), "w", encoding="utf-8") as f:
+            f.write(policy_document(plan_id, plan_rules))
+
+    for first in range(0, claims, chunk_rows):
+        chunk = make_claims(first, min(chunk_rows, claims - first), patients, providers, rng, invalid_rate,
+                            duplicate_rate, approved_rate)
+        chunk.to_csv(paths["claims"], index=False, mode="w" if first == 0 else "a", header=(first == 0))
+
+    return {"paths": paths, "claims": claims, "patients": patients, "providers": providers, "plans": plans,
+            "seed": seed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic patients, claims, rules and policy docs.")
+    parser.add_argument("--claims", type=int, default=1000, help="number of claims (1k .. 5M)")
+    parser.add_argument("--patients", type=int, default=None, help="default: claims / 4")
+    parser.add_argument("--plans", type=int, default=3)
+    parser.add_argument("--providers", type=int, default=None, help="default: claims / 500")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=".cache/bench/data")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    summary = generate(args.output, args.claims, args.patients, args.plans, args.providers, args.seed)
+    print(f"Wrote {summary['claims']} claims, {summary['patients']} patients and {len(summary['plans'])} plans "
+          f"to {args.output} in {time.perf_counter() - started:.1f}s")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# src/checkpoints.py
+"""
+Durable workflow checkpoints in a local SQLite file, with claim_id as the langgraph thread key.
+Each finished node's output is saved as soon as the node completes, so a claim interrupted by a provider error,
+a timeout or a restart resumes after its last finished node (see langgraph_workflow.run_claim) and never repeats
+LLM calls it has already paid for. The CLI lists, resumes or purges the runs recorded in the checkpoint file:
+
+    python checkpoints.py list --in-flight
+    python checkpoints.py resume --concurrency 16
+    python checkpoints.py purge --completed
+"""
+import argparse
+import os
+import sqlite3
+import threading
+from langgraph.checkpoint.sqlite import SqliteSaver
+from dotenv import load_dotenv
+load_dotenv()
+
+WORKFLOW_CHECKPOINT_PATH = os.getenv("WORKFLOW_CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+
+_checkpointers = {}
+_checkpointers_lock = threading.Lock()
+
+
+def get_checkpointer(path=WORKFLOW_CHECKPOINT_PATH):
+    """Return the process-wide SqliteSaver for a checkpoint file, shared by every thread"""
+    with _checkpointers_lock:
+        if path not in _checkpointers:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+            saver.setup()
+            _checkpointers[path] = saver
+        return _checkpointers[path]
+
+
+def open_async_checkpointer(path=WORKFLOW_CHECKPOINT_PATH):
+    """
+    AsyncSqliteSaver for the same file, for workflows run with ainvoke.
+    Must be called inside the running event loop; close it with `await saver.conn.close()`.
+    """
+    import aiosqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return AsyncSqliteSaver(aiosqlite.connect(path))
+
+
+def checkpointed_claim_ids(path=WORKFLOW_CHECKPOINT_PATH):
+    saver = get_checkpointer(path)
+    with saver.lock:
+        rows = saver.conn.execute("SELECT DISTINCT thread_id FROM checkpoints ORDER BY thread_id").fetchall()
+    return [row[0] for row in rows]
+
+
+def list_runs(path=WORKFLOW_CHECKPOINT_PATH, workflow=None):
+    """One entry per checkpointed claim: its pending nodes (empty once finished) and status so far"""
+    from langgraph_workflow import compile_workflow, claim_config
+    workflow = workflow or compile_workflow(checkpointer=get_checkpointer(path))
+    runs = []
+    for claim_id in checkpointed_claim_ids(path):
+        snapshot = workflow.get_state(claim_config(claim_id))
+        runs.append({
+            "claim_id": claim_id,
+            "in_flight": bool(snapshot.next),
+            "next": list(snapshot.next),
+            "status": snapshot.values.get("status"),
+            "updated_at": snapshot.created_at,
+        })
+    return runs
+
+
+def purge_runs(claim_ids=None, completed_only=False, path=WORKFLOW_CHECKPOINT_PATH):
+    """Delete the checkpoints of the given claims (all claims when None); returns the purged claim IDs"""
+    saver = get_checkpointer(path)
+    if claim_ids is None:
+        if completed_only:
+            claim_ids = [run["claim_id"] for run in list_runs(path) if not run["in_flight"]]
+        else:
+            claim_ids = checkpointed_claim_ids(path)
+    for claim_id in claim_ids:
+        saver.delete_thread(str(claim_id))
+    return list(claim_ids)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="List, resume or purge checkpointed workflow runs.")
+    parser.add_argument("--path", default=WORKFLOW_CHECKPOINT_PATH, help="checkpoint SQLite file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_cmd = commands.add_parser("list", help="show checkpointed claims")
+    list_cmd.add_argument("--in-flight", action="store_true", help="only claims that have not finished")
+
+    resume_cmd = commands.add_parser("resume", help="finish interrupted claims from their last completed node")
+    resume_cmd.add_argument("--claims", nargs="+", help="claim IDs to resume (default: every in-flight claim)")
+    resume_cmd.add_argument("--output", default="data/batch_decisions.csv", help="results CSV")
+    resume_cmd.add_argument("--concurrency", type=int, default=8, help="claims in flight at once")
+
+    purge_cmd = commands.add_parser("purge", help="delete checkpoints")
+    target = purge_cmd.add_mutually_exclusive_group(required=True)
+    target.add_argument("--claims", nargs="+", help="claim IDs to purge")
+    target.add_argument("--completed", action="store_true", help="purge every finished claim")
+    target.add_argument("--all", action="store_true", help="purge everything")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        runs = list_runs(args.path)
+        if args.in_flight:
+            runs = [run for run in runs if run["in_flight"]]
+        for run in runs:
+            state = f"next: {', '.join(run['next'])}" if run["in_flight"] else f"done: {run['status']}"
+            print(f"{run['claim_id']}\t{state}\t{run['updated_at']}")
+        print(f"{len(runs)} checkpointed claims")
+        return runs
+
+    if args.command == "resume":
+        from batch_runner import run_batch
+        claim_ids = args.claims or [run["claim_id"] for run in list_runs(args.path) if run["in_flight"]]
+        if not claim_ids:
+            print("No in-flight claims to resume")
+            return None
+        summary = run_batch(claim_ids, args.output, concurrency=args.concurrency, checkpoint=args.path)
+        print(f"Resumed {summary['claims']} claims in {summary['elapsed_seconds']}s -> {summary['output']}")
+        return summary
+
+    purged = purge_runs(
+        claim_ids=args.claims,
+        completed_only=args.completed,
+        path=args.path,
+    )
+    print(f"Purged checkpoints for {len(purged)} claims")
+    return purged
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# src/claim_store.py
+import pandas as pd
+import threading
+from data_loader import load_data, get_data_version
+
+"""
+This module builds one in-process ClaimStore over the claims, patients and insurance rules tables.
+Instead of scanning a whole column with a boolean mask for every lookup, the store keeps dict indexes
+from claim_id, patient_id and (plan_id, procedure_code) to row positions, so every agent gets its rows in O(1).
+Claims that are not in the loaded table (a chunk of a streamed backfill file, see claim_stream.py) can be
+registered with add_claims() for as long as they are being adjudicated and dropped again with remove_claims().
+"""
+
+
+def _is_missing(value):
+    """NaN keys never match with == in pandas, so they are left out of the indexes as well"""
+    return value is None or (not isinstance(value, tuple) and pd.isna(value))
+
+
+def _first_position_index(keys):
+    """Map every key to the position of its first row (same row that .iloc[0] picks after a mask)"""
+    index = {}
+    for position, key in enumerate(keys):
+        if isinstance(key, tuple) and any(_is_missing(part) for part in key):
+            continue
+        if _is_missing(key):
+            continue
+        index.setdefault(key, position)
+    return index
+
+
+def _positions_index(keys):
+    """Map every key to the positions of all of its rows, in table order"""
+    index = {}
+    for position, key in enumerate(keys):
+        if _is_missing(key):
+            continue
+        index.setdefault(key, []).append(position)
+    return index
+
+
+class ClaimStore:
+    """Hash indexes on claim_id, patient_id and (plan_id, procedure_code) over the loaded data frames"""
+
+    def __init__(self, data_store):
+        self.patients_df = data_store["patients"]
+        self.claims_df = data_store["claims"]
+        self.rules_df = data_store["rules"]
+
+        self._claim_index = _first_position_index(self.claims_df["claim_id"].tolist())
+        self._patient_index = _first_position_index(self.patients_df["patient_id"].tolist())
+        self._rule_index = _first_position_index(
+            zip(self.rules_df["plan_id"].tolist(), self.rules_df["procedure_code"].tolist())
+        )
+        self._claims_by_patient = _positions_index(self.claims_df["patient_id"].tolist())
+        self._extra_claims = {}
+        self._extra_lock = threading.Lock()
+
+    # 1. Claims
+    def get_claim(self, claim_id):
+        """Return the claim row as a dict, or None if the claim does not exist"""
+        extra = self._extra_claims.get(claim_id)
+        if extra is not None:
+            return dict(extra)
+        position = self._claim_index.get(claim_id)
+        if position is None:
+            return None
+        return self.claims_df.iloc[position].to_dict()
+
+    def has_claim(self, claim_id):
+        return claim_id in self._extra_claims or claim_id in self._claim_index
+
+    def get_claims_frame(self, claim_ids):
+        """Return the rows of the given claims as one DataFrame, in the requested order; unknown IDs are skipped"""
+        if self._extra_claims:
+            rows = [self.get_claim(c) for c in claim_ids]
+            return pd.DataFrame([row for row in rows if row is not None], columns=self.claims_df.columns)
+        positions = [self._claim_index[c] for c in claim_ids if c in self._claim_index]
+        return self.claims_df.iloc[positions]
+
+    def add_claims(self, claims):
+        """
+        Make claims that are not in the loaded table visible to get_claim (they shadow table rows with the same
+        claim_id). Takes a DataFrame or a list of row dicts; the first row of a repeated claim_id wins.
+        """
+        rows = claims.to_dict("records") if isinstance(claims, pd.DataFrame) else claims
+        with self._extra_lock:
+            added = {}
+            for row in rows:
+                claim_id = row.get("claim_id")
+                if not _is_missing(claim_id) and claim_id not in added:
+                    added[claim_id] = row
+            # copy-on-write, so readers never see the dict change size under them
+            self._extra_claims = {**self._extra_claims, **added}
+        return list(added)
+
+    def remove_claims(self, claim_ids):
+        with self._extra_lock:
+            remaining = dict(self._extra_claims)
+            for claim_id in claim_ids:
+                remaining.pop(claim_id, None)
+            self._extra_claims = remaining
+
+    def claim_ids_for_patient(self, patient_id):
+        """All claim IDs filed for a patient, in table order"""
+        positions = self._claims_by_patient.get(patient_id, [])
+        return self.claims_df["claim_id"].iloc[positions].tolist()
+
+    # 2. Patients
+    def get_patient(self, patient_id):
+        """Return the patient row as a dict, or None if the patient does not exist"""
+        position = self._patient_index.get(patient_id)
+        if position is None:
+            return None
+        return self.patients_df.iloc[position].to_dict()
+
+    def has_patient(self, patient_id):
+        return patient_id in self._patient_index
+
+    # 3. Insurance rules
+    def get_rule(self, plan_id, procedure_code):
+        """Return the insurance rule for a plan and procedure, or None if there is no rule"""
+        position = self._rule_index.get((plan_id, procedure_code))
+        if position is None:
+            return None
+        return self.rules_df.iloc[position].to_dict()
+
+
+_claim_store = None
+_claim_store_version = None
+_claim_store_lock = threading.Lock()
+
+
+def get_claim_store():
+    """
+    Return the process-wide ClaimStore, building it from load_data() on first use.
+    The store is rebuilt only after data_loader.refresh_data() has actually reloaded a table.
+    """
+    global _claim_store, _claim_store_version
+    with _claim_store_lock:
+        version = get_data_version()
+        if _claim_store is None or _claim_store_version != version:
+            _claim_store = ClaimStore(load_data())
+            _claim_store_version = version
+        return _claim_store
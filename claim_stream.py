@@ -0,0 +1,368 @@
+# src/claim_stream.py
+"""
+Streaming intake for claim files larger than memory (monthly backfills).
+The file is read in fixed-size chunks of rows. Each chunk is parsed with the claims schema from data_loader,
+validated in one vectorized pass (validate_claims_batch) and folded into the fraud feature store; claims that fail
+validation are written out as rejections right away, and only the survivors are registered in the ClaimStore and
+run through the langgraph workflow (with the batch runner's concurrency, timeout and retries). Decisions are
+appended to the output CSV chunk by chunk and the chunk's claims are dropped again.
+
+Memory is bounded by the chunk size plus the fraud history of the last --horizon-days (default 90, never less than
+the widest velocity window) before the newest claim date read so far: after every chunk the duplicate and velocity
+keys dated earlier are pruned. A file roughly in date order therefore streams in constant memory; a claim dated
+more than the horizon before claims already read is checked against the history still kept. The claim_ids read so
+far live in a SQLite file next to the output, so a claim_id repeated anywhere in the file (same chunk or a later
+one) is rejected as a duplicate instead of being adjudicated twice.
+
+After every chunk the byte offset and row count reached, and the size of the output file, are saved next to the
+output, so an interrupted run picks up after the last finished chunk with --resume (or from an explicit --start-row
+/ --start-byte). On resume the output is cut back to the saved size first: decisions of the unfinished chunk that
+were already flushed are dropped and written again, not duplicated.
+
+    python claim_stream.py backfill_2025_09.csv --chunk-size 5000 --concurrency 16
+    python claim_stream.py backfill_2025_09.csv --resume
+
+Rows are split on newlines, so quoted fields must not contain line breaks.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sqlite3
+import time
+from collections import Counter, namedtuple
+import numpy as np
+import pandas as pd
+from batch_runner import DecisionWriter, run_batch_async
+from claim_store import get_claim_store
+from data_loader import apply_schema, csv_dtypes
+from fraud_features import get_fraud_feature_store, FRAUD_FEATURE_COLUMNS
+from instrumentation import span
+from langgraph_workflow import compile_workflow, STATUS_REJECTED
+from validation_agent import validate_claims_batch
+
+CHUNK_SIZE = int(os.getenv("CLAIM_STREAM_CHUNK_SIZE", 5000))
+HORIZON_DAYS = int(os.getenv("CLAIM_STREAM_HORIZON_DAYS", 90))
+
+ClaimChunk = namedtuple("ClaimChunk", ["frame", "first_row", "end_row", "end_byte"])
+
+
+# 1. Reading chunks
+def _read_rows(f, count):
+    lines = []
+    while len(lines) < count:
+        line = f.readline()
+        if not line:
+            break
+        if line.strip():
+            lines.append(line)
+    return lines
+
+
+def iter_claim_chunks(path, chunk_size=CHUNK_SIZE, start_row=0, start_byte=None, columns=None):
+    """
+    Yield ClaimChunk(frame, first_row, end_row, end_byte) for consecutive chunks of a claims CSV.
+    Rows are counted from 0 after the header. start_byte (an end_byte from an earlier chunk) seeks straight to a
+    row boundary; start_row skips that many rows by reading lines without parsing them. columns limits parsing
+    to those columns.
+    """
+    dtypes = csv_dtypes("claims")
+    with open(path, "rb") as f:
+        header = f.readline()
+        row = 0
+        if start_byte is not None:
+            f.seek(start_byte)
+            row = start_row
+        else:
+            while row < start_row and _read_rows(f, 1):
+                row += 1
+
+        while True:
+            lines = _read_rows(f, chunk_size)
+            if not lines:
+                return
+            frame = pd.read_csv(io.BytesIO(header + b"".join(lines)), dtype=dtypes, usecols=columns)
+            frame = apply_schema("claims", frame)
+            yield ClaimChunk(frame, row, row + len(lines), f.tell())
+            row += len(lines)
+
+
+# 2. Resume state
+def progress_path(output):
+    return output + ".progress.json"
+
+
+def load_progress(output, source):
+    """Saved position for this source file, or None when there is nothing to resume"""
+    path = progress_path(output)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        progress = json.load(f)
+    return progress if progress.get("source") == os.path.abspath(source) else None
+
+
+def save_progress(output, source, end_row, end_byte, statuses):
+    path = progress_path(output)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({
+            "source": os.path.abspath(source),
+            "rows_done": end_row,
+            "byte_offset": end_byte,
+            "output_bytes": os.path.getsize(output),
+            "statuses": dict(statuses),
+            "updated_at": time.time(),
+        }, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def truncate_output(output, size):
+    """Drop whatever was written to the output after the last saved chunk"""
+    if os.path.exists(output) and os.path.getsize(output) > size:
+        with open(output, "r+b") as f:
+            f.truncate(size)
+
+
+def count_rows(path, end_byte):
+    """Rows (non-blank lines after the header) before a byte offset, for a --start-byte without --start-row"""
+    rows = 0
+    with open(path, "rb") as f:
+        f.readline()
+        while f.tell() < end_byte:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                rows += 1
+    return rows
+
+
+def ids_path(output):
+    return output + ".claim_ids.sqlite"
+
+
+class StreamHistory:
+    """
+    What a stream remembers across chunks: the claim_ids read so far (a SQLite table, so the set lives on disk) and
+    the newest claim date, from which fraud features older than the horizon are pruned.
+    """
+
+    def __init__(self, path, feature_store, horizon_days=HORIZON_DAYS):
+        self.path = path
+        self.feature_store = feature_store
+        widest = max((rule.window_days for rule in feature_store.velocity.rules), default=1)
+        self.horizon = pd.Timedelta(days=max(horizon_days, widest))
+        self.newest = None
+        if os.path.exists(path):
+            os.remove(path)    # rebuilt from the rows before the start point, see replay_fraud_features
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE seen (claim_id TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def _known(self, claim_ids):
+        known = set()
+        for start in range(0, len(claim_ids), 900):    # stay under SQLite's bound-parameter limit
+            part = claim_ids[start:start + 900]
+            rows = self._db.execute(f"SELECT claim_id FROM seen WHERE claim_id IN ({','.join('?' * len(part))})", part)
+            known.update(row[0] for row in rows)
+        return known
+
+    def add(self, frame):
+        """
+        Record a chunk's claim_ids and add its first-seen claims to the fraud features. Returns a mask of the rows
+        seen for the first time: False for a claim_id repeated in the chunk or read in an earlier chunk (rows
+        without a claim_id count as new).
+        """
+        ids = frame["claim_id"]
+        unique = ids.dropna().drop_duplicates().tolist()
+        known = self._known(unique)
+        self._db.executemany("INSERT OR IGNORE INTO seen VALUES (?)", ((claim_id,) for claim_id in unique))
+        self._db.commit()
+        fresh = ids.isna().to_numpy() | (~ids.duplicated(keep="first").to_numpy() & ~_in(ids, known))
+        self.feature_store.add_claims(frame[fresh])
+        return fresh
+
+    def prune(self, frame):
+        """After a chunk: forget fraud features dated more than the horizon before the newest date read"""
+        newest = frame["date"].max() if "date" in frame.columns else None
+        if pd.isna(newest):
+            return
+        self.newest = newest if self.newest is None else max(self.newest, newest)
+        self.feature_store.prune(self.newest - self.horizon)
+
+    def close(self):
+        self._db.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _in(series, values):
+    return np.fromiter((value in values for value in series.tolist()), dtype=bool, count=len(series))
+
+
+def replay_fraud_features(path, end_row, history, chunk_size=CHUNK_SIZE):
+    """
+    Feed the rows before a resume point through the stream history (claim_ids, fraud features and pruning, chunk by
+    chunk as the live run did), so a resumed run scores and de-duplicates the remaining claims exactly like an
+    uninterrupted one.
+    """
+    for chunk in iter_claim_chunks(path, chunk_size, columns=FRAUD_FEATURE_COLUMNS):
+        if chunk.first_row >= end_row:
+            return
+        frame = chunk.frame.iloc[:end_row - chunk.first_row]
+        history.add(frame)
+        history.prune(frame)
+
+
+# 3. The pipeline
+def _rejection_row(claim, error):
+    return {
+        "claim_id": claim.get("claim_id"),
+        "patient_id": claim.get("patient_id"),
+        "procedure_code": claim.get("procedure_code"),
+        "status": STATUS_REJECTED,
+        "reason": error,
+    }
+
+
+async def run_stream_async(path, output, chunk_size=CHUNK_SIZE, start_row=0, start_byte=None, resume=False,
+                           concurrency=8, mode="thread", timeout=120.0, retries=2, retry_backoff=1.0,
+                           horizon_days=HORIZON_DAYS):
+    """Adjudicate every claim of a CSV file chunk by chunk; returns a throughput summary"""
+    statuses = Counter()
+    if resume:
+        progress = load_progress(output, path)
+        if progress is not None:
+            start_row, start_byte = progress["rows_done"], progress["byte_offset"]
+            statuses.update(progress.get("statuses", {}))
+            if progress.get("output_bytes") is not None:
+                truncate_output(output, progress["output_bytes"])
+    if start_byte is not None and not start_row:
+        # the fraud features must see every row before the resume point, so the row count is needed too
+        start_row = count_rows(path, start_byte)
+    feature_store = get_fraud_feature_store()
+    history = StreamHistory(ids_path(output), feature_store, horizon_days)
+    try:
+        if start_row:
+            with span("stream", "replay_fraud_features", rows=start_row):
+                replay_fraud_features(path, start_row, history, chunk_size)
+        return await _stream_chunks(path, output, history, statuses, chunk_size, start_row, start_byte,
+                                    concurrency, mode, timeout, retries, retry_backoff)
+    finally:
+        history.close()
+
+
+async def _stream_chunks(path, output, history, statuses, chunk_size, start_row, start_byte, concurrency, mode,
+                         timeout, retries, retry_backoff):
+    writer = DecisionWriter(output, append=bool(start_row or start_byte))
+    workflow = compile_workflow(use_async=(mode == "async"))
+    claim_store = get_claim_store()
+    feature_store = history.feature_store
+
+    started = time.perf_counter()
+    rows_read = 0
+    for chunk in iter_claim_chunks(path, chunk_size, start_row, start_byte):
+        frame = chunk.frame
+        rows_read += len(frame)
+
+        # a. one vectorized validation pass; the fraud features see every claim in the file once, valid or not
+        with span("stream", "validate_chunk", rows=len(frame)):
+            validation = validate_claims_batch(frame)
+            fresh = history.add(frame)
+
+        # b. rejections are final here; survivors go through the workflow. A claim_id read before (in this chunk
+        # or an earlier one) is rejected as a duplicate
+        has_id = frame["claim_id"].notna().to_numpy()
+        first_rows = frame[has_id & fresh]
+        repeated = frame[has_id & ~fresh]
+        survivors = []
+        for claim in first_rows.to_dict("records"):
+            result = validation.get(claim["claim_id"])
+            if result is not None and not result["valid"]:
+                writer.add(_rejection_row(claim, result["error"]))
+                statuses[STATUS_REJECTED] += 1
+            else:
+                survivors.append(claim)
+        for claim in frame[frame["claim_id"].isna()].to_dict("records"):
+            writer.add(_rejection_row(claim, "Missing or empty mandatory fields: claim_id"))
+            statuses[STATUS_REJECTED] += 1
+        for claim in repeated.to_dict("records"):
+            writer.add(_rejection_row(claim, f"Duplicate claim_id {claim['claim_id']} in the file"))
+            statuses[STATUS_REJECTED] += 1
+
+        # c. the survivors are visible to the agents only while their chunk is being adjudicated; their velocity
+        # windows are scored for the whole chunk at once instead of claim by claim in the fraud agent
+        survivor_ids = claim_store.add_claims(survivors)
+        if survivors:
+            feature_store.prepare_velocity(pd.DataFrame(survivors))
+        try:
+            with span("stream", "adjudicate_chunk", claims=len(survivor_ids)):
+                summary = await run_batch_async(
+                    survivor_ids, output, concurrency=concurrency, mode=mode, timeout=timeout, retries=retries,
+                    retry_backoff=retry_backoff, workflow=workflow, writer=writer,
+                )
+            statuses.update(summary["statuses"])
+        finally:
+            claim_store.remove_claims(survivor_ids)
+
+        history.prune(frame)
+        writer.flush()
+        save_progress(output, path, chunk.end_row, chunk.end_byte, statuses)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "rows": rows_read,
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_read / elapsed, 3) if elapsed else None,
+        "statuses": dict(statuses),
+        "output": output,
+    }
+
+
+def run_stream(path, output, **kwargs):
+    return asyncio.run(run_stream_async(path, output, **kwargs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Adjudicate a large claims CSV in bounded-memory chunks.")
+    parser.add_argument("path", help="claims CSV with the same columns as data/claims.csv")
+    parser.add_argument("--output", default="data/stream_decisions.csv", help="results CSV")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--resume", action="store_true", help="continue after the last finished chunk")
+    parser.add_argument("--start-row", type=int, default=0, help="skip this many rows")
+    parser.add_argument("--start-byte", type=int, default=None,
+                        help="seek to this byte offset (a row boundary); rows before it are counted without --start-row")
+    parser.add_argument("--horizon-days", type=int, default=HORIZON_DAYS,
+                        help="fraud history kept before the newest claim date read (memory bound)")
+    parser.add_argument("--concurrency", type=int, default=8, help="claims in flight at once")
+    parser.add_argument("--mode", choices=["thread", "async"], default="thread")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds per claim attempt")
+    parser.add_argument("--retries", type=int, default=2, help="retries after a failed or timed-out attempt")
+    parser.add_argument("--retry-backoff", type=float, default=1.0, help="base seconds for exponential backoff")
+    args = parser.parse_args(argv)
+
+    summary = run_stream(
+        args.path,
+        args.output,
+        chunk_size=args.chunk_size,
+        start_row=args.start_row,
+        start_byte=args.start_byte,
+        resume=args.resume,
+        horizon_days=args.horizon_days,
+        concurrency=args.concurrency,
+        mode=args.mode,
+        timeout=args.timeout,
+        retries=args.retries,
+        retry_backoff=args.retry_backoff,
+    )
+    print(f"Processed {summary['rows']} rows in {summary['elapsed_seconds']}s "
+          f"({summary['rows_per_second']} rows/s) -> {summary['output']}")
+    for status, count in sorted(summary["statuses"].items()):
+        print(f"  {status}: {count}")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,285 @@
 # src/data_loader.py
+import argparse
+import hashlib
+import os
+import threading
 import pandas as pd
 """
 This module loads the insurance data from the CSV files.
+The tables are loaded once per process and shared by every agent. refresh_data() re-reads only the files
+whose mtime or content hash changed since the last load, and reload_data() forces a re-read of everything.
+Each CSV is parsed once with the explicit column types in SCHEMAS (categorical codes for low-cardinality columns,
+parsed dates, numbers) and converted to a Parquet file under COLUMNAR_DIR tagged with the CSV's hash; later loads
+read the columnar file instead of parsing text. load_table(name, columns) reads only the columns a caller needs.
+
+    python data_loader.py --convert      # (re)build the columnar files up front
 """
+DATA_FILES = {
+    "patients": "data/patients.csv",
+    "claims": "data/claims.csv",
+    "rules": "data/insurance_rules.csv",
+}
+
+COLUMNAR_DIR = os.getenv("COLUMNAR_DIR", ".cache/columnar")     # "" parses the CSVs on every load
+COLUMNAR_FORMAT = "2"   # bump when apply_schema changes, so columnar files written by older code are rebuilt
+DATE_FORMAT = "%m/%d/%y"
+UNPARSED_SUFFIX = "_unparsed"
+
+# Column types: "id" and "text" are strings, "category" is stored as categorical codes, "number" is int64 when
+# every value is a whole number (float64 otherwise) and "date" is parsed to datetime64. A date that is present but
+# cannot be parsed becomes NaT, and its raw text is kept in a "<column>_unparsed" companion column for validation
+SCHEMAS = {
+    "patients": {
+        "patient_id": "id",
+        "name": "text",
+        "age": "number",
+        "gender": "category",
+        "plan_id": "category",
+        "deductible_remaining": "number",
+        "oop_remaining": "number",
+        "chronic_conditions": "category",
+        "enrollment_state": "category",
+    },
+    "claims": {
+        "claim_id": "id",
+        "patient_id": "category",
+        "procedure_code": "category",
+        "diagnosis_code": "category",
+        "claim_amount": "number",
+        "date": "date",
+        "provider": "category",
+        "status": "category",
+    },
+    "rules": {
+        "plan_id": "category",
+        "procedure_code": "category",
+        "procedure_name": "text",
+        "covered": "category",
+        "prior_auth": "category",
+        "min_age": "number",
+        "max_age": "number",
+        "diagnosis_required": "category",
+        "max_visits_per_year": "number",
+        "notes": "text",
+    },
+}
+
+_lock = threading.RLock()
+_tables = {}
+_fingerprints = {}
+_projections = {}
+_data_version = 0
+_table_versions = {}
+
+
+def _file_hash(path):
+    """SHA-256 of the file content, read in blocks so large files do not need to fit in memory"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_number(values):
+    numbers = pd.to_numeric(values, errors="coerce")
+    if numbers.notna().all() and (numbers % 1 == 0).all():
+        return numbers.astype("int64")
+    return numbers.astype("float64")
+
+
+def unparsed_column(column):
+    """Name of the column holding the raw text of the `column` values that are not a valid date"""
+    return column + UNPARSED_SUFFIX
+
+
+def _to_date(values):
+    """Parsed dates, and the raw text of the non-blank values that could not be parsed (NA elsewhere)"""
+    dates = pd.to_datetime(values, format=DATE_FORMAT, errors="coerce")
+    # anything not in the usual m/d/yy form gets a second, format-sniffing pass
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], format="mixed", errors="coerce")
+    text = values.astype("str")
+    unparsed = dates.isna() & values.notna() & text.str.strip().ne("")
+    return dates, text.where(unparsed)
+
+
+def csv_dtypes(name):
+    """read_csv dtype argument for a table: every non-numeric schema column is read as a string"""
+    return {column: "str" for column, kind in SCHEMAS.get(name, {}).items() if kind != "number"}
+
+
+def apply_schema(name, frame):
+    """Convert the columns of a freshly parsed frame to the types in SCHEMAS (in place); returns the frame"""
+    for column, kind in SCHEMAS.get(name, {}).items():
+        if column not in frame.columns:
+            continue
+        if kind == "category":
+            frame[column] = frame[column].astype("category")
+        elif kind == "number":
+            frame[column] = _to_number(frame[column])
+        elif kind == "date":
+            frame[column], frame[unparsed_column(column)] = _to_date(frame[column])
+    return frame
+
+
+def read_csv_typed(name, path=None):
+    """Parse a table's CSV with the explicit column types from SCHEMAS (columns not in the schema are inferred)"""
+    return apply_schema(name, pd.read_csv(path or DATA_FILES[name], dtype=csv_dtypes(name)))
+
+
+def _columnar_path(name):
+    return os.path.join(COLUMNAR_DIR, f"{name}.parquet")
+
+
+def _columnar_source_hash(path):
+    """CSV hash recorded in a columnar file's metadata, or None when the file is missing, unreadable or outdated"""
+    import pyarrow.parquet as pq
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+    except (OSError, ValueError):
+        return None
+    value = metadata.get(b"source_sha256")
+    if not value or metadata.get(b"columnar_format", b"1").decode() != COLUMNAR_FORMAT:
+        return None
+    return value.decode()
+
+
+def convert_table(name, content_hash=None):
+    """Parse the CSV with its schema and write the columnar copy; returns the typed frame"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    frame = read_csv_typed(name)
+    content_hash = content_hash or _file_hash(DATA_FILES[name])
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        b"source_sha256": content_hash.encode(),
+        b"columnar_format": COLUMNAR_FORMAT.encode(),
+    })
+    path = _columnar_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    pq.write_table(table, path + ".tmp")
+    os.replace(path + ".tmp", path)
+    return frame
+
+
+def _read_table(name, content_hash=None, columns=None):
+    if not COLUMNAR_DIR:
+        frame = read_csv_typed(name)
+        return frame if columns is None else frame[list(columns)]
+    content_hash = content_hash or _file_hash(DATA_FILES[name])
+    path = _columnar_path(name)
+    if _columnar_source_hash(path) != content_hash:
+        frame = convert_table(name, content_hash)
+        return frame if columns is None else frame[list(columns)]
+    return pd.read_parquet(path, columns=list(columns) if columns is not None else None, memory_map=True)
+
+
+def refresh_data(force=False):
+    """
+    Re-read the tables whose source file changed on disk.
+    A file is only hashed when its mtime or size moved, and only re-parsed when the hash differs.
+    Returns the names of the tables that were (re)loaded.
+    """
+    global _data_version
+    changed = []
+    with _lock:
+        for name, path in DATA_FILES.items():
+            stat = os.stat(path)
+            previous = _fingerprints.get(name)
+            if not force and previous and name in _tables:
+                if (stat.st_mtime_ns, stat.st_size) == (previous["mtime_ns"], previous["size"]):
+                    continue
+                content_hash = _file_hash(path)
+                if content_hash == previous["sha256"]:
+                    # touched but not modified: remember the new mtime and keep the loaded frame
+                    previous["mtime_ns"] = stat.st_mtime_ns
+                    previous["size"] = stat.st_size
+                    continue
+            else:
+                content_hash = _file_hash(path)
+
+            _tables[name] = _read_table(name, content_hash)
+            _projections.pop(name, None)
+            _fingerprints[name] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": content_hash,
+            }
+            _table_versions[name] = _table_versions.get(name, 0) + 1
+            changed.append(name)
+
+        if changed:
+            _data_version += 1
+    return changed
+
+
+def reload_data():
+    """Force a re-read of every table, regardless of mtime or hash"""
+    return refresh_data(force=True)
+
+
+def get_data_version():
+    """Counter that moves every time a table is (re)loaded; caches built on the data compare against it"""
+    with _lock:
+        if not _tables:
+            refresh_data()
+        return _data_version
+
+
+def get_table_version(name):
+    """Like get_data_version, but only moves when this one table is (re)loaded"""
+    with _lock:
+        if not _tables:
+            refresh_data()
+        return _table_versions[name]
+
+
 def load_data():
-    patients_df = pd.read_csv("data/patients.csv")
-    claims_df = pd.read_csv("data/claims.csv")
-    rules_df = pd.read_csv("data/insurance_rules.csv")
-
-# Optional: expose as dictionary
-    return {
-        "patients": patients_df,
-        "claims": claims_df,
-        "rules": rules_df
-    }
+    with _lock:
+        if not _tables:
+            refresh_data()
+
+        # Optional: expose as dictionary
+        return {
+            "patients": _tables["patients"],
+            "claims": _tables["claims"],
+            "rules": _tables["rules"]
+        }
+
+
+def load_table(name, columns=None):
+    """
+    One table, or only the given columns of it. A projection is read straight from the columnar file (only those
+    columns are decoded) and kept until the table changes on disk.
+    """
+    with _lock:
+        if not _tables:
+            refresh_data()
+        if columns is None:
+            return _tables[name]
+        projections = _projections.setdefault(name, {})
+        key = tuple(columns)
+        if key not in projections:
+            projections[key] = _read_table(name, _fingerprints[name]["sha256"], columns)
+        return projections[key]
+
+
+def convert_all():
+    """Rebuild the columnar file of every table from its CSV"""
+    return {name: len(convert_table(name)) for name in DATA_FILES}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the CSV tables to the typed columnar format.")
+    parser.add_argument("--convert", action="store_true", help="rebuild every columnar file from its CSV")
+    args = parser.parse_args()
+    if args.convert:
+        for name, rows in convert_all().items():
+            print(f"{name}: {rows} rows -> {_columnar_path(name)}")
+    for name in DATA_FILES:
+        frame = load_table(name)
+        print(f"{name}: {len(frame)} rows, {frame.memory_usage(deep=True).sum() / 1e6:.2f} MB in memory")
+        print(frame.dtypes.to_string())
@@ -1,7 +1,11 @@
 # src/eligibility_agent.py
 import pandas as pd
-from langchain.chat_models import init_chat_model
-from data_loader import load_data
+import registry
+from claim_store import get_claim_store
+from eligibility_rules import get_decision_table, DECIDED_BY_LLM
+from visit_index import get_visit_index
+from llm_cache import cached_invoke, acached_invoke
+from llm_scheduler import PRIORITY_ELIGIBILITY
 import os
 from dotenv import load_dotenv
 load_dotenv()
@@ -10,48 +14,58 @@ import json
 """
 This module checks the eligibility of a claim using patient info, claim info, and insurance rules.you are creating data frames with all the 
 data from csv and passing it to the LLM to make a decision on whether the claim is eligible or not.the response from LLM is Json
+Clear-cut claims are settled first by the compiled rule table in eligibility_rules; every result has a "decided_by" key
+saying whether the rule engine or the LLM made the call.
 """
-# Load all data
-data_store = load_data()
-patients_df = data_store["patients"]
-claims_df = data_store["claims"]
-rules_df = data_store["rules"]
-
-# STEP 1: Initialize Gemini LLM
-llm = init_chat_model(
-    model="gemini-2.0-flash",
-    model_provider="google_genai",
-    temperature=0.5,
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
-
-def eligibility_agent(claim_id: str):
-    """Check eligibility of a claim using patient info, claim info, and insurance rules"""
+MODEL_NAME = "gemini-2.0-flash"
+TEMPERATURE = 0.5
+
+# STEP 1: Gemini LLM, created on first use through the registry (nothing is built at import)
+LLM_SERVICE = "eligibility_llm"
+
+
+def _build_llm():
+    from langchain.chat_models import init_chat_model
+    return init_chat_model(
+        model=MODEL_NAME,
+        model_provider="google_genai",
+        temperature=TEMPERATURE,
+        api_key=os.getenv("GOOGLE_API_KEY")
+    )
+
+
+registry.register(LLM_SERVICE, _build_llm)
+
+def _prepare_eligibility(claim_id: str):
+    """Return (result, None) when the claim is settled without the LLM, else (None, prompt) for Gemini"""
+
+    claim_store = get_claim_store()
 
     # 1. Get claim
-    claim = claims_df[claims_df["claim_id"] == claim_id]
-    if claim.empty:
-        return f"Claim ID {claim_id} not found"
-    claim = claim.iloc[0].to_dict()
+    claim = claim_store.get_claim(claim_id)
+    if claim is None:
+        return f"Claim ID {claim_id} not found", None
 
     # 2. Get patient
-    patient = patients_df[patients_df["patient_id"] == claim["patient_id"]]
-    if patient.empty:
-        return f"Patient ID {claim['patient_id']} not found"
-    patient = patient.iloc[0].to_dict()
+    patient = claim_store.get_patient(claim["patient_id"])
+    if patient is None:
+        return f"Patient ID {claim['patient_id']} not found", None
 
     # 3. Get insurance rule
     plan_id = patient.get("plan_id")
     procedure_code = claim["procedure_code"]
-    rule = rules_df[
-        (rules_df["plan_id"] == plan_id) & 
-        (rules_df["procedure_code"] == procedure_code)
-    ]
-    if rule.empty:
-        return f"No insurance rule found for plan {plan_id} and procedure {procedure_code}"
-    rule = rule.iloc[0].to_dict()
-
-    # 4. Create prompt for Gemini
+    rule = claim_store.get_rule(plan_id, procedure_code)
+    if rule is None:
+        return f"No insurance rule found for plan {plan_id} and procedure {procedure_code}", None
+
+    # 4. Deterministic fast path: not covered, age out of range, visit limit used up (O(1) lookup in the
+    #    visit index), or covered with a plain prior auth flag
+    prior_visits = get_visit_index().visits_for_claim(claim)
+    decision = get_decision_table().decide(claim, patient, prior_visits=prior_visits)
+    if decision is not None:
+        return decision, None
+
+    # 5. Create prompt for Gemini
     prompt = f"""
     You are an insurance eligibility checker.
 
@@ -63,6 +77,8 @@ def eligibility_agent(claim_id: str):
     Insurance Rule:
     #{rule}
 
+    Approved visits for this procedure in the claim's year so far: {prior_visits if prior_visits is not None else "unknown"}
+
     Task:
     - Decide if this claim is eligible for coverage.
     - Check patient age, gender, plan, and procedure rules.
@@ -74,17 +90,44 @@ def eligibility_agent(claim_id: str):
         "prior_auth_required": true/false
       }}
     """
+    return None, prompt
+
 
-    # 5. Invoke Gemini
-    response = llm.invoke(prompt)
+def _parse_eligibility(content: str):
     try:
-        result = json.loads(response.content)
+        result = json.loads(content)
     except json.JSONDecodeError:
         # fallback if LLM doesn't return valid JSON
-        result = {"eligible": False, "reason": response.content.strip(), "prior_auth_required": False}
-    
+        result = {"eligible": False, "reason": content.strip(), "prior_auth_required": False}
+
+    result["decided_by"] = DECIDED_BY_LLM
     return result
 
+
+def eligibility_agent(claim_id: str, use_cache: bool = True):
+    """Check eligibility of a claim using patient info, claim info, and insurance rules"""
+    result, prompt = _prepare_eligibility(claim_id)
+    if prompt is None:
+        return result
+
+    # 6. Invoke Gemini (through the shared response cache)
+    llm = registry.get(LLM_SERVICE)
+    content = cached_invoke(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache,
+                            priority=PRIORITY_ELIGIBILITY)
+    return _parse_eligibility(content)
+
+
+async def aeligibility_agent(claim_id: str, use_cache: bool = True):
+    """Async eligibility_agent: the Gemini call is awaited, so many claims can share one event loop"""
+    result, prompt = _prepare_eligibility(claim_id)
+    if prompt is None:
+        return result
+
+    llm = registry.get(LLM_SERVICE)
+    content = await acached_invoke(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache,
+                                   priority=PRIORITY_ELIGIBILITY)
+    return _parse_eligibility(content)
+
 """
 # Test the agent
 if __name__ == "__main__":
@@ -0,0 +1,144 @@
+# src/eligibility_rules.py
+import threading
+from collections import namedtuple
+import pandas as pd
+from data_loader import load_data, get_data_version
+from visit_index import visit_year
+
+"""
+This module compiles insurance_rules.csv into an in-memory decision table so the eligibility agent can settle
+clear-cut claims (procedure not covered, patient age out of range, yearly visit limit used up, covered with a
+known prior auth flag) without calling the LLM. Anything the structured columns cannot decide, like a required
+diagnosis, a gender-specific procedure or a conditional note, is left to Gemini.
+"""
+DECIDED_BY_RULES = "rule_engine"
+DECIDED_BY_LLM = "llm"
+
+CompiledRule = namedtuple(
+    "CompiledRule",
+    ["procedure_name", "covered", "prior_auth", "min_age", "max_age", "max_visits", "needs_review"],
+)
+
+
+def _yes_no(value):
+    """Map the Yes/No columns to True/False, or None when the value is not a clear yes or no"""
+    if isinstance(value, str):
+        value = value.strip().lower()
+        if value in ("yes", "y", "true"):
+            return True
+        if value in ("no", "n", "false"):
+            return False
+    if isinstance(value, bool):
+        return value
+    return None
+
+
+def _number(value):
+    number = pd.to_numeric(value, errors="coerce")
+    return None if pd.isna(number) else float(number)
+
+
+def _compile_rule(rule):
+    diagnosis_required = str(rule.get("diagnosis_required", "none")).strip().lower()
+    notes = str(rule.get("notes", "")).lower()
+    return CompiledRule(
+        procedure_name=rule.get("procedure_name"),
+        covered=_yes_no(rule.get("covered")),
+        prior_auth=_yes_no(rule.get("prior_auth")),
+        min_age=_number(rule.get("min_age")),
+        max_age=_number(rule.get("max_age")),
+        max_visits=_number(rule.get("max_visits_per_year")),
+        # a diagnosis requirement, a gender-specific note or a conditional note ("covered if ...")
+        # needs judgement beyond the structured columns, so the LLM decides
+        needs_review=(
+            diagnosis_required not in ("none", "", "nan")
+            or "specific" in notes
+            or " if " in f" {notes} "
+        ),
+    )
+
+
+class EligibilityDecisionTable:
+    """(plan_id, procedure_code) -> CompiledRule, with a decide() that returns None when the LLM is needed"""
+
+    def __init__(self, rules_df):
+        self._rules = {}
+        for rule in rules_df.to_dict("records"):
+            # first row wins, like the .iloc[0] lookup the agent used to do
+            self._rules.setdefault((rule["plan_id"], rule["procedure_code"]), _compile_rule(rule))
+
+    def decide(self, claim, patient, prior_visits=None):
+        """
+        Return an eligibility result dict for clear-cut claims, or None if the rule table cannot decide.
+        prior_visits is the number of approved visits for this patient and procedure in the claim's year
+        (from visit_index); None skips the max_visits_per_year check.
+        """
+        plan_id = patient.get("plan_id")
+        procedure_code = claim.get("procedure_code")
+        rule = self._rules.get((plan_id, procedure_code))
+        if rule is None or rule.covered is None:
+            return None
+        procedure = f"{rule.procedure_name} ({procedure_code})"
+
+        # 1. Not covered by the plan at all
+        if rule.covered is False:
+            return {
+                "eligible": False,
+                "reason": f"{procedure} is not covered under plan {plan_id}",
+                "prior_auth_required": bool(rule.prior_auth),
+                "decided_by": DECIDED_BY_RULES,
+            }
+
+        # 2. Patient age outside the covered range
+        age = _number(patient.get("age"))
+        if age is None or rule.min_age is None or rule.max_age is None:
+            return None
+        if not rule.min_age <= age <= rule.max_age:
+            return {
+                "eligible": False,
+                "reason": (
+                    f"Patient age {patient.get('age')} is outside the covered range "
+                    f"{rule.min_age:g}-{rule.max_age:g} for {procedure} under plan {plan_id}"
+                ),
+                "prior_auth_required": bool(rule.prior_auth),
+                "decided_by": DECIDED_BY_RULES,
+            }
+
+        # 3. Yearly visit limit already used up
+        if prior_visits is not None and rule.max_visits is not None and prior_visits >= rule.max_visits:
+            return {
+                "eligible": False,
+                "reason": (
+                    f"Visit limit reached for {procedure}: {prior_visits} approved visit(s) in "
+                    f"{visit_year(claim.get('date'))}, maximum {rule.max_visits:g} per year under plan {plan_id}"
+                ),
+                "prior_auth_required": bool(rule.prior_auth),
+                "decided_by": DECIDED_BY_RULES,
+            }
+
+        # 4. Covered, in range and under the visit limit; only the prior auth flag is left to report
+        if rule.needs_review or rule.prior_auth is None:
+            return None
+        auth_note = "prior authorization required" if rule.prior_auth else "no prior authorization required"
+        return {
+            "eligible": True,
+            "reason": f"{procedure} is covered under plan {plan_id} for age {patient.get('age')}; {auth_note}",
+            "prior_auth_required": rule.prior_auth,
+            "decided_by": DECIDED_BY_RULES,
+        }
+
+
+_decision_table = None
+_decision_table_version = None
+_decision_table_lock = threading.Lock()
+
+
+def get_decision_table():
+    """Return the process-wide decision table, recompiled only after the rules table has been reloaded"""
+    global _decision_table, _decision_table_version
+    with _decision_table_lock:
+        version = get_data_version()
+        if _decision_table is None or _decision_table_version != version:
+            _decision_table = EligibilityDecisionTable(load_data()["rules"])
+            _decision_table_version = version
+        return _decision_table
@@ -0,0 +1,155 @@
+# src/embedding_service.py
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from instrumentation import span
+from dotenv import load_dotenv
+load_dotenv()
+
+"""
+This module wraps the embedding model used for policy chunks and queries in one long-lived service.
+Vectors are cached by a hash of (model, kind, text) in memory and in a SQLite file, and cache misses are sent to
+the embedding client in batches of EMBEDDING_BATCH_SIZE, so ingestion and the templated per-claim queries don't
+embed the same text twice. The service is a LangChain Embeddings, so it plugs into Pinecone and the local index.
+"""
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")  # "" keeps the cache in memory only
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+EMBEDDING_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_MEMORY_ENTRIES", 4096))
+
+
+class EmbeddingService(Embeddings):
+    """Caching, batching front for a LangChain embeddings client"""
+
+    def __init__(self, client, model_name, cache_path=EMBEDDING_CACHE_PATH, batch_size=EMBEDDING_BATCH_SIZE,
+                 max_memory_entries=EMBEDDING_MEMORY_ENTRIES):
+        self.client = client
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.max_memory_entries = max_memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.client_calls = 0
+
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+            self._db.commit()
+
+    def _key(self, kind, text):
+        return hashlib.sha256(f"{self.model_name}\n{kind}\n{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # 1. Cache lookups
+    def _lookup(self, keys):
+        """Return {key: vector} for every key found in memory or on disk"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            missing = [key for key in keys if key not in found]
+            if self._db is not None:
+                # SQLite caps the number of bound parameters, so look up in slices
+                for start in range(0, len(missing), 500):
+                    part = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                        self._remember(key, vector)
+                        found[key] = vector
+        return found
+
+    def _store(self, items):
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in items],
+                )
+                self._db.commit()
+
+    # 2. Embedding with batched misses
+    def _embed(self, texts, kind):
+        texts = list(texts)
+        with span("embedding", f"{self.model_name}:{kind}", texts=len(texts)) as current:
+            keys = [self._key(kind, text) for text in texts]
+            found = self._lookup(list(dict.fromkeys(keys)))
+
+            # each distinct missing text is embedded once, in client batches of batch_size
+            pending = list(dict.fromkeys((key, text) for key, text in zip(keys, texts) if key not in found))
+            batches = 0
+            for start in range(0, len(pending), self.batch_size):
+                batch = pending[start:start + self.batch_size]
+                if kind == "query" and len(batch) == 1:
+                    vectors = [self.client.embed_query(batch[0][1])]
+                else:
+                    vectors = self.client.embed_documents([text for _, text in batch])
+                batches += 1
+                items = [(key, list(vector)) for (key, _), vector in zip(batch, vectors)]
+                self._store(items)
+                found.update(items)
+
+            with self._lock:
+                self.client_calls += batches
+                self.misses += len(pending)
+                self.hits += len(texts) - len(pending)
+            current.set(cache_hits=len(texts) - len(pending), embedded=len(pending), client_batches=batches,
+                        cache_hit=not pending)
+            return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed(texts, "document")
+
+    def embed_query(self, text):
+        return self._embed([text], "query")[0]
+
+    def embed_queries(self, texts):
+        """Embed many queries at once; misses go out in batches like documents do"""
+        return self._embed(texts, "query")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "client_calls": self.client_calls,
+                "memory_entries": len(self._memory),
+            }
+
+
+_embedding_services = {}
+_embedding_services_lock = threading.Lock()
+
+
+def get_embedding_service(backend):
+    """Return the long-lived EmbeddingService for a backend ("openai" or "hash"), creating its client once"""
+    with _embedding_services_lock:
+        if backend not in _embedding_services:
+            if backend == "hash":
+                from local_vectorstore import HashEmbeddings
+                client = HashEmbeddings()
+                model_name = f"hash-{client.dimension}"
+            else:
+                from langchain_openai import OpenAIEmbeddings
+                model_name = "text-embedding-ada-002"
+                client = OpenAIEmbeddings(model=model_name)
+            _embedding_services[backend] = EmbeddingService(client, model_name)
+        return _embedding_services[backend]
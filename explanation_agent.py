@@ -1,7 +1,10 @@
 # src/explanation_agent.py
-from langchain.chat_models import init_chat_model
+import asyncio
+import registry
 import os
 from dotenv import load_dotenv
+from llm_cache import cached_invoke, acached_invoke, cached_stream
+from llm_scheduler import PRIORITY_EXPLANATION
 
 load_dotenv()
 
@@ -9,19 +12,26 @@ load_dotenv()
 This module explains the decision of the claim workflow to a claims officer.it collects the results from all the other agents and 
 produces a human-readable explanation with policy references.
 """
-# Initialize Gemini
-llm = init_chat_model(
-    model="gemini-2.0-flash",
-    model_provider="google_genai",
-    temperature=0.7,
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
-
-def explanation_agent(workflow_result: dict):
-    """
-    Take workflow results and produce a human-readable explanation with policy references.
-    """
+MODEL_NAME = "gemini-2.0-flash"
+TEMPERATURE = 0.7
+
+# Gemini, created on first use through the registry (nothing is built at import)
+LLM_SERVICE = "explanation_llm"
+
+
+def _build_llm():
+    from langchain.chat_models import init_chat_model
+    return init_chat_model(
+        model=MODEL_NAME,
+        model_provider="google_genai",
+        temperature=TEMPERATURE,
+        api_key=os.getenv("GOOGLE_API_KEY")
+    )
 
+
+registry.register(LLM_SERVICE, _build_llm)
+
+def _explanation_prompt(workflow_result: dict):
     claim_id = workflow_result.get("claim_id")
     status = workflow_result.get("status")
     validation = workflow_result.get("validation_result", {})
@@ -29,7 +39,7 @@ def explanation_agent(workflow_result: dict):
     policy = workflow_result.get("policy_response", "")
     fraud = workflow_result.get("fraud_result", {})
 
-    prompt = f"""
+    return f"""
     You are an expert insurance claims explainer. 
     Summarize the claim decision for a claims officer in plain English.
 
@@ -48,6 +58,66 @@ def explanation_agent(workflow_result: dict):
     - Keep it professional and concise.
     """
 
-    response = llm.invoke(prompt)
-    print("this is from explanination agent:::",response.content.strip())
-    return response.content.strip()
+
+def explanation_agent(workflow_result: dict, use_cache: bool = True, on_token=None):
+    """
+    Take workflow results and produce a human-readable explanation with policy references.
+    Pass on_token to receive the text as it is generated (the UI renders it token by token).
+    """
+    prompt = _explanation_prompt(workflow_result)
+    llm = registry.get(LLM_SERVICE)
+    if on_token is None:
+        content = cached_invoke(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache,
+                                priority=PRIORITY_EXPLANATION)
+    else:
+        parts = []
+        for text in cached_stream(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache):
+            on_token(text)
+            parts.append(text)
+        content = "".join(parts)
+    return content.strip()
+
+
+async def aexplanation_agent(workflow_result: dict, use_cache: bool = True, on_token=None):
+    """
+    Async explanation_agent: the Gemini call is awaited instead of blocking a thread.
+    With on_token the response is streamed in a worker thread and every token is handed to on_token on the event loop.
+    """
+    if on_token is not None:
+        loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(explanation_agent, workflow_result, use_cache,
+                                       lambda token: loop.call_soon_threadsafe(on_token, token))
+    prompt = _explanation_prompt(workflow_result)
+    llm = registry.get(LLM_SERVICE)
+    content = await acached_invoke(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache,
+                                   priority=PRIORITY_EXPLANATION)
+    return content.strip()
+
+
+def template_explanation(workflow_result: dict):
+    """
+    Cheap, LLM-free explanation for claims that stopped early (rejected in validation or denied in eligibility).
+    Nothing downstream ran for these claims, so there is no policy or fraud evidence to summarize.
+    """
+    claim_id = workflow_result.get("claim_id")
+    status = workflow_result.get("status")
+    validation = workflow_result.get("validation_result") or {}
+    eligibility = workflow_result.get("eligibility_result")
+
+    if validation and not validation.get("valid", True):
+        return (
+            f"Claim {claim_id} was rejected during validation ({status}). "
+            f"Reason: {validation.get('error')}. "
+            "The claim was not checked for eligibility, policy coverage or fraud; correct the data and resubmit."
+        )
+
+    if isinstance(eligibility, dict):
+        reason = eligibility.get("reason")
+        prior_auth = " Prior authorization is required for this procedure." if eligibility.get("prior_auth_required") else ""
+    else:
+        reason, prior_auth = eligibility, ""
+    return (
+        f"Claim {claim_id} was denied ({status}). "
+        f"Reason: {reason}.{prior_auth} "
+        "Because the claim is not eligible, no policy review or fraud check was performed."
+    )
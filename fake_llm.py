@@ -0,0 +1,104 @@
+# src/fake_llm.py
+"""
+Local stand-in for the Gemini chat model, used to exercise the LLM scheduler, caches and workflow offline.
+FakeChatModel is a real LangChain chat model (invoke, batch, stream, ainvoke all work) that answers
+deterministically from the prompt, sleeps for a configurable latency and can answer with 429 rate-limit errors,
+either every Nth call or when more than quota_per_second calls arrive within one second.
+"""
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeChatModel to simulate a provider 429 / RESOURCE_EXHAUSTED response"""
+    status_code = 429
+
+    def __init__(self, message="429 Resource has been exhausted (e.g. check quota)."):
+        super().__init__(message)
+
+
+def _default_responder(prompt):
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+    return f"Fake response {digest}"
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic chat model with simulated latency and 429s"""
+
+    model: str = "fake-chat"
+    temperature: float = 0.0
+    latency: float = 0.0                        # seconds per call
+    rate_limit_every: int = 0                   # every Nth call raises FakeRateLimitError (0 = never)
+    quota_per_second: int = 0                   # more calls than this within one second raise (0 = unlimited)
+    responder: Optional[Callable[[str], str]] = None
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _recent: Any = PrivateAttr(default_factory=deque)
+    _calls: int = PrivateAttr(default=0)
+    _rate_limited: int = PrivateAttr(default=0)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    @property
+    def calls(self):
+        return self._calls
+
+    @property
+    def rate_limited(self):
+        return self._rate_limited
+
+    def _prompt_text(self, messages):
+        return "\n".join(str(message.content) for message in messages)
+
+    def _admit(self):
+        """Count the call and decide whether it gets a simulated 429"""
+        now = time.monotonic()
+        with self._lock:
+            self._calls += 1
+            while self._recent and now - self._recent[0] > 1.0:
+                self._recent.popleft()
+            throttled = (
+                (self.rate_limit_every and self._calls % self.rate_limit_every == 0)
+                or (self.quota_per_second and len(self._recent) >= self.quota_per_second)
+            )
+            if throttled:
+                self._rate_limited += 1
+            else:
+                self._recent.append(now)
+        if throttled:
+            raise FakeRateLimitError()
+
+    def _respond(self, messages):
+        self._admit()
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = self._prompt_text(messages)
+        text = (self.responder or _default_responder)(prompt)
+        input_tokens = max(1, len(prompt) // 4)
+        output_tokens = max(1, len(text) // 4)
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        return text, usage
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._respond(messages)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        text, usage = self._respond(messages)
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            token = word if i == 0 else " " + word
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=usage))
@@ -1,10 +1,7 @@
 # src/fraud_detection_agent.py
 import pandas as pd
-from data_loader import load_data
-
-# Load data
-data_store = load_data()
-claims_df = data_store["claims"]
+from claim_store import get_claim_store
+from fraud_features import get_fraud_feature_store
 
 """
 This module detects potential fraud in claims using claim amounts, patterns, and thresholds.
@@ -15,12 +12,21 @@ ANOMALOUS_THRESHOLD_FACTOR = 3  # For statistical outliers
 
 def fraud_agent(claim_id):
     """Check for potential fraud in a single claim."""
-    
-    claim_row = claims_df[claims_df["claim_id"] == claim_id]
-    if claim_row.empty:
+    claim = get_claim_store().get_claim(claim_id)
+    if claim is None:
         return {"claim_id": claim_id, "fraud_flag": False, "reason": "Claim not found"}
 
-    claim = claim_row.iloc[0].to_dict()
+    return score_claim(claim)
+
+
+def score_claim(claim, feature_store=None, counted=True):
+    """
+    Score one claim (dict) against the fraud feature store; O(1) lookups plus O(log n) velocity windows.
+    counted: the claim is already in the feature store (true for claims of the table and streamed claims).
+    """
+    if feature_store is None:
+        feature_store = get_fraud_feature_store()
+    claim_id = claim["claim_id"]
     fraud_flags = []
 
     # 1. High billed amount
@@ -28,25 +34,22 @@ def fraud_agent(claim_id):
         fraud_flags.append(f"High billed amount: ${claim['claim_amount']}")
 
     # 2. Duplicate claims
-    duplicates = claims_df[
-        (claims_df["patient_id"] == claim["patient_id"]) &
-        (claims_df["procedure_code"] == claim["procedure_code"]) &
-        (claims_df["provider"] == claim["provider"]) &
-        (claims_df["date"] == claim["date"]) &
-        (claims_df["claim_id"] != claim_id)
-    ]
-    if not duplicates.empty:
-        fraud_flags.append(f"Duplicate claim(s) found: {', '.join(duplicates['claim_id'].tolist())}")
+    duplicates = feature_store.duplicates_of(claim)
+    if duplicates:
+        fraud_flags.append(f"Duplicate claim(s) found: {', '.join(duplicates)}")
 
     # 3. Anomalous patterns (using simple z-score on claim_amount)
-    #The average claim amount across all claims.
-    mean_amount = claims_df["claim_amount"].mean()
+    #The average claim amount across all claims (kept as a running statistic).
+    mean_amount = feature_store.mean
     #The standard deviation of claim amounts.
-    std_amount = claims_df["claim_amount"].std()
+    std_amount = feature_store.std
     #This calculates how far the claim’s amount is from the average:
     if abs(claim["claim_amount"] - mean_amount) > ANOMALOUS_THRESHOLD_FACTOR * std_amount:
         fraud_flags.append(f"Anomalous claim amount: ${claim['claim_amount']} (mean: ${mean_amount:.2f})")
 
+    # 4. Velocity: too many claims for the same provider/procedure or patient in a sliding window of days
+    fraud_flags.extend(feature_store.velocity_violations(claim, counted))
+
     if fraud_flags:
         return {
             "claim_id": claim_id,
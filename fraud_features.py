@@ -0,0 +1,165 @@
+# src/fraud_features.py
+import math
+import threading
+import pandas as pd
+from data_loader import load_table, get_table_version
+from velocity import VelocityIndex, load_velocity_rules, velocity_columns
+
+"""
+This module keeps the features the fraud agent needs so a claim can be scored in O(1):
+running claim_amount statistics (Welford / Chan merge, same sample std as pandas .std()) and a hash index
+keyed on the duplicate tuple (patient_id, procedure_code, provider, date), plus the sliding-window velocity
+index from velocity.py. All of them update incrementally when claims are appended, instead of rescanning the whole
+claims table for every claim.
+"""
+DUPLICATE_KEY_COLUMNS = ["patient_id", "procedure_code", "provider", "date"]
+# the only claim columns the feature store reads (loaded as a column projection)
+FRAUD_FEATURE_COLUMNS = list(dict.fromkeys(
+    ["claim_id", "claim_amount"] + DUPLICATE_KEY_COLUMNS + velocity_columns(load_velocity_rules())
+))
+
+
+def _duplicate_key(claim):
+    """Tuple used to spot duplicate claims, or None if any part is missing (NaN never compares equal)"""
+    key = tuple(claim.get(column) for column in DUPLICATE_KEY_COLUMNS)
+    if any(part is None or pd.isna(part) for part in key):
+        return None
+    return key
+
+
+class FraudFeatureStore:
+    """Running amount statistics, a duplicate-claim index and velocity windows, updated as claims are appended"""
+
+    def __init__(self, claims_df=None):
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        # date -> {(patient_id, procedure_code, provider): claim_id, or a list of them when there are several};
+        # grouped by date so old dates are pruned in one step
+        self._duplicates = {}
+        self.velocity = VelocityIndex()
+        self._velocity_batch = {}
+        self._lock = threading.Lock()
+        if claims_df is not None:
+            self.add_claims(claims_df)
+
+    # 1. Amount statistics
+    def _merge_amounts(self, n, mean, m2):
+        """Chan et al. parallel merge of (count, mean, M2) into the running totals"""
+        if n == 0:
+            return
+        total = self.count + n
+        delta = mean - self._mean
+        self._mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    @property
+    def mean(self):
+        return self._mean if self.count else float("nan")
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1), like pandas Series.std()"""
+        if self.count < 2:
+            return float("nan")
+        return math.sqrt(self._m2 / (self.count - 1))
+
+    # 2. Appending claims
+    def _add_duplicate_key(self, key, claim_id):
+        claims = self._duplicates.setdefault(key[-1], {})
+        ids = claims.get(key[:-1])
+        if ids is None:
+            claims[key[:-1]] = claim_id
+        elif isinstance(ids, list):
+            ids.append(claim_id)
+        else:
+            claims[key[:-1]] = [ids, claim_id]
+
+    def add_claim(self, claim):
+        """Add one claim (dict) to the statistics and the duplicate index"""
+        amount = claim.get("claim_amount")
+        with self._lock:
+            if amount is not None and not pd.isna(amount):
+                self._merge_amounts(1, float(amount), 0.0)
+            key = _duplicate_key(claim)
+            if key is not None:
+                self._add_duplicate_key(key, claim.get("claim_id"))
+            self._velocity_batch = {}
+        self.velocity.add_claim(claim)
+
+    def add_claims(self, claims_df):
+        """Add a batch of claims; the batch statistics are computed with NumPy and merged in one step"""
+        amounts = pd.to_numeric(claims_df["claim_amount"], errors="coerce").dropna().to_numpy(dtype=float)
+        keys = claims_df.reindex(columns=DUPLICATE_KEY_COLUMNS)
+        complete = keys.notna().all(axis=1).to_numpy()
+        claim_ids = claims_df["claim_id"].to_numpy()[complete]
+        with self._lock:
+            if len(amounts):
+                batch_mean = amounts.mean()
+                self._merge_amounts(len(amounts), batch_mean, float(((amounts - batch_mean) ** 2).sum()))
+            for key, claim_id in zip(keys[complete].itertuples(index=False, name=None), claim_ids):
+                self._add_duplicate_key(key, claim_id)
+            self._velocity_batch = {}
+        self.velocity.add_claims(claims_df)
+
+    # 3. Lookups
+    def duplicates_of(self, claim):
+        """Other claim IDs with the same patient, procedure, provider and date, in the order they were added"""
+        key = _duplicate_key(claim)
+        if key is None:
+            return []
+        claim_id = claim.get("claim_id")
+        ids = self._duplicates.get(key[-1], {}).get(key[:-1], [])
+        return [other for other in (ids if isinstance(ids, list) else [ids]) if other != claim_id]
+
+    def prune(self, before):
+        """
+        Forget the duplicate and velocity keys of claims dated before `before` (a Timestamp), so a long stream keeps
+        only the days the checks can still reach; the amount statistics keep every claim.
+        """
+        with self._lock:
+            for date in [date for date in self._duplicates if isinstance(date, pd.Timestamp) and date < before]:
+                del self._duplicates[date]
+            self._velocity_batch = {}
+        self.velocity.prune(before)
+
+    def prepare_velocity(self, claims_df):
+        """
+        Score the velocity rules for a batch of claims already added to the store in one vectorized pass
+        (VelocityIndex.violations_batch); velocity_violations() answers those claims from the result until more
+        claims are added.
+        """
+        violations = self.velocity.violations_batch(claims_df)
+        batch = {claim_id: violations.get(claim_id, []) for claim_id in claims_df["claim_id"].dropna().tolist()}
+        with self._lock:
+            self._velocity_batch = batch
+
+    def velocity_violations(self, claim, counted=True):
+        """
+        Velocity rules the claim breaks (see velocity.py), as messages. counted says whether the claim was added to
+        the store already (claims of the table and streamed claims are); if not it is counted on top.
+        """
+        messages = self._velocity_batch.get(claim.get("claim_id")) if counted else None
+        if messages is not None:
+            return list(messages)
+        return self.velocity.violations(claim, counted)
+
+
+_fraud_feature_store = None
+_fraud_feature_store_version = None
+_fraud_feature_store_lock = threading.Lock()
+
+
+def get_fraud_feature_store():
+    """
+    Return the process-wide FraudFeatureStore, rebuilt only after the claims table has been reloaded; a reload of
+    the patients or rules keeps the claims added since (streamed or replayed)
+    """
+    global _fraud_feature_store, _fraud_feature_store_version
+    with _fraud_feature_store_lock:
+        version = get_table_version("claims")
+        if _fraud_feature_store is None or _fraud_feature_store_version != version:
+            _fraud_feature_store = FraudFeatureStore(load_table("claims", FRAUD_FEATURE_COLUMNS))
+            _fraud_feature_store_version = version
+        return _fraud_feature_store
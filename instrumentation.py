@@ -0,0 +1,277 @@
+# src/instrumentation.py
+"""
+Tracing and latency instrumentation for the claim workflow.
+Every graph node and every LLM, embedding and vector-search call runs inside a span that records its wall time plus
+whatever the call knows (prompt/completion tokens, cache hits, retrieval k). Spans of one claim are collected
+into a trace and appended as one JSON line to TRACE_PATH; every span also feeds in-process latency stats, so
+latency_summary() gives p50/p95/p99 per node and per call type. Set PROFILE_NODES=validation_agent,fraud_agent
+(or call profile_nodes) to run those nodes under cProfile and read the hot spots with profile_report().
+
+    python instrumentation.py .cache/traces/claims.jsonl      # percentiles from a trace file
+"""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from dotenv import load_dotenv
+load_dotenv()
+
+TRACE_PATH = os.getenv("TRACE_PATH", ".cache/traces/claims.jsonl")    # "" keeps traces in memory only
+TRACE_SAMPLES = int(os.getenv("TRACE_SAMPLES", 10000))                # latency samples kept per span name
+PROFILE_NODES = {name for name in os.getenv("PROFILE_NODES", "").split(",") if name}
+
+_current_trace = contextvars.ContextVar("claim_trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class Span:
+    """One timed operation; attributes are free-form (tokens, cache_hit, k, ...)"""
+    __slots__ = ("kind", "name", "parent", "attrs", "started", "wall_ms", "error")
+
+    def __init__(self, kind, name, parent, attrs):
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.started = time.time()
+        self.wall_ms = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "parent": self.parent,
+            "started_at": round(self.started, 6),
+            "wall_ms": self.wall_ms,
+            "error": self.error,
+            **self.attrs,
+        }
+
+
+class ClaimTrace:
+    """Spans recorded while one claim runs (nodes of the parallel branches append from different threads)"""
+
+    def __init__(self, claim_id):
+        self.claim_id = claim_id
+        self.started = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self):
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            "claim_id": self.claim_id,
+            "started_at": round(self.started, 6),
+            "total_ms": round((time.time() - self.started) * 1000, 3),
+            "spans": spans,
+        }
+
+
+# 1. Aggregated latency stats
+class LatencyStats:
+    """Recent wall times per (kind, name) plus token and cache-hit totals"""
+
+    def __init__(self, max_samples=TRACE_SAMPLES):
+        self.max_samples = max_samples
+        self._samples = defaultdict(lambda: deque(maxlen=self.max_samples))
+        self._totals = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        key = f"{span.kind}:{span.name}"
+        with self._lock:
+            self._samples[key].append(span.wall_ms)
+            totals = self._totals[key]
+            totals["count"] += 1
+            if span.error:
+                totals["errors"] += 1
+            for attr in ("prompt_tokens", "completion_tokens"):
+                if span.attrs.get(attr):
+                    totals[attr] += span.attrs[attr]
+            if span.attrs.get("cache_hit"):
+                totals["cache_hits"] += 1
+
+    def summary(self):
+        with self._lock:
+            return {key: {**summarize(samples), **self._totals[key]} for key, samples in sorted(self._samples.items())}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(wall_times):
+    values = sorted(wall_times)
+    return {
+        "samples": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else None,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else None,
+    }
+
+
+_stats = LatencyStats()
+
+
+def latency_summary():
+    """p50/p95/p99 (and token/cache totals) per span, e.g. "node:policy_agent_node", "llm:gemini-2.0-flash" """
+    return _stats.summary()
+
+
+def reset_stats():
+    _stats.reset()
+
+
+# 2. Spans and traces
+@contextlib.contextmanager
+def span(kind, name, **attrs):
+    """Time the enclosed block; yields the Span so the caller can attach tokens, cache hits, k, ..."""
+    parent = _current_span.get()
+    current = Span(kind, name, parent.name if parent is not None else None, attrs)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as error:
+        current.error = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        current.wall_ms = round((time.perf_counter() - started) * 1000, 3)
+        _current_span.reset(token)
+        _stats.record(current)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(current)
+
+
+_trace_file_lock = threading.Lock()
+
+
+def write_trace(trace, path=TRACE_PATH):
+    if not path:
+        return
+    line = json.dumps(trace.to_dict(), default=str)
+    with _trace_file_lock:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+@contextlib.contextmanager
+def claim_trace(claim_id, path=TRACE_PATH):
+    """Collect every span of one claim run and append the trace as a JSON line when the run ends"""
+    trace = ClaimTrace(claim_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        write_trace(trace, path)
+
+
+# 3. Graph nodes
+_profiles = {}
+_profiles_lock = threading.Lock()
+
+
+def profile_nodes(names):
+    """Profile these (sync) nodes with cProfile from now on"""
+    PROFILE_NODES.update(names)
+
+
+def profile_report(name, top=20, sort="cumulative"):
+    """pstats report accumulated over every profiled run of a node"""
+    with _profiles_lock:
+        stats = _profiles.get(name)
+        if stats is None:
+            return f"No profile recorded for {name}"
+        out = io.StringIO()
+        stats.stream = out
+        stats.sort_stats(sort).print_stats(top)
+        return out.getvalue()
+
+
+def _profiled(name, fn, *args, **kwargs):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.disable()
+        with _profiles_lock:
+            if name in _profiles:
+                _profiles[name].add(profiler)
+            else:
+                _profiles[name] = pstats.Stats(profiler)
+
+
+def traced_node(name, fn):
+    """Wrap a graph node (sync or async) in a "node" span; keeps the signature so langgraph still passes config"""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with span("node", name):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with span("node", name):
+            if name in PROFILE_NODES:
+                return _profiled(name, fn, *args, **kwargs)
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+# 4. Reading trace files
+def summarize_trace_file(path=TRACE_PATH):
+    """Per-span percentiles and totals from a JSONL trace file (one claim per line)"""
+    wall_times = defaultdict(list)
+    claims = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            trace = json.loads(line)
+            claims.append(trace["total_ms"])
+            for recorded in trace["spans"]:
+                wall_times[f"{recorded['kind']}:{recorded['name']}"].append(recorded["wall_ms"])
+    summary = {"claim": summarize(claims)}
+    summary.update({key: summarize(values) for key, values in sorted(wall_times.items())})
+    return summary
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else TRACE_PATH
+    for key, row in summarize_trace_file(path).items():
+        print(f"{key:40s} n={row['samples']:<6} p50={row['p50_ms']}ms p95={row['p95_ms']}ms p99={row['p99_ms']}ms")
@@ -1,16 +1,34 @@
 # src/langgraph_workflow.py
 from typing_extensions import TypedDict
 from langgraph.graph import StateGraph, END
-from data_loader import load_data
+from langgraph.config import get_stream_writer
+from langchain_core.runnables import RunnableConfig
+import registry
+from claim_store import get_claim_store
+from fraud_features import get_fraud_feature_store
+from eligibility_rules import get_decision_table
+from visit_index import get_visit_index
 from validation_agent import validate_claims
-from eligibility_agent import eligibility_agent
-from policy_agent import policy_agent
+from eligibility_agent import eligibility_agent, aeligibility_agent
+from policy_agent import policy_agent, apolicy_agent
 from fraud_detection_agent import fraud_agent
-from explanation_agent import explanation_agent
-from IPython.display import Image, display
+from explanation_agent import explanation_agent, aexplanation_agent, template_explanation
+from single_flight import SingleFlight, AsyncSingleFlight
+from instrumentation import traced_node, claim_trace
 
 """
 This module defines the multi-agent insurance approval workflow using langgraph.   
+Claims rejected in validation or denied in eligibility are routed straight to a templated explanation and END,
+so they never pay for the policy, fraud or explanation LLM calls. Eligible claims fan out to the policy and fraud
+agents in parallel; both branches join in final_decision, the one place where the final status is computed.
+Every node returns only the keys it owns, so the parallel branches merge deterministically.
+build_graph(use_async=True) builds the same graph with async nodes (ainvoke end to end), and run_claim /
+arun_claim coalesce concurrent requests for the same claim onto a single in-flight execution.
+When the workflow is compiled with a checkpointer (see checkpoints.py) each claim is its own checkpoint thread, and
+run_claim / arun_claim resume an interrupted claim after its last finished node instead of starting it over.
+Every node runs in an instrumentation span and run_claim / arun_claim write one trace per claim (instrumentation.py).
+Importing this module builds nothing: data, LLM clients and the vector store are created on first use (registry.py),
+or up front with warmup().
 """
 
 
@@ -26,98 +44,234 @@ class State(TypedDict, total=False):
     explanation: str
 
 
-def build_graph():
-    """Build multi-agent insurance approval workflow with conditional edges."""
-    data_store = load_data()
+STATUS_REJECTED = "Rejected - Invalid Data"
+STATUS_DENIED = "Denied - Not Eligible"
+STATUS_FLAGGED = "Flagged for Fraud"
+STATUS_APPROVED = "Approved"
 
+
+# Set {"configurable": {STREAM_TOKENS: True}} and stream_mode "custom" to receive the explanation token by token
+STREAM_TOKENS = "stream_tokens"
+
+
+def final_status(state):
+    """Compute the claim status from the agent results; the only place a status is decided"""
+    validation = state.get("validation_result") or {}
+    if not validation.get("valid", False):
+        return STATUS_REJECTED
+    eligibility = state.get("eligibility_result") or {}
+    if eligibility.get("eligible") is not True:
+        return STATUS_DENIED
+    fraud = state.get("fraud_result") or {}
+    if fraud.get("fraud_flag"):
+        return STATUS_FLAGGED
+    return STATUS_APPROVED
+
+
+def _eligibility_update(result):
+    if isinstance(result, str):
+        # claim, patient or rule not found: nothing to be eligible for
+        result = {"eligible": False, "reason": result, "prior_auth_required": False}
+    return {"eligibility_result": result}
+
+
+def _policy_request(state):
+    """Arguments for the policy agent: the prompt, plus the plan and procedure that scope the retrieval"""
+    claim_id = state["claim_id"]
+
+    # Get claim info
+    claim_store = get_claim_store()
+    claim_info = claim_store.get_claim(claim_id)
+    patient_info = claim_store.get_patient(claim_info["patient_id"])
+    plan_id = patient_info.get("plan_id")
+    eligibility_result = state.get("eligibility_result", {})
+
+    # Build prompt for policy agent
+    decision = eligibility_result if isinstance(eligibility_result, str) else eligibility_result.get("decision", "Unknown")
+    query = f"""
+    Claim ID: {claim_id}
+    Plan: {plan_id}
+    Procedure: {claim_info['procedure_code']} ({claim_info.get('procedure_name', '')})
+
+    The eligibility agent marked this claim as: {decision}
+
+    Task for you, Policy Agent:
+    - Provide supporting excerpts from the policy documents related to this plan and procedure.
+    - Include any coverage notes, limitations, and prior authorization requirements.
+    - Format the response as a list of key excerpts.
+    """
+    return {"query": query, "plan_id": plan_id, "procedure_code": claim_info["procedure_code"]}
+
+
+def build_graph(use_async=False):
+    """
+    Build multi-agent insurance approval workflow with conditional edges.
+    With use_async=True the LLM nodes are coroutines (run the compiled graph with ainvoke/astream).
+    """
     # Validation Agent Node
     def validation_node(state: State):
         claim_id = state["claim_id"]
         result = validate_claims(claim_id)
-        state["validation_result"] = result
-        if result["valid"] is False:
-            state["status"] = "Rejected - Invalid Data"
-            return state
-        print("Validation Agent Node done")
-        return state
+        return {"validation_result": result}
 
     # Eligibility Agent Node
     def eligibility_node(state: State):
-        claim_id = state["claim_id"]
-        result = eligibility_agent(claim_id)
-        state["eligibility_result"] = result
-        if result["eligible"] is False:
-            state["status"] = "Denied - Not Eligible"
-            return state
-        print("Eligibility Agent Node done")
-        return state
-
+        result = eligibility_agent(state["claim_id"])
+        return _eligibility_update(result)
 
+    async def aeligibility_node(state: State):
+        return _eligibility_update(await aeligibility_agent(state["claim_id"]))
 
     # Policy Agent Node (LLM + Vector DB) - supporting evidence
     def policy_agent_node(state: State):
-        claim_id = state["claim_id"]
+        response = policy_agent(**_policy_request(state))
+        return {"policy_response": response}
 
-        # Get claim info
-        claim_info = data_store["claims"][data_store["claims"]["claim_id"] == claim_id].iloc[0].to_dict()
-        patient_info = data_store["patients"][data_store["patients"]["patient_id"] == claim_info["patient_id"]].iloc[0].to_dict()
-        plan_id = patient_info.get("plan_id")
-        eligibility_result = state.get("eligibility_result", {})
-
-        # Build prompt for policy agent
-        decision = eligibility_result if isinstance(eligibility_result, str) else eligibility_result.get("decision", "Unknown")
-        prompt = f"""
-        Claim ID: {claim_id}
-        Plan: {plan_id}
-        Procedure: {claim_info['procedure_code']} ({claim_info.get('procedure_name', '')})
-
-        The eligibility agent marked this claim as: {decision}
-
-        Task for you, Policy Agent:
-        - Provide supporting excerpts from the policy documents related to this plan and procedure.
-        - Include any coverage notes, limitations, and prior authorization requirements.
-        - Format the response as a list of key excerpts.
-        """
-
-        # Invoke the policy agent LLM
-        response = policy_agent(prompt)
-
-        # Store in state
-        state["policy_response"] = response
-        print(f"Policy Agent Node done for claim {claim_id}")
-        return state
-
- 
-    # Fraud Detection Agent Node
+    async def apolicy_agent_node(state: State):
+        return {"policy_response": await apolicy_agent(**_policy_request(state))}
+
+    # Fraud Detection Agent Node (runs in parallel with the policy agent)
     def fraud_node(state: State):
         claim_id = state["claim_id"]
         result = fraud_agent(claim_id)
-        state["fraud_result"] = result
-        if result["fraud_flag"]:
-            state["status"] = "Flagged for Fraud"
-        else:
-            state["status"] = "Approved"
-        print("Fraud Detection Agent Node done")
-        return state
+        return {"fraud_result": result}
+
+    # Final Decision Node: joins the policy and fraud branches and sets the status once
+    def final_decision_node(state: State):
+        status = final_status(state)
+        if status == STATUS_APPROVED:
+            # approved claims count towards max_visits_per_year for the rest of the year
+            get_visit_index().record(get_claim_store().get_claim(state["claim_id"]))
+        return {"status": status}
 
      # Explanation Agent Node (LLM-generated human-friendly summary)
-    def explanation_node(state: State):
-        explanation = explanation_agent(state)   # pass whole state as dict
-        state["explanation"] = explanation
-        return state
+    def token_writer(config):
+        if not config.get("configurable", {}).get(STREAM_TOKENS):
+            return None
+        # emitted on the "custom" stream mode as they are generated
+        writer = get_stream_writer()
+        return lambda token: writer({"node": "explanation_agent", "token": token})
+
+    def explanation_node(state: State, config: RunnableConfig):
+        explanation = explanation_agent(state, on_token=token_writer(config))   # pass whole state as dict
+        return {"explanation": explanation}
+
+    async def aexplanation_node(state: State, config: RunnableConfig):
+        return {"explanation": await aexplanation_agent(state, on_token=token_writer(config))}
+
+    # Rejection Explanation Node (templated, no LLM) for claims that stopped early
+    def rejection_explanation_node(state: State):
+        status = final_status(state)
+        explanation = template_explanation({**state, "status": status})
+        return {"status": status, "explanation": explanation}
+
+    # Routing: terminal outcomes skip every downstream LLM node; eligible claims fan out
+    def route_after_validation(state: State):
+        return "eligibility_agent" if state["validation_result"]["valid"] else "rejection_explanation"
+
+    def route_after_eligibility(state: State):
+        if state["eligibility_result"].get("eligible") is True:
+            return ["policy_agent_node", "fraud_agent"]
+        return "rejection_explanation"
 
     # Build graph
     graph = StateGraph(State)
-    graph.add_node("validation_agent", validation_node)
-    graph.add_node("eligibility_agent", eligibility_node)
-    graph.add_node("policy_agent_node", policy_agent_node)
-    graph.add_node("fraud_agent", fraud_node)
-    graph.add_node("explanation_agent", explanation_node)
+
+    def add_node(name, node):
+        # every node runs in an instrumentation span (wall time, errors, optional cProfile)
+        graph.add_node(name, traced_node(name, node))
+
+    add_node("validation_agent", validation_node)
+    add_node("eligibility_agent", aeligibility_node if use_async else eligibility_node)
+    add_node("policy_agent_node", apolicy_agent_node if use_async else policy_agent_node)
+    add_node("fraud_agent", fraud_node)
+    add_node("final_decision", final_decision_node)
+    add_node("explanation_agent", aexplanation_node if use_async else explanation_node)
+    add_node("rejection_explanation", rejection_explanation_node)
 
     graph.set_entry_point("validation_agent")
-    graph.add_edge("validation_agent", "eligibility_agent")
-    graph.add_edge("eligibility_agent", "policy_agent_node")
-    graph.add_edge("policy_agent_node", "fraud_agent")
-    graph.add_edge("fraud_agent", "explanation_agent")    
+    graph.add_conditional_edges(
+        "validation_agent",
+        route_after_validation,
+        ["eligibility_agent", "rejection_explanation"],
+    )
+    graph.add_conditional_edges(
+        "eligibility_agent",
+        route_after_eligibility,
+        ["policy_agent_node", "fraud_agent", "rejection_explanation"],
+    )
+    graph.add_edge(["policy_agent_node", "fraud_agent"], "final_decision")
+    graph.add_edge("final_decision", "explanation_agent")
     graph.add_edge("explanation_agent", END)
+    graph.add_edge("rejection_explanation", END)
     return graph
+
+
+def warmup(services=None):
+    """
+    Eagerly load the claim data and its indexes and build the registered services (LLM clients, synced vector
+    store), for long-running processes that would rather pay the start-up cost before the first claim.
+    """
+    get_claim_store()
+    get_fraud_feature_store()
+    get_decision_table()
+    get_visit_index()
+    return registry.warmup(services)
+
+
+def compile_workflow(use_async=False, checkpointer=None):
+    """build_graph(use_async).compile(), optionally with a checkpointer so claims can be resumed"""
+    return build_graph(use_async=use_async).compile(checkpointer=checkpointer)
+
+
+def claim_config(claim_id):
+    """Checkpoint config for a claim: the claim_id is the thread key"""
+    return {"configurable": {"thread_id": str(claim_id)}}
+
+
+def _invoke_claim(workflow, claim_id):
+    with claim_trace(claim_id):
+        if workflow.checkpointer is None:
+            return workflow.invoke({"claim_id": claim_id})
+        config = claim_config(claim_id)
+        snapshot = workflow.get_state(config)
+        if snapshot.next:
+            # interrupted run: continue after the last finished node (input None means resume)
+            return workflow.invoke(None, config)
+        if snapshot.values:
+            # already adjudicated: reuse the checkpointed result
+            return snapshot.values
+        return workflow.invoke({"claim_id": claim_id}, config)
+
+
+async def _ainvoke_claim(workflow, claim_id):
+    with claim_trace(claim_id):
+        if workflow.checkpointer is None:
+            return await workflow.ainvoke({"claim_id": claim_id})
+        config = claim_config(claim_id)
+        snapshot = await workflow.aget_state(config)
+        if snapshot.next:
+            return await workflow.ainvoke(None, config)
+        if snapshot.values:
+            return snapshot.values
+        return await workflow.ainvoke({"claim_id": claim_id}, config)
+
+
+# Concurrent requests for the same claim share one execution of the compiled workflow
+_claim_flights = SingleFlight()
+_aclaim_flights = AsyncSingleFlight()
+
+
+def run_claim(workflow, claim_id):
+    """
+    Run one claim; callers asking for a claim that is already running wait for that run.
+    With a checkpointer, an interrupted claim is resumed and a finished one returns its saved result.
+    """
+    result = _claim_flights.do((id(workflow), claim_id), lambda: _invoke_claim(workflow, claim_id))
+    return dict(result)
+
+
+async def arun_claim(workflow, claim_id):
+    """Async run_claim, coalesced and resumed the same way"""
+    result = await _aclaim_flights.do((id(workflow), claim_id), lambda: _ainvoke_claim(workflow, claim_id))
+    return dict(result)
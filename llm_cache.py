@@ -0,0 +1,218 @@
+# src/llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from llm_scheduler import get_llm_scheduler, estimate_tokens, PRIORITY_POLICY
+from instrumentation import span
+from dotenv import load_dotenv
+load_dotenv()
+
+"""
+This module caches LLM responses for the eligibility, policy and explanation agents.
+Entries are keyed on model, temperature and a hash of the whitespace-normalized prompt, kept in an in-memory
+LRU with a TTL and backed by a SQLite file, so resubmitted or reprocessed claims don't pay for the same
+Gemini call twice. Every call can bypass the cache with use_cache=False.
+"""
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")  # "" keeps the cache in memory only
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 2048))
+
+
+def normalize_prompt(prompt):
+    """Collapse runs of whitespace inside each line and drop blank lines, so indentation changes don't miss the cache"""
+    lines = (" ".join(line.split()) for line in str(prompt).splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def make_cache_key(model, temperature, prompt):
+    payload = json.dumps([model, temperature, normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """In-memory LRU with TTL in front of an on-disk SQLite store"""
+
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, model TEXT, temperature REAL, response TEXT, created_at REAL)"
+            )
+            self._db.commit()
+
+    def _expired(self, created_at):
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key, created_at, response):
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached response for a key, or None on a miss"""
+        with self._lock:
+            # 1. Memory
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if not self._expired(created_at):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return response
+                del self._memory[key]
+
+            # 2. Disk
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    created_at, response = row
+                    if not self._expired(created_at):
+                        self._remember(key, created_at, response)
+                        self.disk_hits += 1
+                        return response
+                    self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key, response, model=None, temperature=None):
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, created_at, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, model, temperature, response, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, model, temperature, response, created_at),
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self):
+        """Hit/miss counters since the cache was created"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Return the process-wide LLM cache shared by all agents"""
+    global _llm_cache
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMCache()
+        return _llm_cache
+
+
+def _token_counts(response, prompt):
+    """(prompt, completion) tokens from the response's usage metadata, estimated when the model doesn't report them"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return (usage.get("input_tokens") or estimate_tokens(prompt),
+            usage.get("output_tokens") or estimate_tokens(response.content))
+
+
+def cached_invoke(llm, prompt, model, temperature, use_cache=True, priority=PRIORITY_POLICY):
+    """
+    llm.invoke(prompt) through the shared cache. Returns the response text (response.content).
+    Cache misses go through the shared LLM scheduler (rate limits, batching, backoff) at the given priority.
+    Pass use_cache=False to skip both the lookup and the write for this call.
+    """
+    with span("llm", model, priority=priority) as current:
+        cache = get_llm_cache() if use_cache else None
+        key = make_cache_key(model, temperature, prompt)
+        content = cache.get(key) if cache is not None else None
+        if content is not None:
+            current.set(cache_hit=True)
+            return content
+
+        response = get_llm_scheduler().invoke(llm, prompt, priority=priority)
+        prompt_tokens, completion_tokens = _token_counts(response, prompt)
+        current.set(cache_hit=False, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        if cache is not None:
+            cache.set(key, response.content, model=model, temperature=temperature)
+        return response.content
+
+
+async def acached_invoke(llm, prompt, model, temperature, use_cache=True, priority=PRIORITY_POLICY):
+    """Async cached_invoke: same cache, misses awaited through the scheduler without blocking the event loop"""
+    with span("llm", model, priority=priority) as current:
+        cache = get_llm_cache() if use_cache else None
+        key = make_cache_key(model, temperature, prompt)
+        content = cache.get(key) if cache is not None else None
+        if content is not None:
+            current.set(cache_hit=True)
+            return content
+
+        response = await get_llm_scheduler().ainvoke(llm, prompt, priority=priority)
+        prompt_tokens, completion_tokens = _token_counts(response, prompt)
+        current.set(cache_hit=False, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        if cache is not None:
+            cache.set(key, response.content, model=model, temperature=temperature)
+        return response.content
+
+
+def cached_stream(llm, prompt, model, temperature, use_cache=True):
+    """
+    Like cached_invoke, but yields the response text in chunks as the model generates it (for the UI).
+    A cache hit is yielded in one piece; a streamed miss is cached once it has finished.
+    """
+    with span("llm", model, streamed=True) as current:
+        cache = get_llm_cache() if use_cache else None
+        key = make_cache_key(model, temperature, prompt)
+        if cache is not None:
+            content = cache.get(key)
+            if content is not None:
+                current.set(cache_hit=True)
+                yield content
+                return
+
+        parts = []
+        stream = get_llm_scheduler().stream(llm, prompt)
+        try:
+            for text in stream:
+                parts.append(text)
+                yield text
+        finally:
+            # an abandoned caller closes this generator; pass that on so the model's stream is closed right away
+            stream.close()
+        content = "".join(parts)
+        current.set(cache_hit=False, prompt_tokens=estimate_tokens(prompt), completion_tokens=estimate_tokens(content))
+        if cache is not None:
+            cache.set(key, content, model=model, temperature=temperature)
@@ -0,0 +1,329 @@
+# src/llm_scheduler.py
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+load_dotenv()
+
+"""
+This module is the shared LLM scheduler every agent submits its prompts to.
+Prompts wait in one priority queue (eligibility before policy before explanation), are released under token-bucket
+limits on requests and on tokens per minute, and concurrent prompts for the same model are sent together through
+the model's batch API. Calls rejected with a rate-limit error (429 / RESOURCE_EXHAUSTED) are requeued with
+exponential backoff instead of failing the claim, so throughput is bounded by the quota, not by serial round-trips.
+The token bucket is charged the prompt plus an expected completion when a request is released and settled against
+the usage the model reports once it answers, so long completions count against the quota like the provider counts them.
+"""
+PRIORITY_ELIGIBILITY = 0
+PRIORITY_POLICY = 1
+PRIORITY_EXPLANATION = 2
+
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", 1000))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", 1_000_000))
+LLM_COMPLETION_TOKENS = int(os.getenv("LLM_COMPLETION_TOKENS", 256))
+LLM_MAX_BATCH_SIZE = int(os.getenv("LLM_MAX_BATCH_SIZE", 8))
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", 10))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+LLM_BACKOFF_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", 1.0))
+
+
+def estimate_tokens(prompt):
+    """Rough prompt size (about 4 characters per token) for the token bucket"""
+    return max(1, len(str(prompt)) // 4)
+
+
+def usage_tokens(message):
+    """Total tokens the model reports for a response (usage_metadata), or None when it does not report usage"""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    if usage.get("input_tokens") or usage.get("output_tokens"):
+        return (usage.get("input_tokens") or 0) + (usage.get("output_tokens") or 0)
+    return None
+
+
+def is_rate_limit_error(error):
+    """True for provider throttling errors (HTTP 429, RESOURCE_EXHAUSTED, quota exceeded)"""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    name = type(error).__name__.lower()
+    message = str(error).lower()
+    return (
+        "ratelimit" in name
+        or "resourceexhausted" in name
+        or "429" in message
+        or "rate limit" in message
+        or "resource exhausted" in message
+        or "resource has been exhausted" in message
+    )
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at rate_per_minute, holding at most one minute of quota"""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available, then take them"""
+        amount = min(amount, self.capacity)  # an oversized request waits for a full bucket instead of forever
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def settle(self, amount):
+        """
+        Take `amount` more tokens (or give them back when negative) without waiting: used once the real cost of a
+        request is known. The bucket may go negative, which delays the next acquire until the debt is refilled.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class _Request:
+    __slots__ = ("llm", "prompt", "priority", "future", "attempt", "not_before", "prompt_tokens", "tokens")
+
+    def __init__(self, llm, prompt, priority, completion_tokens):
+        self.llm = llm
+        self.prompt = prompt
+        self.priority = priority
+        self.future = Future()
+        self.attempt = 0
+        self.not_before = 0.0
+        self.prompt_tokens = estimate_tokens(prompt)
+        self.tokens = self.prompt_tokens + completion_tokens  # charged up front, settled against the reported usage
+
+
+class LLMScheduler:
+    """Priority queue + rate limits + micro-batching + backoff in front of one or more chat models"""
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_batch_size=LLM_MAX_BATCH_SIZE, batch_window_ms=LLM_BATCH_WINDOW_MS,
+                 max_in_flight=LLM_MAX_IN_FLIGHT, max_retries=LLM_MAX_RETRIES, backoff_seconds=LLM_BACKOFF_SECONDS,
+                 completion_tokens=LLM_COMPLETION_TOKENS):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.completion_tokens = completion_tokens
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = batch_window_ms / 1000.0
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="llm-batch")
+        self.stats = {"submitted": 0, "batches": 0, "completed": 0, "failed": 0, "throttled": 0, "retried": 0}
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-scheduler", daemon=True)
+        self._dispatcher.start()
+
+    # 1. Submitting prompts
+    def submit(self, llm, prompt, priority=PRIORITY_POLICY):
+        """Queue a prompt; returns a Future resolving to the model's response message"""
+        request = _Request(llm, prompt, priority, self.completion_tokens)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("LLM scheduler is closed")
+            self._push(request)
+            self.stats["submitted"] += 1
+        return request.future
+
+    def invoke(self, llm, prompt, priority=PRIORITY_POLICY):
+        """Blocking equivalent of llm.invoke(prompt), scheduled with everything else"""
+        return self.submit(llm, prompt, priority).result()
+
+    async def ainvoke(self, llm, prompt, priority=PRIORITY_POLICY):
+        """Awaitable equivalent of llm.ainvoke(prompt), scheduled with everything else"""
+        return await asyncio.wrap_future(self.submit(llm, prompt, priority))
+
+    def stream(self, llm, prompt):
+        """
+        Yield the response text chunk by chunk (llm.stream) under the same request/token quotas and in-flight limit.
+        Streams skip the priority queue and batching: they serve an interactive caller waiting on the first token.
+        A rate-limit error before the first chunk is retried with backoff like a queued request. The token charge is
+        settled against the usage reported on the stream's chunks; an abandoned stream keeps its estimate.
+        An in-flight slot is held only while the next chunk is fetched, never while the caller holds a chunk, so a
+        consumer that stops reading (or abandons the generator) does not keep a slot; closing the generator also
+        closes the model's stream.
+        """
+        with self._cond:
+            self.stats["submitted"] += 1
+        attempt = 0
+        while True:
+            prompt_tokens = estimate_tokens(prompt)
+            charged = prompt_tokens + self.completion_tokens
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(charged)
+            started = False
+            chunks = None
+            used = None
+            try:
+                with self._in_flight:
+                    chunks = iter(llm.stream(prompt))
+                while True:
+                    with self._in_flight:
+                        chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    started = True
+                    used = usage_tokens(chunk) or used
+                    yield chunk.content
+                self._count("completed")
+                if used is not None:
+                    self.token_bucket.settle(used - charged)
+                return
+            except Exception as error:
+                throttled = is_rate_limit_error(error)
+                if throttled:
+                    self._count("throttled")
+                self._settle_failure(error, charged, prompt_tokens)
+                if started or not throttled or attempt >= self.max_retries:
+                    self._count("failed")
+                    raise
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+            attempt += 1
+            self._count("retried")
+            time.sleep(self.backoff_seconds * 2 ** (attempt - 1) * (1 + random.random() * 0.25))
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._dispatcher.join(timeout=5)
+        self._executor.shutdown(wait=True)
+
+    def _push(self, request):
+        heapq.heappush(self._queue, (request.priority, next(self._seq), request))
+        self._cond.notify()
+
+    # 2. Dispatching batches
+    def _take_ready(self, llm=None, limit=None):
+        """Pop ready requests, highest priority first, all for the same model (the first one's, unless given)"""
+        now = time.monotonic()
+        limit = limit or self.max_batch_size
+        batch, deferred = [], []
+        while self._queue and len(batch) < limit:
+            item = heapq.heappop(self._queue)
+            request = item[2]
+            if request.not_before > now or (llm is not None and request.llm is not llm):
+                deferred.append(item)
+                continue
+            llm = request.llm
+            batch.append(request)
+        for item in deferred:
+            heapq.heappush(self._queue, item)
+        return batch
+
+    def _next_wake(self):
+        if not self._queue:
+            return None
+        earliest = min(item[2].not_before for item in self._queue)
+        return max(0.0, earliest - time.monotonic())
+
+    def _dispatch_loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    batch = self._take_ready()
+                    if batch:
+                        break
+                    if self._closed and not self._queue:
+                        return
+                    self._cond.wait(timeout=self._next_wake())
+
+            # give concurrent submitters a short window to join this micro-batch
+            if len(batch) < self.max_batch_size and self.batch_window:
+                time.sleep(self.batch_window)
+                with self._cond:
+                    batch += self._take_ready(llm=batch[0].llm, limit=self.max_batch_size - len(batch))
+
+            self.request_bucket.acquire(len(batch))
+            self.token_bucket.acquire(sum(request.tokens for request in batch))
+            self._in_flight.acquire()
+            self._executor.submit(self._run_batch, batch)
+
+    def _count(self, key):
+        with self._cond:
+            self.stats[key] += 1
+
+    def _run_batch(self, batch):
+        try:
+            self._count("batches")
+            try:
+                results = batch[0].llm.batch([request.prompt for request in batch], return_exceptions=True)
+            except Exception as error:
+                results = [error] * len(batch)
+
+            for request, result in zip(batch, results):
+                if not isinstance(result, Exception):
+                    used = usage_tokens(result)
+                    if used is not None:
+                        self.token_bucket.settle(used - request.tokens)
+                    self._count("completed")
+                    request.future.set_result(result)
+                    continue
+                self._settle_failure(result, request.tokens, request.prompt_tokens)
+                throttled = is_rate_limit_error(result)
+                if throttled:
+                    self._count("throttled")
+                if throttled and request.attempt < self.max_retries:
+                    self._retry(request)
+                else:
+                    self._count("failed")
+                    request.future.set_exception(result)
+        finally:
+            self._in_flight.release()
+
+    def _settle_failure(self, error, charged, prompt_tokens):
+        """
+        Give back the tokens of a call that produced no completion: all of them for a rate-limit rejection (the
+        provider did not accept it, and a retry is charged again), the completion estimate for other errors
+        """
+        self.token_bucket.settle(-(charged if is_rate_limit_error(error) else charged - prompt_tokens))
+
+    def _retry(self, request):
+        """Requeue a throttled request with exponential backoff and a little jitter"""
+        request.attempt += 1
+        delay = self.backoff_seconds * 2 ** (request.attempt - 1) * (1 + random.random() * 0.25)
+        request.not_before = time.monotonic() + delay
+        with self._cond:
+            self.stats["retried"] += 1
+            self._push(request)
+
+
+_llm_scheduler = None
+_llm_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler():
+    """Return the process-wide scheduler shared by all agents"""
+    global _llm_scheduler
+    with _llm_scheduler_lock:
+        if _llm_scheduler is None:
+            _llm_scheduler = LLMScheduler()
+        return _llm_scheduler
@@ -0,0 +1,162 @@
+# src/local_vectorstore.py
+"""
+Local, on-disk vector index for the policy document chunks, used instead of Pinecone when VECTOR_BACKEND=local.
+The normalized embeddings are stored as one float32 NumPy matrix (memory-mapped on load) with a JSON sidecar
+holding the chunk ids, text and metadata. Search is an exact top-k cosine similarity (one matrix-vector product),
+which for a corpus this size takes microseconds and needs no network round-trip. A metadata filter
+({"plan_id": "MedicareA"}) restricts the search to the matching rows before any score is computed; the row
+positions of each filter are computed once and kept until the index changes.
+HashEmbeddings is a deterministic local stand-in for OpenAIEmbeddings so the whole path runs offline and in CI.
+"""
+import hashlib
+import json
+import os
+import re
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+MATRIX_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.json"
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic feature-hashing embeddings: token and bigram counts hashed into a fixed-size, L2-normalized vector"""
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def _embed(self, text):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimension
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class LocalVectorIndex:
+    """Exact cosine top-k search over a memory-mapped matrix of normalized embeddings"""
+
+    def __init__(self, path, embedding):
+        self.path = path
+        self.embedding = embedding
+        self.ids = []
+        self.records = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._partitions = {}
+        self._load()
+
+    # 1. Persistence
+    def _load(self):
+        matrix_path = os.path.join(self.path, MATRIX_FILE)
+        metadata_path = os.path.join(self.path, METADATA_FILE)
+        if not (os.path.exists(matrix_path) and os.path.exists(metadata_path)):
+            return
+        with open(metadata_path, encoding="utf-8") as f:
+            sidecar = json.load(f)
+        self.records = sidecar["records"]
+        self.ids = [record["id"] for record in self.records]
+        self.matrix = np.load(matrix_path, mmap_mode="r")
+        self._partitions = {}
+
+    def _save(self):
+        os.makedirs(self.path, exist_ok=True)
+        matrix_path = os.path.join(self.path, MATRIX_FILE)
+        metadata_path = os.path.join(self.path, METADATA_FILE)
+        # write to temp files and swap them in, so a reader never sees a half-written index
+        np.save(matrix_path + ".tmp.npy", np.ascontiguousarray(self.matrix, dtype=np.float32))
+        with open(metadata_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"dimension": int(self.matrix.shape[1]) if self.matrix.size else 0, "records": self.records}, f)
+        os.replace(matrix_path + ".tmp.npy", matrix_path)
+        os.replace(metadata_path + ".tmp", metadata_path)
+        self.matrix = np.load(matrix_path, mmap_mode="r")
+        self._partitions = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # 2. Writes
+    def add_documents(self, documents, ids=None):
+        """Embed and add documents; an existing id is replaced (upsert)"""
+        documents = list(documents)
+        if not documents:
+            return []
+        if ids is None:
+            ids = [hashlib.sha256(doc.page_content.encode("utf-8")).hexdigest() for doc in documents]
+        vectors = _normalize_rows(np.asarray(self.embedding.embed_documents([d.page_content for d in documents]), dtype=np.float32))
+
+        self.delete(ids, save=False)
+        records = [
+            {"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata}
+            for doc_id, doc in zip(ids, documents)
+        ]
+        existing = np.asarray(self.matrix, dtype=np.float32)
+        self.matrix = vectors if not len(existing) else np.vstack([existing, vectors])
+        self.records.extend(records)
+        self.ids.extend(ids)
+        self._save()
+        return list(ids)
+
+    def delete(self, ids=None, save=True):
+        """Remove documents by id"""
+        doomed = set(ids or [])
+        keep = [i for i, doc_id in enumerate(self.ids) if doc_id not in doomed]
+        if len(keep) == len(self.ids):
+            return
+        self.matrix = np.asarray(self.matrix, dtype=np.float32)[keep]
+        self.records = [self.records[i] for i in keep]
+        self.ids = [self.ids[i] for i in keep]
+        if save:
+            self._save()
+
+    # 3. Search
+    def _rows(self, filter):
+        """Row positions whose metadata matches every key of the filter"""
+        key = tuple(sorted(filter.items()))
+        rows = self._partitions.get(key)
+        if rows is None:
+            rows = np.asarray([
+                i for i, record in enumerate(self.records)
+                if all(record["metadata"].get(field) == value for field, value in filter.items())
+            ], dtype=np.int64)
+            self._partitions[key] = rows
+        return rows
+
+    def similarity_search_with_score(self, query, k=3, filter=None):
+        if not len(self.ids):
+            return []
+        rows = self._rows(filter) if filter else None
+        if rows is not None and not len(rows):
+            return []
+        query_vector = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(query_vector)
+        if norm:
+            query_vector = query_vector / norm
+        scores = (self.matrix if rows is None else self.matrix[rows]) @ query_vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        positions = top if rows is None else rows[top]
+        return [
+            (Document(page_content=self.records[i]["page_content"], metadata=self.records[i]["metadata"]), float(score))
+            for i, score in zip(positions, scores[top])
+        ]
+
+    def similarity_search(self, query, k=3, filter=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
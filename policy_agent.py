@@ -1,33 +1,153 @@
 """
 This Agent access the vector databse that we created in src/vectordb and checks the policy docs 
+The vector store backend is picked by configuration (VECTOR_BACKEND=pinecone|local, see vectordb.py).
+When the workflow passes the claim's plan_id and procedure_code, retrieval is limited to that plan's chunks and uses
+a query built from the plan and procedure only, so its result is cached per (plan_id, procedure_code): every claim
+for the same plan and procedure shares one vector search (concurrent misses are coalesced), and other plans' text
+never reaches the prompt. The cache is keyed on the vector index version as well, so a sync_vectorstore() that
+adds or removes chunks (in this process) invalidates it.
 """
-from langchain.chat_models import init_chat_model
-from vectordb import query_vectorstore, create_vectorstore
+import asyncio
+import threading
+import registry
+from single_flight import SingleFlight, AsyncSingleFlight
+from vectordb import query_vectorstore, aquery_vectorstore, sync_vectorstore, get_index_version
+from llm_cache import cached_invoke, acached_invoke
+from llm_scheduler import PRIORITY_POLICY
 
 
 #this the policy agent created using Gemini
-# Make sure Pinecone is ingested
-create_vectorstore()
+# Make sure the vector store is in sync with data/policyDocs before the first query (a no-op when nothing changed)
+VECTORSTORE_SERVICE = "policy_vectorstore"
+registry.register(VECTORSTORE_SERVICE, sync_vectorstore)
 
-# STEP 1: Initialize Gemini LLM
-llm = init_chat_model(
-    model="gemini-2.0-flash",
-    model_provider="google_genai",
-    temperature=0.5
-)
+MODEL_NAME = "gemini-2.0-flash"
+TEMPERATURE = 0.5
 
-# STEP 2: Define a wrapper for policy queries
-def policy_agent(query: str):
-    # 1. Get top 3 relevant chunks from Pinecone
-    docs = query_vectorstore(query, k=3)
+# STEP 1: Gemini LLM, created on first use through the registry (nothing is built at import)
+LLM_SERVICE = "policy_llm"
+
+
+def _build_llm():
+    from langchain.chat_models import init_chat_model
+    return init_chat_model(
+        model=MODEL_NAME,
+        model_provider="google_genai",
+        temperature=TEMPERATURE
+    )
+
+
+registry.register(LLM_SERVICE, _build_llm)
+
+# Retrieved chunks per (index version, plan_id, procedure_code, k); only the current version is kept
+_context_cache = {}
+_context_version = 0
+_context_lock = threading.Lock()
+_context_flight = SingleFlight()
+_acontext_flight = AsyncSingleFlight()
+
+
+def clear_context_cache():
+    with _context_lock:
+        _context_cache.clear()
+
+
+def _retrieval_query(plan_id, procedure_code):
+    # CPT_72148 is written "CPT 72148" in the policy documents
+    procedure = str(procedure_code).replace("_", " ")
+    return f"{plan_id} coverage for {procedure}: coverage notes, limitations, visit limits and prior authorization"
+
+
+def _context_key(plan_id, procedure_code, k):
+    return (get_index_version(), plan_id, procedure_code, k)
+
+
+def _cached_context(key):
+    with _context_lock:
+        return _context_cache.get(key)
+
+
+def _store_context(key, docs):
+    global _context_version
+    with _context_lock:
+        if key[0] > _context_version:
+            # the index changed: entries retrieved from the older version are dropped
+            _context_cache.clear()
+            _context_version = key[0]
+        if key[0] == _context_version:
+            _context_cache[key] = docs
+    return docs
+
+
+def retrieve_policy_context(plan_id, procedure_code, k=3):
+    """Top-k chunks of the plan's policy for a procedure, retrieved once per (plan_id, procedure_code)"""
+    key = _context_key(plan_id, procedure_code, k)
+    docs = _cached_context(key)
+    if docs is not None:
+        return docs
+
+    def retrieve():
+        registry.get(VECTORSTORE_SERVICE)
+        docs = _cached_context(key)
+        if docs is None:
+            query = _retrieval_query(plan_id, procedure_code)
+            docs = _store_context(key, query_vectorstore(query, k=k, plan_id=plan_id))
+        return docs
+    return _context_flight.do(key, retrieve)
+
+
+async def aretrieve_policy_context(plan_id, procedure_code, k=3):
+    key = _context_key(plan_id, procedure_code, k)
+    docs = _cached_context(key)
+    if docs is not None:
+        return docs
+
+    async def retrieve():
+        if not registry.is_ready(VECTORSTORE_SERVICE):
+            await asyncio.to_thread(registry.get, VECTORSTORE_SERVICE)
+        docs = _cached_context(key)
+        if docs is None:
+            query = _retrieval_query(plan_id, procedure_code)
+            docs = _store_context(key, await aquery_vectorstore(query, k=k, plan_id=plan_id))
+        return docs
+    return await _acontext_flight.do(key, retrieve)
+
+
+def _policy_prompt(query: str, docs):
     context = "\n".join([doc.page_content for doc in docs])
+    return f"Answer the question based on the following policy documents:\n{context}\n\nQuestion: {query}\nAnswer:"
+
+# STEP 2: Define a wrapper for policy queries
+def policy_agent(query: str, use_cache: bool = True, plan_id=None, procedure_code=None):
+    # 1. Get top 3 relevant chunks from the configured vector store (Pinecone or the local index):
+    #    from the plan's partition (cached per plan and procedure) when the claim's plan is known
+    if plan_id and procedure_code:
+        docs = retrieve_policy_context(plan_id, procedure_code, k=3)
+    else:
+        registry.get(VECTORSTORE_SERVICE)
+        docs = query_vectorstore(query, k=3)
 
     # 2. Prepare prompt for LLM
-    prompt = f"Answer the question based on the following policy documents:\n{context}\n\nQuestion: {query}\nAnswer:"
+    prompt = _policy_prompt(query, docs)
+
+    # 3. Generate answer using Gemini (through the shared response cache)
+    llm = registry.get(LLM_SERVICE)
+    return cached_invoke(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache,
+                         priority=PRIORITY_POLICY)
+
 
-    # 3. Generate answer using Gemini
-    response = llm.invoke(prompt)
-    return response.content
+async def apolicy_agent(query: str, use_cache: bool = True, plan_id=None, procedure_code=None):
+    """Async policy_agent: retrieval and the Gemini call are both awaited"""
+    if plan_id and procedure_code:
+        docs = await aretrieve_policy_context(plan_id, procedure_code, k=3)
+    else:
+        if not registry.is_ready(VECTORSTORE_SERVICE):
+            await asyncio.to_thread(registry.get, VECTORSTORE_SERVICE)
+        docs = await aquery_vectorstore(query, k=3)
+    prompt = _policy_prompt(query, docs)
+    llm = registry.get(LLM_SERVICE)
+    return await acached_invoke(llm, prompt, model=MODEL_NAME, temperature=TEMPERATURE, use_cache=use_cache,
+                                priority=PRIORITY_POLICY)
 
 # Test
 if __name__ == "__main__":
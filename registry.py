@@ -0,0 +1,73 @@
+# src/registry.py
+"""
+Registry of lazily created services: LLM clients, the synced policy vector store and anything else that is
+expensive or needs the network. Modules register a factory at import time (cheap) and call get(name) where they
+need the object, so importing the workflow builds nothing. The first get() runs the factory once, even when
+several threads ask at the same time; warmup() runs them eagerly for servers that prefer a slow start to a slow
+first claim.
+"""
+import threading
+
+_factories = {}
+_instances = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_MISSING = object()
+
+
+def register(name, factory):
+    """Register (or replace) the zero-argument factory that builds `name` on first use"""
+    with _registry_lock:
+        _factories[name] = factory
+        _locks.setdefault(name, threading.Lock())
+        _instances.pop(name, None)
+
+
+def get(name):
+    """Return the service called `name`, building it on first use"""
+    instance = _instances.get(name, _MISSING)
+    if instance is not _MISSING:
+        return instance
+    with _registry_lock:
+        if name not in _factories:
+            raise KeyError(f"No service registered as {name!r}")
+        lock = _locks[name]
+    # one lock per service: a slow vector store sync doesn't hold up the LLM clients
+    with lock:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def override(name, instance):
+    """Use an already built instance for `name` (e.g. a fake model in tests or benchmarks)"""
+    with _registry_lock:
+        _locks.setdefault(name, threading.Lock())
+        _instances[name] = instance
+
+
+def is_ready(name):
+    return name in _instances
+
+
+def reset(name=None):
+    """Drop one built service (or all of them); the next get() builds it again"""
+    with _registry_lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def registered():
+    with _registry_lock:
+        return list(_factories)
+
+
+def warmup(names=None):
+    """Build the given services (every registered one by default) now; returns the names built"""
+    names = registered() if names is None else list(names)
+    for name in names:
+        get(name)
+    return names
+
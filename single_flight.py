@@ -0,0 +1,65 @@
+# src/single_flight.py
+"""
+Single-flight de-duplication: concurrent requests for the same key share one in-flight execution.
+When the UI and a batch job (or two UI users) ask for the same claim at the same time, the second caller waits
+for the first caller's run and gets its result instead of paying for the whole pipeline again.
+SingleFlight is for threads, AsyncSingleFlight for coroutines on one event loop. Nothing is cached once the
+execution finishes; the next request for the key starts a fresh run.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Thread-safe: the first caller for a key runs fn(), concurrent callers for the key wait on its Future"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as error:
+            future.set_exception(error)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
+
+    def in_flight(self):
+        with self._lock:
+            return list(self._in_flight)
+
+
+class AsyncSingleFlight:
+    """Coroutine version: concurrent awaits for a key share one task created from coro_fn()"""
+
+    def __init__(self):
+        self._in_flight = {}
+
+    async def do(self, key, coro_fn):
+        task = self._in_flight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(coro_fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._forget(key, done))
+        # shield: one caller being cancelled must not cancel the run the other callers are waiting for
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def in_flight(self):
+        return list(self._in_flight)
@@ -0,0 +1,44 @@
+import threading
+import time
+import pandas as pd
+import batch_runner
+
+
+def _fake_run_claim(hang_seconds, work_seconds, calls):
+    lock = threading.Lock()
+
+    def run_claim(workflow, claim_id):
+        with lock:
+            calls[claim_id] = calls.get(claim_id, 0) + 1
+        time.sleep(hang_seconds if claim_id == "HANG" else work_seconds)
+        return {"status": "Approved", "validation_result": {"valid": True}}
+    return run_claim
+
+
+def test_thread_mode_timeout_starts_when_a_worker_picks_the_claim_up(tmp_path, monkeypatch):
+    calls = {}
+    monkeypatch.setattr(batch_runner, "run_claim", _fake_run_claim(2.0, 0.3, calls))
+    claim_ids = ["HANG"] + [f"C{i}" for i in range(6)]
+
+    # the hung claim keeps one of the two workers busy after its timeout, so the other claims queue for the
+    # remaining worker; queued time must not count against their 0.5s timeout
+    summary = batch_runner.run_batch(claim_ids, str(tmp_path / "out.csv"), concurrency=2, workers=2, timeout=0.5,
+                                     retries=1, retry_backoff=0.0, workflow=object())
+
+    rows = pd.read_csv(tmp_path / "out.csv").set_index("claim_id")
+    assert summary["statuses"] == {"Approved": 6, batch_runner.STATUS_ERROR: 1}
+    assert rows.loc["HANG", "status"] == batch_runner.STATUS_ERROR
+    # the retry waited on the thread still running instead of starting a second one
+    assert calls["HANG"] == 1
+
+
+def test_thread_mode_retry_reuses_an_attempt_that_finished_after_its_timeout(tmp_path, monkeypatch):
+    calls = {}
+    monkeypatch.setattr(batch_runner, "run_claim", _fake_run_claim(0.8, 0.0, calls))
+
+    # the first attempt times out at 0.5s and finishes at 0.8s, during the 0.5s backoff before the retry
+    summary = batch_runner.run_batch(["HANG", "C0"], str(tmp_path / "out.csv"), concurrency=2, workers=2, timeout=0.5,
+                                     retries=1, retry_backoff=0.5, workflow=object())
+
+    assert summary["statuses"] == {"Approved": 2}
+    assert calls["HANG"] == 1
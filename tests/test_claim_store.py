@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+from claim_store import ClaimStore
+from data_loader import load_data
+
+
+def _scan_claim(claims_df, claim_id):
+    """The boolean-mask lookup the agents used before the store"""
+    rows = claims_df[claims_df["claim_id"] == claim_id]
+    return None if rows.empty else rows.iloc[0].to_dict()
+
+
+def _same(left, right):
+    assert (left is None) == (right is None)
+    if left is not None:
+        assert left.keys() == right.keys()
+        for key in left:
+            assert left[key] == right[key] or (pd.isna(left[key]) and pd.isna(right[key]))
+
+
+def test_lookups_match_table_scans_around_added_and_removed_claims():
+    data = load_data()
+    store = ClaimStore(data)
+    claims_df, patients_df, rules_df = data["claims"], data["patients"], data["rules"]
+
+    for claim_id in claims_df["claim_id"].tolist()[:50] + ["NOPE"]:
+        _same(store.get_claim(claim_id), _scan_claim(claims_df, claim_id))
+    for patient_id in patients_df["patient_id"].tolist()[:20]:
+        rows = patients_df[patients_df["patient_id"] == patient_id]
+        _same(store.get_patient(patient_id), rows.iloc[0].to_dict())
+        assert store.claim_ids_for_patient(patient_id) == \
+            claims_df.loc[claims_df["patient_id"] == patient_id, "claim_id"].tolist()
+    for plan_id, procedure_code in zip(rules_df["plan_id"], rules_df["procedure_code"]):
+        rows = rules_df[(rules_df["plan_id"] == plan_id) & (rules_df["procedure_code"] == procedure_code)]
+        _same(store.get_rule(plan_id, procedure_code), rows.iloc[0].to_dict())
+
+    existing = claims_df.iloc[0].to_dict()
+    shadow = {**existing, "claim_amount": 1.0}
+    streamed = {**existing, "claim_id": "STREAM1", "claim_amount": 2.0}
+    added = store.add_claims([shadow, streamed, {**streamed, "claim_amount": 3.0}, {"claim_id": np.nan}])
+    assert added == [existing["claim_id"], "STREAM1"]
+    assert store.get_claim(existing["claim_id"])["claim_amount"] == 1.0
+    assert store.get_claim("STREAM1")["claim_amount"] == 2.0
+    assert store.has_claim("STREAM1")
+    frame = store.get_claims_frame(["STREAM1", "NOPE", existing["claim_id"]])
+    assert frame["claim_id"].tolist() == ["STREAM1", existing["claim_id"]]
+    assert frame["claim_amount"].tolist() == [2.0, 1.0]
+
+    store.remove_claims(added)
+    assert not store.has_claim("STREAM1") and store.get_claim("STREAM1") is None
+    _same(store.get_claim(existing["claim_id"]), _scan_claim(claims_df, existing["claim_id"]))
+    pd.testing.assert_frame_equal(store.get_claims_frame([existing["claim_id"]]), claims_df.iloc[[0]])
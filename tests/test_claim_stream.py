@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import pandas as pd
+from conftest import REPO_ROOT
+
+# Runs one streaming pass in a fresh interpreter, with the fake backends from benchmarks/fakes.py. With
+# crash_after_flush the process is killed (os._exit) as soon as a decision of an unfinished chunk reaches the output.
+_DRIVER = textwrap.dedent("""
+    import json, os, sys
+    sys.path[:0] = [{repo!r}, os.path.join({repo!r}, "benchmarks")]
+    import fakes, synthetic_data
+    workdir, stream_file, output, crash_after_flush = {workdir!r}, {stream_file!r}, {output!r}, {crash!r}
+    fakes.configure_environment(workdir)
+    os.environ["LLM_BATCH_WINDOW_MS"] = "0"
+    import data_loader
+    dataset = json.load(open(os.path.join(workdir, "dataset.json")))
+    for name in ("patients", "claims", "rules"):
+        data_loader.DATA_FILES[name] = dataset["paths"][name]
+    data_loader.reload_data()
+    fakes.install_fakes(dataset["paths"]["policy_docs"])
+
+    if crash_after_flush:
+        import registry, explanation_agent
+        from fake_llm import FakeChatModel
+        from claim_stream import progress_path
+
+        def respond(prompt):
+            path = progress_path(output)
+            if os.path.exists(path) and os.path.getsize(output) > json.load(open(path))["output_bytes"]:
+                os._exit(3)
+            return "explanation"
+        registry.override(explanation_agent.LLM_SERVICE, FakeChatModel(responder=respond))
+
+    import claim_stream
+    claim_stream.run_stream(stream_file, output, chunk_size=1500, resume=True, concurrency=4)
+""")
+
+
+def _run(tmp_path, stream_file, output, crash):
+    code = _DRIVER.format(repo=REPO_ROOT, workdir=str(tmp_path), stream_file=stream_file, output=output, crash=crash)
+    return subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, timeout=600)
+
+
+def test_resume_after_crash_mid_chunk_writes_every_row_once(tmp_path):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+    import synthetic_data
+
+    # patients and rules for the workflow, and a separate 3000-row file to stream with two claim_ids repeated
+    # inside the second chunk and one claim_id of the first chunk repeated in the second
+    dataset = synthetic_data.generate(str(tmp_path / "base"), claims=100, patients=200, seed=1)
+    with open(tmp_path / "dataset.json", "w", encoding="utf-8") as f:
+        json.dump(dataset, f)
+    synthetic_data.generate(str(tmp_path / "stream"), claims=3000, patients=200, seed=2)
+    stream_file = str(tmp_path / "stream" / "claims.csv")
+    claims = pd.read_csv(stream_file, dtype=str)
+    claims = pd.concat([claims.iloc[:1800], claims.iloc[[1600, 1700, 10]], claims.iloc[1800:]], ignore_index=True)
+    claims.to_csv(stream_file, index=False)
+    output = str(tmp_path / "decisions.csv")
+
+    crashed = _run(tmp_path, stream_file, output, crash=True)
+    assert crashed.returncode == 3, crashed.stderr
+    with open(output + ".progress.json", encoding="utf-8") as f:
+        progress = json.load(f)
+    assert progress["rows_done"] == 1500
+    assert os.path.getsize(output) > progress["output_bytes"]
+
+    resumed = _run(tmp_path, stream_file, output, crash=False)
+    assert resumed.returncode == 0, resumed.stderr
+    decisions = pd.read_csv(output, dtype=str)
+    assert len(decisions) == len(claims)
+    counts = decisions["claim_id"].value_counts()
+    assert set(counts[counts > 1].index) == set(claims["claim_id"].iloc[[1600, 1700, 10]])
+    repeated = decisions[decisions["reason"].str.startswith("Duplicate claim_id", na=False)]
+    assert len(repeated) == 3
+    assert not os.path.exists(output + ".claim_ids.sqlite")
+
+
+def test_start_byte_alone_counts_the_rows_before_it(tmp_path):
+    import claim_stream
+
+    path = tmp_path / "claims.csv"
+    pd.DataFrame({"claim_id": [f"X{i}" for i in range(10)], "date": "8/15/25"}).to_csv(path, index=False)
+    chunks = list(claim_stream.iter_claim_chunks(str(path), 4, columns=["claim_id", "date"]))
+    assert claim_stream.count_rows(str(path), chunks[0].end_byte) == 4
+    assert claim_stream.count_rows(str(path), chunks[1].end_byte) == 8
@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+from eligibility_rules import EligibilityDecisionTable, DECIDED_BY_RULES
+
+RULES = pd.DataFrame([
+    # plan_id, procedure_code, procedure_name, covered, prior_auth, min_age, max_age, diagnosis_required, visits, notes
+    ("PlanA", "CPT_1", "Office Visit", "Yes", "No", 0, 120, "none", 4, "Standard visit"),
+    ("PlanA", "CPT_1", "Shadowed Row", "No", "No", 0, 120, "none", 4, "second row for the same key"),
+    ("PlanA", "CPT_2", "MRI Brain", "No", "Yes", 0, 120, "none", 1, "Not covered"),
+    ("PlanA", "CPT_3", "Colonoscopy", "Yes", "Yes", 50, 75, "none", 1, "Screening"),
+    ("PlanA", "CPT_4", "MRI Lumbar Spine", "Yes", "Yes", 18, 120, "HerniatedDisk", 1, "Diagnosis needed"),
+    ("PlanA", "CPT_5", "Physical Therapy", "Yes", "Yes", 0, 120, "none", 20, "Covered if patient >65"),
+    ("PlanA", "CPT_6", "Mammogram", "Yes", "No", 40, 120, "none", 1, "Gender specific"),
+    ("PlanA", "CPT_7", "Unknown Cover", "Maybe", "No", 0, 120, "none", 1, ""),
+    ("PlanA", "CPT_8", "Unknown Auth", "Yes", "", 0, 120, "none", 1, ""),
+], columns=["plan_id", "procedure_code", "procedure_name", "covered", "prior_auth", "min_age", "max_age",
+            "diagnosis_required", "max_visits_per_year", "notes"])
+
+CLAIM_DATE = pd.Timestamp("2025-08-15")
+
+
+@pytest.mark.parametrize("procedure_code, age, prior_visits, expected", [
+    ("CPT_1", 40, 0, (True, "Office Visit (CPT_1) is covered under plan PlanA for age 40; "
+                            "no prior authorization required")),
+    ("CPT_1", 40, None, (True, "Office Visit (CPT_1) is covered")),
+    ("CPT_2", 40, 0, (False, "MRI Brain (CPT_2) is not covered under plan PlanA")),
+    ("CPT_2", None, None, (False, "MRI Brain (CPT_2) is not covered")),      # not covered does not need an age
+    ("CPT_3", 45, 0, (False, "Patient age 45 is outside the covered range 50-75")),
+    ("CPT_3", 60, 1, (False, "Visit limit reached for Colonoscopy (CPT_3): 1 approved visit(s) in 2025")),
+    ("CPT_3", 60, 0, (True, "prior authorization required")),
+    ("CPT_1", None, 0, None),               # no age to check the range against
+    ("CPT_4", 40, 0, None),                 # a required diagnosis needs the LLM
+    ("CPT_4", 10, 0, (False, "outside the covered range 18-120")),   # but a hard age limit still decides
+    ("CPT_5", 70, 0, None),                 # conditional note
+    ("CPT_6", 50, 0, None),                 # gender-specific note
+    ("CPT_7", 40, 0, None),                 # covered is not a clear yes or no
+    ("CPT_8", 40, 0, None),                 # prior auth flag unknown
+    ("CPT_9", 40, 0, None),                 # no rule for the plan and procedure
+])
+def test_decide_settles_clear_cut_claims_and_leaves_the_rest_to_the_llm(procedure_code, age, prior_visits, expected):
+    table = EligibilityDecisionTable(RULES)
+    claim = {"procedure_code": procedure_code, "date": CLAIM_DATE}
+    decision = table.decide(claim, {"plan_id": "PlanA", "age": age}, prior_visits=prior_visits)
+
+    if expected is None:
+        assert decision is None
+        return
+    eligible, reason = expected
+    assert decision["decided_by"] == DECIDED_BY_RULES
+    assert decision["eligible"] is eligible
+    assert reason in decision["reason"]
+    assert decision["prior_auth_required"] == (procedure_code in ("CPT_2", "CPT_3", "CPT_4"))
+
+
+def test_unknown_plan_is_left_to_the_llm():
+    table = EligibilityDecisionTable(RULES)
+    assert table.decide({"procedure_code": "CPT_1", "date": CLAIM_DATE}, {"plan_id": "PlanB", "age": 40}) is None
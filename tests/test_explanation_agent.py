@@ -0,0 +1,31 @@
+import asyncio
+import threading
+import explanation_agent
+import llm_cache
+import registry
+from fake_llm import FakeChatModel
+from llm_cache import LLMCache
+
+RESULT = {"claim_id": "C1", "status": "Approved", "validation_result": {"valid": True},
+          "eligibility_result": {"eligible": True}, "policy_response": "Covered", "fraud_result": {"fraud_flag": False}}
+
+
+def test_async_explanation_streams_tokens_on_the_event_loop(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMCache(path=""))
+    registry.override(explanation_agent.LLM_SERVICE, FakeChatModel(responder=lambda prompt: "one two three four"))
+    tokens, threads = [], set()
+
+    def on_token(token):
+        tokens.append(token)
+        threads.add(threading.get_ident())
+
+    async def explain():
+        streamed = await explanation_agent.aexplanation_agent(RESULT, on_token=on_token)
+        return streamed, threading.get_ident(), await explanation_agent.aexplanation_agent(RESULT)
+    try:
+        streamed, loop_thread, invoked = asyncio.run(explain())
+    finally:
+        registry.reset(explanation_agent.LLM_SERVICE)
+
+    assert len(tokens) > 1 and "".join(tokens).strip() == streamed == invoked == "one two three four"
+    assert threads == {loop_thread}
@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+import numpy as np
+import pandas as pd
+import data_loader
+import fraud_features
+from conftest import REPO_ROOT
+from data_loader import apply_schema
+from fraud_detection_agent import score_claim, HIGH_BILLED_AMOUNT, ANOMALOUS_THRESHOLD_FACTOR
+from fraud_features import FraudFeatureStore
+from velocity import VelocityIndex
+
+
+def _baseline_scan(claim, claims_df):
+    """The full-table scan the fraud agent used before the feature store"""
+    fraud_flags = []
+    if claim["claim_amount"] > HIGH_BILLED_AMOUNT:
+        fraud_flags.append(f"High billed amount: ${claim['claim_amount']}")
+    duplicates = claims_df[
+        (claims_df["patient_id"] == claim["patient_id"]) &
+        (claims_df["procedure_code"] == claim["procedure_code"]) &
+        (claims_df["provider"] == claim["provider"]) &
+        (claims_df["date"] == claim["date"]) &
+        (claims_df["claim_id"] != claim["claim_id"])
+    ]
+    if not duplicates.empty:
+        fraud_flags.append(f"Duplicate claim(s) found: {', '.join(duplicates['claim_id'].tolist())}")
+    mean_amount = claims_df["claim_amount"].mean()
+    std_amount = claims_df["claim_amount"].std()
+    if abs(claim["claim_amount"] - mean_amount) > ANOMALOUS_THRESHOLD_FACTOR * std_amount:
+        fraud_flags.append(f"Anomalous claim amount: ${claim['claim_amount']} (mean: ${mean_amount:.2f})")
+    if fraud_flags:
+        return {"claim_id": claim["claim_id"], "fraud_flag": True, "reason": "; ".join(fraud_flags)}
+    return {"claim_id": claim["claim_id"], "fraud_flag": False, "reason": None}
+
+
+def test_score_claim_matches_the_full_table_scan():
+    sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+    import synthetic_data
+
+    rng = np.random.default_rng(5)
+    claims = synthetic_data.make_claims(0, 3000, 400, 20, rng, duplicate_rate=0.05)
+    claims["claim_amount"] = claims["claim_amount"].astype(float)
+    claims.loc[[7, 300, 2999], "claim_amount"] = [60000.0, 250000.0, 1_000_000.0]
+    claims = apply_schema("claims", claims.astype({"claim_amount": str}))
+
+    store = FraudFeatureStore()
+    store.velocity = VelocityIndex(rules=[])    # velocity rules came later and are not part of the old scan
+    store.add_claims(claims.iloc[:1000])
+    for claim in claims.iloc[1000:1500].to_dict("records"):
+        store.add_claim(claim)
+    store.add_claims(claims.iloc[1500:])
+
+    results = [(score_claim(claim, store), _baseline_scan(claim, claims)) for claim in claims.to_dict("records")]
+    assert sum(baseline["fraud_flag"] for _, baseline in results) > 100
+    assert any("Anomalous" in (baseline["reason"] or "") for _, baseline in results)
+    for scored, baseline in results:
+        assert scored == baseline
+
+
+def test_reloading_another_table_keeps_streamed_claims(tmp_path, monkeypatch):
+    for name, path in data_loader.DATA_FILES.items():
+        shutil.copy(path, tmp_path / f"{name}.csv")
+        monkeypatch.setitem(data_loader.DATA_FILES, name, str(tmp_path / f"{name}.csv"))
+    monkeypatch.setattr(data_loader, "COLUMNAR_DIR", "")
+    monkeypatch.setattr(fraud_features, "_fraud_feature_store", None)
+    try:
+        data_loader.reload_data()
+        store = fraud_features.get_fraud_feature_store()
+        count = store.count
+        store.add_claim({"claim_id": "S1", "claim_amount": 120.0, "patient_id": "P1", "procedure_code": "CPT_99213",
+                         "provider": "Dr 1", "date": pd.Timestamp("2025-08-15")})
+
+        with open(tmp_path / "insurance_rules.csv", "a", encoding="utf-8") as f:
+            f.write("\n")
+        with open(tmp_path / "patients.csv", "a", encoding="utf-8") as f:
+            f.write("\nP9999998,New Patient,40,F,MedicareA,0,0,none,TX\n")
+        assert "patients" in data_loader.refresh_data()
+        assert fraud_features.get_fraud_feature_store() is store
+        assert store.count == count + 1
+    finally:
+        monkeypatch.undo()
+        data_loader.reload_data()
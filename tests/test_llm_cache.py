@@ -0,0 +1,50 @@
+import llm_cache
+from fake_llm import FakeChatModel
+from llm_cache import LLMCache, cached_invoke, make_cache_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+def test_entries_expire_after_the_ttl_in_memory_and_on_disk(tmp_path, monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(llm_cache, "time", clock)    # only time.time() is used
+    path = str(tmp_path / "cache.sqlite")
+    cache = LLMCache(path=path, ttl_seconds=60)
+    key = make_cache_key("fake-chat", 0.0, "prompt")
+    cache.set(key, "answer")
+
+    clock.now += 59
+    assert cache.get(key) == "answer"
+    assert LLMCache(path=path, ttl_seconds=60).get(key) == "answer"    # served from disk by a new process
+
+    clock.now += 2
+    assert cache.get(key) is None
+    restarted = LLMCache(path=path, ttl_seconds=60)
+    assert restarted.get(key) is None
+    assert restarted._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 0    # the stale row is dropped
+    assert cache.stats()["misses"] == 1 and cache.stats()["memory_hits"] == 1
+
+
+def test_use_cache_false_skips_the_lookup_and_the_write(monkeypatch):
+    cache = LLMCache(path="")
+    monkeypatch.setattr(llm_cache, "_llm_cache", cache)
+    llm = FakeChatModel()
+
+    first = cached_invoke(llm, "cached prompt", "fake-chat", 0.0)
+    assert cached_invoke(llm, "cached  prompt", "fake-chat", 0.0) == first    # whitespace-normalized hit
+    assert llm.calls == 1
+
+    assert cached_invoke(llm, "cached prompt", "fake-chat", 0.0, use_cache=False) == first
+    assert llm.calls == 2
+    cached_invoke(llm, "uncached prompt", "fake-chat", 0.0, use_cache=False)
+    assert llm.calls == 3
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1    # bypassed calls never looked up
+
+    cached_invoke(llm, "uncached prompt", "fake-chat", 0.0)
+    assert llm.calls == 4    # ... nor wrote their answer
@@ -0,0 +1,115 @@
+import time
+import pytest
+from fake_llm import FakeChatModel, FakeRateLimitError
+from llm_scheduler import LLMScheduler, TokenBucket, estimate_tokens, PRIORITY_ELIGIBILITY, PRIORITY_EXPLANATION
+
+
+def test_abandoned_stream_does_not_keep_an_in_flight_slot():
+    scheduler = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=10**12, max_in_flight=1)
+    llm = FakeChatModel(responder=lambda prompt: "one two three four")
+    try:
+        abandoned = scheduler.stream(llm, "first prompt")
+        assert next(abandoned)
+        # the consumer stops reading without closing the generator: with max_in_flight=1 a slot held across the
+        # yield would block this call forever
+        assert scheduler._in_flight.acquire(timeout=1)
+        scheduler._in_flight.release()
+        assert "".join(scheduler.stream(llm, "second prompt"))
+        abandoned.close()
+        assert scheduler._in_flight.acquire(timeout=1)
+        scheduler._in_flight.release()
+    finally:
+        scheduler.close()
+
+
+def test_rate_limited_calls_are_retried_with_backoff():
+    scheduler = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=10**12, max_batch_size=1,
+                             backoff_seconds=0.1, max_retries=3)
+    llm = FakeChatModel(rate_limit_every=2)
+    try:
+        started = time.monotonic()
+        futures = [scheduler.submit(llm, f"prompt {i}") for i in range(4)]
+        responses = [future.result(timeout=10) for future in futures]
+        assert all(response.content for response in responses)
+        assert llm.rate_limited >= 2
+        assert scheduler.stats["throttled"] == scheduler.stats["retried"] == llm.rate_limited
+        assert scheduler.stats["failed"] == 0
+        assert time.monotonic() - started >= 0.1
+    finally:
+        scheduler.close()
+
+    scheduler = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=10**12, max_batch_size=1, max_retries=0)
+    try:
+        future = scheduler.submit(FakeChatModel(rate_limit_every=1), "always throttled")
+        with pytest.raises(FakeRateLimitError):
+            future.result(timeout=10)
+        assert scheduler.stats["failed"] == 1
+    finally:
+        scheduler.close()
+
+
+def test_eligibility_prompts_are_served_before_explanations():
+    order = []
+    llm = FakeChatModel(latency=0.3, responder=lambda prompt: order.append(prompt) or "ok")
+    scheduler = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=10**12, max_batch_size=1,
+                             batch_window_ms=0, max_in_flight=1)
+    try:
+        blocker = scheduler.submit(llm, "blocker")
+        while not order:
+            time.sleep(0.01)
+        # the only in-flight slot is busy: everything below queues behind the blocker
+        futures = []
+        for i in range(3):
+            futures.append(scheduler.submit(llm, f"explanation {i}", PRIORITY_EXPLANATION))
+            futures.append(scheduler.submit(llm, f"eligibility {i}", PRIORITY_ELIGIBILITY))
+        for future in [blocker] + futures:
+            future.result(timeout=10)
+    finally:
+        scheduler.close()
+
+    queued = order[1:]
+    last_eligibility = max(i for i, prompt in enumerate(queued) if prompt.startswith("eligibility"))
+    # the dispatcher may already hold the first prompt it popped while waiting for the slot; nothing else jumps ahead
+    assert sum(prompt.startswith("explanation") for prompt in queued[:last_eligibility]) <= 1
+
+
+def test_token_bucket_keeps_calls_under_the_provider_quota():
+    llm = FakeChatModel(quota_per_second=10)
+    unthrottled = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=10**12, max_batch_size=1, max_retries=0)
+    try:
+        futures = [unthrottled.submit(llm, f"burst {i}") for i in range(15)]
+        assert sum(future.exception(timeout=10) is not None for future in futures) > 0
+    finally:
+        unthrottled.close()
+
+    llm = FakeChatModel(quota_per_second=10)
+    scheduler = LLMScheduler(requests_per_minute=480, tokens_per_minute=10**12, max_batch_size=1, max_retries=0)
+    scheduler.request_bucket = TokenBucket(480, capacity=1)    # no initial burst: 8 requests per second from the start
+    try:
+        started = time.monotonic()
+        futures = [scheduler.submit(llm, f"paced {i}") for i in range(8)]
+        assert all(future.result(timeout=10).content for future in futures)
+        assert time.monotonic() - started >= 7 / 8 - 0.05
+        assert llm.rate_limited == 0
+    finally:
+        scheduler.close()
+
+
+def test_token_charge_is_settled_against_reported_usage():
+    scheduler = LLMScheduler(requests_per_minute=10**9, tokens_per_minute=60, completion_tokens=40)
+    llm = FakeChatModel(responder=lambda prompt: "a reply of about eight tokens long")
+    try:
+        response = scheduler.invoke(llm, "short prompt")
+        scheduler.token_bucket.settle(0)
+        used = response.usage_metadata["total_tokens"]
+        assert used < estimate_tokens("short prompt") + 40
+        # one token a second refills while the call runs; the bucket holds only the reported usage
+        assert 60 - used <= scheduler.token_bucket.tokens <= 60 - used + 1
+
+        with pytest.raises(FakeRateLimitError):
+            scheduler.max_retries = 0
+            scheduler.invoke(FakeChatModel(rate_limit_every=1), "rejected")
+        scheduler.token_bucket.settle(0)
+        assert scheduler.token_bucket.tokens >= 60 - used
+    finally:
+        scheduler.close()
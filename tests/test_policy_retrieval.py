@@ -0,0 +1,70 @@
+import shutil
+import pytest
+import embedding_service
+import policy_agent
+import registry
+import vectordb
+from conftest import REPO_ROOT
+from local_vectorstore import HashEmbeddings
+
+
+@pytest.fixture
+def local_index(tmp_path, monkeypatch):
+    """A local hash-embedded index over a copy of the policy documents"""
+    docs = tmp_path / "policyDocs"
+    shutil.copytree(f"{REPO_ROOT}/data/policyDocs", docs)
+    monkeypatch.setattr(vectordb, "VECTOR_BACKEND", "local")
+    monkeypatch.setattr(vectordb, "EMBEDDING_BACKEND", "hash")
+    monkeypatch.setattr(vectordb, "LOCAL_INDEX_DIR", str(tmp_path / "index"))
+    monkeypatch.setattr(vectordb, "INGESTION_MANIFEST_DIR", str(tmp_path / "ingestion"))
+    monkeypatch.setattr(vectordb, "_local_indexes", {})
+    monkeypatch.setattr(vectordb, "_index_versions", {})
+    monkeypatch.setattr(policy_agent, "_context_version", 0)
+    monkeypatch.setattr(embedding_service, "_embedding_services",
+                        {"hash": embedding_service.EmbeddingService(HashEmbeddings(), "hash-384", cache_path="")})
+    vectordb.sync_vectorstore(path=str(docs) + "/")
+    policy_agent.clear_context_cache()
+    yield docs
+    policy_agent.clear_context_cache()
+
+
+def test_plan_filter_returns_the_best_chunks_of_that_plan_only(local_index):
+    query = "prior authorization for MRI"
+    everything = vectordb.get_local_index().similarity_search_with_score(query, k=1000)
+    plans = {doc.metadata["plan_id"] for doc, _ in everything}
+    assert plans == {"MedicareA", "MedicareB", "MedicareC"}
+
+    for plan_id in sorted(plans):
+        expected = [doc.page_content for doc, _ in everything if doc.metadata["plan_id"] == plan_id][:2]
+        docs = vectordb.query_vectorstore(query, k=2, plan_id=plan_id)
+        assert [doc.page_content for doc in docs] == expected
+        assert {doc.metadata["plan_id"] for doc in docs} == {plan_id}
+    assert vectordb.query_vectorstore(query, k=2, plan_id="NoSuchPlan") == []
+
+
+def test_policy_context_cache_is_dropped_after_a_sync_changes_the_index(local_index, monkeypatch):
+    searches = []
+
+    def counting_query(query, k=3, plan_id=None):
+        searches.append(plan_id)
+        return vectordb.query_vectorstore(query, k=k, plan_id=plan_id)
+    monkeypatch.setattr(policy_agent, "query_vectorstore", counting_query)
+    registry.override(policy_agent.VECTORSTORE_SERVICE, {})
+    try:
+        first = policy_agent.retrieve_policy_context("MedicareA", "CPT_93000")
+        assert policy_agent.retrieve_policy_context("MedicareA", "CPT_93000") is first
+        assert searches == ["MedicareA"]
+
+        # a sync that changes nothing keeps the cached context
+        assert vectordb.sync_vectorstore(path=str(local_index) + "/")["upserted"] == 0
+        assert policy_agent.retrieve_policy_context("MedicareA", "CPT_93000") is first
+
+        with open(local_index / "MedicareA_policy.txt", "a", encoding="utf-8") as f:
+            f.write("\n\nCardiac monitoring (CPT 93000 follow-up):\n- Covered after an abnormal EKG\n")
+        assert vectordb.sync_vectorstore(path=str(local_index) + "/")["upserted"] > 0
+        refreshed = policy_agent.retrieve_policy_context("MedicareA", "CPT_93000")
+        assert searches == ["MedicareA", "MedicareA"]
+        assert any("Cardiac monitoring" in doc.page_content for doc in refreshed)
+        assert all(key[0] == vectordb.get_index_version() for key in policy_agent._context_cache)
+    finally:
+        registry.reset(policy_agent.VECTORSTORE_SERVICE)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from claim_store import get_claim_store
+from data_loader import apply_schema
+from validation_agent import validate_claims, validate_claims_batch
+
+GOOD = {"procedure_code": "CPT_99213", "diagnosis_code": "ICD10_I10", "claim_amount": "150", "date": "08/15/25",
+        "provider": "Dr 1", "status": "Pending"}
+
+# (changes to a valid claim) -> every kind of messy input the CSV can hold
+MESSY = [
+    {},
+    {"diagnosis_code": np.nan},
+    {"diagnosis_code": np.nan, "provider": "   "},
+    {"procedure_code": " "},
+    {"procedure_code": "XYZ_00000"},
+    {"procedure_code": "cpt_99213"},
+    {"diagnosis_code": "BAD_CODE"},
+    {"procedure_code": "XYZ_1", "diagnosis_code": "BAD"},
+    {"claim_amount": "0"},
+    {"claim_amount": "-12.5"},
+    {"claim_amount": "abc"},
+    {"claim_amount": "  "},
+    {"date": "2025-13-45"},
+    {"date": "8/15/25"},
+    {"date": "2025-02-30", "diagnosis_code": np.nan},
+    {"date": "  "},
+    {"date": np.nan, "claim_amount": "0"},
+    {"patient_id": "P9999999"},
+    {"patient_id": "P9999999", "claim_amount": "0"},
+    {"patient_id": np.nan},
+    {"procedure_code": "XYZ_00000", "date": "not a date"},
+]
+
+
+def _messy_frame():
+    store = get_claim_store()
+    patient_id = store.patients_df["patient_id"].iloc[0]
+    rows = [{"claim_id": f"PARITY{i:03d}", "patient_id": patient_id, **GOOD, **changes}
+            for i, changes in enumerate(MESSY)]
+    frame = pd.DataFrame(rows, dtype=object)
+    # a repeated claim_id (first row wins in both paths) and repeated index labels
+    frame = pd.concat([frame, frame.iloc[[4]].assign(procedure_code="CPT_99213")])
+    frame.index = [i // 2 for i in range(len(frame))]
+    return apply_schema("claims", frame)
+
+
+def test_batch_validation_matches_scalar_validation():
+    store = get_claim_store()
+    frame = _messy_frame()
+    claim_ids = store.add_claims(frame)
+    try:
+        expected = {claim_id: validate_claims(claim_id) for claim_id in claim_ids}
+        assert validate_claims_batch(frame) == expected
+        assert validate_claims_batch(frame["claim_id"].tolist()) == expected
+    finally:
+        store.remove_claims(claim_ids)
+
+    errors = [result["error"] for result in expected.values()]
+    assert errors[0] is None
+    assert "Invalid date: 2025-13-45" in errors
+    assert sum(error is None for error in errors) == 2    # the untouched claim and 8/15/25
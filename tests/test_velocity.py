@@ -0,0 +1,67 @@
+import json
+import os
+import sys
+import pandas as pd
+import pytest
+from conftest import REPO_ROOT
+from data_loader import apply_schema, csv_dtypes
+from velocity import VelocityIndex, VelocityRule, load_velocity_rules
+
+RULES = [
+    VelocityRule("provider_procedure_7d", ("provider", "procedure_code"), 7, 2,
+                 "Provider {provider} billed {procedure_code} {count} times in {window_days} days"),
+    VelocityRule("patient_30d", ("patient_id",), 30, 1, "Patient {patient_id} has {count} claims"),
+]
+
+
+def _claims(tmp_path):
+    sys.path.insert(0, os.path.join(REPO_ROOT, "benchmarks"))
+    import synthetic_data
+    dataset = synthetic_data.generate(str(tmp_path), claims=4000, patients=300, providers=5, seed=3)
+    frame = pd.read_csv(dataset["paths"]["claims"], dtype=csv_dtypes("claims"))
+    return apply_schema("claims", frame)
+
+
+def test_violations_batch_matches_scalar_violations(tmp_path):
+    claims = _claims(tmp_path)
+    index = VelocityIndex(claims.iloc[:3000], rules=RULES)
+    batch = claims.iloc[2500:]    # half already indexed, half not
+
+    counted = batch.index < 3000
+    found = index.violations_batch(batch, counted)
+    assert found
+    for claim, was_counted in zip(batch.to_dict("records"), counted):
+        assert found.get(claim["claim_id"], []) == index.violations(claim, was_counted)
+
+
+def test_claims_added_one_by_one_count_like_one_batch(tmp_path):
+    claims = _claims(tmp_path).iloc[:1500]
+    batch = VelocityIndex(claims, rules=RULES)
+    incremental = VelocityIndex(rules=RULES)
+    for claim in claims.to_dict("records"):
+        incremental.add_claim(claim)
+    pd.testing.assert_frame_equal(incremental.window_counts(claims), batch.window_counts(claims))
+
+
+def test_prune_forgets_claims_before_the_horizon(tmp_path):
+    claims = _claims(tmp_path)
+    index = VelocityIndex(claims, rules=RULES)
+    horizon = pd.Timestamp("2025-07-01")
+    index.prune(horizon)
+
+    recent = claims[claims["date"] >= horizon]
+    expected = VelocityIndex(recent, rules=RULES).window_counts(recent)
+    pd.testing.assert_frame_equal(index.window_counts(recent), expected)
+
+
+def test_rules_file_with_unknown_placeholder_is_rejected(tmp_path):
+    path = tmp_path / "rules.json"
+    rule = {"name": "r", "keys": ["provider"], "window_days": 7, "max_claims": 3,
+            "message": "Provider {provider} billed {count} times ({npi})"}
+    path.write_text(json.dumps([rule]))
+    with pytest.raises(ValueError, match="npi"):
+        load_velocity_rules(str(path))
+
+    rule["message"] = "Provider {provider} billed {count:>3} times in {window_days} days"
+    path.write_text(json.dumps([rule]))
+    assert load_velocity_rules(str(path))[0].message == rule["message"]
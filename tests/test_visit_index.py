@@ -0,0 +1,38 @@
+import shutil
+import data_loader
+import visit_index
+from visit_index import VisitIndex
+
+CLAIM = {"claim_id": "V1", "patient_id": "P1", "procedure_code": "CPT_99213", "date": "08/15/25"}
+
+
+def test_recorded_approvals_survive_a_new_index(tmp_path):
+    ledger = str(tmp_path / "visits.sqlite")
+    assert VisitIndex(ledger_path=ledger).record(CLAIM)
+
+    restarted = VisitIndex(ledger_path=ledger)
+    assert restarted.visits("P1", "CPT_99213", 2025) == 1
+    assert not restarted.record(CLAIM)
+    assert restarted.visits_for_claim({**CLAIM, "claim_id": "V2"}) == 1
+
+
+def test_reloading_another_table_keeps_the_index(tmp_path, monkeypatch):
+    for name, path in data_loader.DATA_FILES.items():
+        shutil.copy(path, tmp_path / f"{name}.csv")
+        monkeypatch.setitem(data_loader.DATA_FILES, name, str(tmp_path / f"{name}.csv"))
+    monkeypatch.setattr(data_loader, "COLUMNAR_DIR", "")
+    monkeypatch.setattr(visit_index, "VISIT_LEDGER_PATH", "")
+    monkeypatch.setattr(visit_index, "_visit_index", None)
+    try:
+        data_loader.reload_data()
+        index = visit_index.get_visit_index()
+        index.record(CLAIM)
+
+        with open(tmp_path / "patients.csv", "a", encoding="utf-8") as f:
+            f.write("\nP9999998,New Patient,40,F,MedicareA,0,0,none,TX\n")
+        assert data_loader.refresh_data() == ["patients"]
+        assert visit_index.get_visit_index() is index
+        assert index.visits("P1", "CPT_99213", 2025) == 1
+    finally:
+        monkeypatch.undo()
+        data_loader.reload_data()
@@ -4,32 +4,50 @@ This file we are performing the initial validations for the claims.
 once the inital validation will pass next step is to check the eligibility
 """
 import pandas as pd
+import numpy as np
 from datetime import datetime
-from data_loader import load_data
+from claim_store import get_claim_store
+from data_loader import unparsed_column
 
+REQUIRED_FIELDS = [
+    "claim_id", "patient_id", "procedure_code", "diagnosis_code",
+    "claim_amount", "date", "provider"
+]
+PROCEDURE_CODE_PREFIXES = ("CPT_", "HCPCS_")
+DIAGNOSIS_CODE_PREFIX = "ICD10_"
+DATE_FIELD = "date"
 
 
 """Check validate the mandatory fileds in the claims.csv if any filed is missing in the csv file """
+def _is_empty(value):
+    return pd.isna(value) or str(value).strip() == ""
+
+
 def validate_mandatory_fields(claim):
-    """Check if all required fields are present and not empty"""
-    required_fields = [
-        "claim_id", "patient_id", "procedure_code", "diagnosis_code",
-        "claim_amount", "date", "provider"
-    ]
+    """Check if all required fields are present and not empty (a malformed date is present, see validate_date)"""
     missing_or_empty = [
-        f for f in required_fields
-        if pd.isna(claim.get(f)) or str(claim.get(f)).strip() == ""
+        f for f in REQUIRED_FIELDS
+        if _is_empty(claim.get(f)) and _is_empty(claim.get(unparsed_column(f)))
     ]
     if missing_or_empty:
         return False, f"Missing or empty mandatory fields: {', '.join(missing_or_empty)}"
     return True, None
 
+"""Check if the claim date could be parsed; data_loader keeps the raw text of a malformed date"""
+
+def validate_date(claim):
+    """Check that the date is a real calendar date"""
+    raw = claim.get(unparsed_column(DATE_FIELD))
+    if not _is_empty(raw):
+        return False, f"Invalid date: {raw}"
+    return True, None
+
 """Check if the patient_id in the claims.csv exists in the patients.csv file"""
 
-def validate_patient_id(claim, patients_df):
+def validate_patient_id(claim, claim_store):
     """Check if patient ID exists in the patient records"""
     patient_id = claim["patient_id"]
-    if not (patients_df["patient_id"] == patient_id).any():
+    if not claim_store.has_patient(patient_id):
         return False, f"Patient ID {patient_id} not found"
     return True, None
 
@@ -46,40 +64,40 @@ def validate_codes(claim):
     proc = str(claim["procedure_code"])
     diag = str(claim["diagnosis_code"])
 
-    if not (proc.startswith("CPT_") or proc.startswith("HCPCS_")):
+    if not proc.startswith(PROCEDURE_CODE_PREFIXES):
         return False, f"Invalid procedure code: {proc}"
-    if not diag.startswith("ICD10_"):
+    if not diag.startswith(DIAGNOSIS_CODE_PREFIX):
         return False, f"Invalid diagnosis code: {diag}"
     return True, None
 
 def validate_claims(claim_id):
     """Run all validation checks on claims"""
-    data_store = load_data()
-    claims_df = data_store["claims"]
-    patients_df = data_store["patients"]
+    claim_store = get_claim_store()
 
     errors = []
 
 
     # Get this specific claim
-    claim_row = claims_df[claims_df["claim_id"] == claim_id]
-    if claim_row.empty:
+    claim_dict = claim_store.get_claim(claim_id)
+    if claim_dict is None:
         return {"valid": False, "error": f"Claim {claim_id} not found"}
 
-    claim_dict = claim_row.iloc[0].to_dict()
-
     # Mandatory checks
     ok, msg = validate_mandatory_fields(claim_dict)
     if not ok:
         return {"valid": False, "error": msg}
 
+    ok, msg = validate_date(claim_dict)
+    if not ok:
+        return {"valid": False, "error": msg}
+
     # Code checks
     ok, msg = validate_codes(claim_dict)
     if not ok:
         return {"valid": False, "error": msg}
 
     # Logical checks
-    ok, msg = validate_patient_id(claim_dict, patients_df)
+    ok, msg = validate_patient_id(claim_dict, claim_store)
     if not ok:
         return {"valid": False, "error": msg}
     
@@ -89,6 +107,72 @@ def validate_claims(claim_id):
 
     return {"valid": True, "error": None}
 
+
+def validate_claims_batch(claims):
+    """
+    Run the same checks as validate_claims on many claims at once, using column-wise masks instead of a
+    per-row Python loop. `claims` is either a list of claim IDs (looked up in the ClaimStore) or a claims
+    DataFrame. Returns {claim_id: {"valid": ..., "error": ...}} with the same messages as the scalar path.
+    When a claim ID appears more than once only its first row is checked; rows without a claim_id are skipped.
+    """
+    claim_store = get_claim_store()
+    results = {}
+
+    if isinstance(claims, pd.DataFrame):
+        frame = claims[claims["claim_id"].notna()].drop_duplicates("claim_id", keep="first")
+    else:
+        claim_ids = list(dict.fromkeys(claims))
+        frame = claim_store.get_claims_frame(claim_ids)
+        for claim_id in claim_ids:
+            if not claim_store.has_claim(claim_id):
+                results[claim_id] = {"valid": False, "error": f"Claim {claim_id} not found"}
+
+    # Columns the rules need; an absent column behaves like an all-empty one, as claim.get() does
+    unparsed = frame.reindex(columns=[unparsed_column(f) for f in REQUIRED_FIELDS])
+    unparsed.columns = REQUIRED_FIELDS
+    frame = frame.reindex(columns=REQUIRED_FIELDS)
+    errors = pd.Series(None, index=frame.index, dtype=object)
+
+    def record(mask, messages):
+        # Only the first failing check is reported for a claim, same as the early returns in validate_claims
+        pending = errors.isna().to_numpy() & np.asarray(mask, dtype=bool)
+        errors[pending] = np.asarray(messages, dtype=object)[pending]
+
+    # Mandatory checks
+    def empty(column):
+        return column.isna() | column.astype(str).str.strip().eq("")
+
+    missing = pd.DataFrame({f: empty(frame[f]) & empty(unparsed[f]) for f in REQUIRED_FIELDS})
+    missing_names = pd.Series("", index=frame.index, dtype=object)
+    for f in REQUIRED_FIELDS:
+        separator = np.where(missing_names.eq(""), "", ", ")
+        missing_names = missing_names.where(~missing[f], missing_names + separator + f)
+    record(missing.any(axis=1), "Missing or empty mandatory fields: " + missing_names)
+    record(~empty(unparsed[DATE_FIELD]), "Invalid date: " + unparsed[DATE_FIELD].astype(str))
+
+    # Code checks
+    proc = frame["procedure_code"].astype(str)
+    diag = frame["diagnosis_code"].astype(str)
+    record(~proc.str.startswith(PROCEDURE_CODE_PREFIXES), "Invalid procedure code: " + proc)
+    record(~diag.str.startswith(DIAGNOSIS_CODE_PREFIX), "Invalid diagnosis code: " + diag)
+
+    # Logical checks (patient lookup is a hash-set membership join against the patients table)
+    known_patient = frame["patient_id"].isin(claim_store.patients_df["patient_id"])
+    record(~known_patient, "Patient ID " + frame["patient_id"].astype(str) + " not found")
+
+    pending = errors.isna()
+    bad_amount = pd.Series(False, index=frame.index)
+    bad_amount[pending] = frame.loc[pending, "claim_amount"] <= 0
+    record(bad_amount, "Invalid claim amount: " + frame["claim_amount"].astype(str))
+
+    for claim_id, error in zip(frame["claim_id"].tolist(), errors.tolist()):
+        error = None if pd.isna(error) else error
+        results[claim_id] = {"valid": error is None, "error": error}
+
+    if isinstance(claims, pd.DataFrame):
+        return results
+    return {claim_id: results[claim_id] for claim_id in claim_ids}
+
 """
 if __name__ == "__main__":
     test_claim_id = "C20003"  # pick one from claims.csv
@@ -2,18 +2,37 @@
 """
 this file will read all the txt files under the path data/policyDocs MedicareA_policy.txt,MedicareB_policy.txt.MedicareC_policy.txt
 we are using Pinecone Vector DB to chunk and load all the polcy docs under one index which is index_name="insurance-policies"
+Set VECTOR_BACKEND=local to use the on-disk index in local_vectorstore instead (no network round-trip), and
+EMBEDDING_BACKEND=hash to use the deterministic local embeddings so everything runs offline.
+Ingestion is incremental: sync_vectorstore() keeps a manifest with a content hash per source file and per chunk,
+embeds and upserts only new or changed chunks, deletes chunks of removed files and does nothing when nothing changed.
+The Pinecone client, document loaders and text splitter are imported where they are used, so importing this module
+is cheap and needs no network.
+Every chunk carries a plan_id metadata field taken from its file name (MedicareA_policy.txt -> MedicareA), and
+query_vectorstore(..., plan_id=...) searches only that plan's chunks (a Pinecone metadata filter, or a row
+partition of the local index).
 """
+import asyncio
+import glob
+import hashlib
+import json
 import os
-from langchain_pinecone import PineconeVectorStore
-from langchain_openai import OpenAIEmbeddings
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
-from pinecone import Pinecone, ServerlessSpec
+from local_vectorstore import LocalVectorIndex
+from embedding_service import get_embedding_service
+from instrumentation import span
 from dotenv import load_dotenv
 load_dotenv()
 
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")        # "pinecone" or "local"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")    # "openai" or "hash"
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".cache/policy_index")
+INGESTION_MANIFEST_DIR = os.getenv("INGESTION_MANIFEST_DIR", ".cache/ingestion")
+POLICY_DOCS_PATH = "data/policyDocs/"
+MANIFEST_VERSION = 2    # 2: chunks are tagged with plan_id, so older indexes are re-ingested
+
 # 1. Initialize Pinecone
 def init_pinecone(index_name="insurance-policies"):
+    from pinecone import Pinecone, ServerlessSpec
     api_key = os.getenv("PINECONE_API_KEY")
     if not api_key:
         raise ValueError("Set the PINECONE_API_KEY environment variable.")
@@ -32,10 +51,8 @@ def init_pinecone(index_name="insurance-policies"):
     return pc, index_name
 
 # 2. Load and split documents
-def load_policy_docs(path="data/policyDocs/"):
-    loader = DirectoryLoader(path, glob="*.txt", loader_cls=TextLoader)
-    docs = loader.load()
-
+def split_policy_docs(docs):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
     splitter = RecursiveCharacterTextSplitter(
         chunk_size=1000,
         chunk_overlap=100,
@@ -43,34 +60,217 @@ def load_policy_docs(path="data/policyDocs/"):
     )
     return splitter.split_documents(docs)
 
-# 3. Create Pinecone vectorstore
-def create_vectorstore(index_name="insurance-policies"):
-    pc, index_name = init_pinecone(index_name)
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
+def load_policy_docs(path=POLICY_DOCS_PATH):
+    from langchain_community.document_loaders import DirectoryLoader, TextLoader
+    loader = DirectoryLoader(path, glob="*.txt", loader_cls=TextLoader)
+    docs = loader.load()
+    return split_policy_docs(docs)
+
+# 3. Embeddings and vector store handles
+def get_embeddings():
+    """Long-lived, cached and batched embedding service for the configured backend (see embedding_service.py)"""
+    return get_embedding_service(EMBEDDING_BACKEND)
+
 
-    docs = load_policy_docs()
-    vectorstore = PineconeVectorStore.from_documents(
-        documents=docs,
-        embedding=embeddings,
-        index_name=index_name
-    )
-    return vectorstore
+_local_indexes = {}
+_pinecone_stores = {}
 
-# 4. Query helper
-def query_vectorstore(query, index_name="insurance-policies", k=3):
-    pc, index_name = init_pinecone(index_name)
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-ada-002")
-    vectorstore = PineconeVectorStore(
-        index_name=index_name,
-        embedding=embeddings
-    )
-    return vectorstore.similarity_search(query, k=k)
+def get_local_index(index_name="insurance-policies"):
+    """The local index is opened (memory-mapped) once per process and reused by every query"""
+    if index_name not in _local_indexes:
+        _local_indexes[index_name] = LocalVectorIndex(os.path.join(LOCAL_INDEX_DIR, index_name), get_embeddings())
+    return _local_indexes[index_name]
+
+def get_vectorstore(index_name="insurance-policies", backend=None):
+    """Handle on the configured vector store (local index or Pinecone) for upserts, deletes and queries"""
+    backend = backend or VECTOR_BACKEND
+    if backend == "local":
+        return get_local_index(index_name)
+
+    # the Pinecone client and index check run once per process, not once per query
+    if index_name not in _pinecone_stores:
+        from langchain_pinecone import PineconeVectorStore
+        pc, index_name = init_pinecone(index_name)
+        _pinecone_stores[index_name] = PineconeVectorStore(index_name=index_name, embedding=get_embeddings())
+    return _pinecone_stores[index_name]
+
+# 4. Incremental ingestion
+# Bumped every time a sync adds or removes chunks; caches of retrieved chunks are keyed on it
+_index_versions = {}
+
+
+def get_index_version(index_name="insurance-policies"):
+    return _index_versions.get(index_name, 0)
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _manifest_path(index_name, backend):
+    return os.path.join(INGESTION_MANIFEST_DIR, f"{backend}-{index_name}.json")
+
+
+def _load_manifest(path):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def _save_manifest(path, manifest):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def plan_id_for(source):
+    """Plan a policy file belongs to, from its file name: data/policyDocs/MedicareA_policy.txt -> MedicareA"""
+    name = os.path.splitext(os.path.basename(source))[0]
+    return name[:-len("_policy")] if name.endswith("_policy") else name
+
+
+def _chunk_file(source):
+    """Split one policy file, tag every chunk with its plan and give it a stable id from its source and content hash"""
+    from langchain_community.document_loaders import TextLoader
+    chunks = split_policy_docs(TextLoader(source).load())
+    plan_id = plan_id_for(source)
+    ids, seen = [], {}
+    for chunk in chunks:
+        chunk.metadata["plan_id"] = plan_id
+        chunk_hash = _sha256(f"{source}\n{chunk.page_content}".encode("utf-8"))
+        # identical chunks within one file still need distinct ids
+        seen[chunk_hash] = seen.get(chunk_hash, 0) + 1
+        ids.append(chunk_hash if seen[chunk_hash] == 1 else f"{chunk_hash}-{seen[chunk_hash]}")
+    return chunks, ids
+
+
+def _delete_all(vectorstore, backend):
+    if backend == "local":
+        vectorstore.delete(ids=list(vectorstore.ids))
+    else:
+        vectorstore.delete(delete_all=True)
+
+
+def sync_vectorstore(index_name="insurance-policies", backend=None, path=POLICY_DOCS_PATH, force=False, purge=False):
+    """
+    Bring the vector store in line with the policy files on disk.
+    Files whose content hash matches the manifest are skipped without being split or embedded; for changed files
+    only chunks with a new hash are embedded and upserted and stale chunks are deleted; chunks of deleted files are
+    removed. When nothing changed a Pinecone index is not even opened; the local index is loaded (memory-mapped) to
+    check that its files still exist. Returns a summary of what was done.
+    When chunks were added or removed, get_index_version(index_name) moves on.
+
+    Only chunks recorded in the manifest are ever deleted. Vectors ingested before the manifest existed (Pinecone
+    upserts through from_documents, with random ids) are unknown to it, so the first sync adds every chunk next to
+    them. purge=True deletes every vector in the index first and re-ingests all files: run it once on such an index
+    (python vectordb.py --purge).
+    """
+    backend = backend or VECTOR_BACKEND
+    manifest_path = _manifest_path(index_name, backend)
+    manifest = _load_manifest(manifest_path)
+    if backend == "local" and not len(get_local_index(index_name)):
+        force = True  # local index files were removed; the manifest no longer describes them
+    summary = {"upserted": 0, "deleted": 0, "unchanged_files": 0, "purged": purge}
+    vectorstore = None
+
+    def store():
+        nonlocal vectorstore
+        if vectorstore is None:
+            vectorstore = get_vectorstore(index_name, backend)
+        return vectorstore
+
+    if purge:
+        _delete_all(store(), backend)
+        manifest = {"version": MANIFEST_VERSION, "files": {}}
+        _save_manifest(manifest_path, manifest)
+        force = True
+
+    sources = sorted(glob.glob(os.path.join(path, "*.txt")))
+    for source in sources:
+        with open(source, "rb") as f:
+            file_hash = _sha256(f.read())
+        previous = manifest["files"].get(source)
+        if not force and previous and previous["sha256"] == file_hash:
+            summary["unchanged_files"] += 1
+            continue
+
+        chunks, ids = _chunk_file(source)
+        previous_ids = set(previous["chunks"]) if previous else set()
+        embedded_ids = set() if force else previous_ids
+        new_chunks = [(chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks) if chunk_id not in embedded_ids]
+        stale_ids = sorted(previous_ids - set(ids))
+
+        if new_chunks:
+            store().add_documents([chunk for _, chunk in new_chunks], ids=[chunk_id for chunk_id, _ in new_chunks])
+        if stale_ids:
+            store().delete(ids=stale_ids)
+        summary["upserted"] += len(new_chunks)
+        summary["deleted"] += len(stale_ids)
+
+        # saved per file, so an interrupted run picks up where it stopped
+        manifest["files"][source] = {"sha256": file_hash, "chunks": ids}
+        _save_manifest(manifest_path, manifest)
+
+    for source in sorted(set(manifest["files"]) - set(sources)):
+        stale_ids = manifest["files"][source]["chunks"]
+        if stale_ids:
+            store().delete(ids=stale_ids)
+        summary["deleted"] += len(stale_ids)
+        del manifest["files"][source]
+        _save_manifest(manifest_path, manifest)
+
+    if purge or summary["upserted"] or summary["deleted"]:
+        _index_versions[index_name] = get_index_version(index_name) + 1
+    return summary
+
+
+def create_vectorstore(index_name="insurance-policies", backend=None):
+    """Re-embed and upsert every chunk regardless of the manifest, then return the vector store"""
+    sync_vectorstore(index_name, backend, force=True)
+    return get_vectorstore(index_name, backend)
+
+# 5. Query helper
+def _plan_filter(plan_id):
+    return {"plan_id": plan_id} if plan_id else None
+
+
+def query_vectorstore(query, index_name="insurance-policies", k=3, backend=None, plan_id=None):
+    """Top-k chunks for the query; with plan_id only that plan's chunks are searched"""
+    backend = backend or VECTOR_BACKEND
+    with span("vector_search", f"{backend}:{index_name}", k=k, plan_id=plan_id) as current:
+        docs = get_vectorstore(index_name, backend).similarity_search(query, k=k, filter=_plan_filter(plan_id))
+        current.set(results=len(docs))
+        return docs
+
+
+async def aquery_vectorstore(query, index_name="insurance-policies", k=3, backend=None, plan_id=None):
+    """
+    Async query: Pinecone is awaited. The local search runs in a worker thread, since embedding the query can be a
+    blocking API call (OpenAI) that must not stall the event loop.
+    """
+    backend = backend or VECTOR_BACKEND
+    if backend == "local":
+        return await asyncio.to_thread(query_vectorstore, query, index_name, k=k, backend=backend, plan_id=plan_id)
+    with span("vector_search", f"{backend}:{index_name}", k=k, plan_id=plan_id) as current:
+        vectorstore = await asyncio.to_thread(get_vectorstore, index_name, backend)
+        docs = await vectorstore.asimilarity_search(query, k=k, filter=_plan_filter(plan_id))
+        current.set(results=len(docs))
+        return docs
 
 
 if __name__ == "__main__":
-    # Run once to ingest all policy docs
-    print("Ingesting documents into Pinecone...")
-    create_vectorstore()
+    import argparse
+    parser = argparse.ArgumentParser(description="Sync the policy docs into the vector store.")
+    parser.add_argument("--purge", action="store_true",
+                        help="delete every vector in the index first (once, for an index ingested before the manifest)")
+    args = parser.parse_args()
+    # Sync the policy docs; only new or changed chunks are embedded
+    print(f"Syncing documents into the {VECTOR_BACKEND} vector store...")
+    print(sync_vectorstore(purge=args.purge))
     print("Done ✅")
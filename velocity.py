@@ -0,0 +1,282 @@
+# src/velocity.py
+import json
+import os
+import string
+import threading
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from data_loader import SCHEMAS
+load_dotenv()
+
+"""
+This module finds claim velocity patterns for the fraud agent: "provider X billed procedure Y more than N times in
+7 days", "patient has more than M claims in 30 days". Every rule groups claims by an entity (one or more claim
+columns) and counts the entity's claims in a trailing window of days ending on the claim date.
+
+For each rule the claim dates are kept in one sorted int64 array of composite keys (entity code in the high bits,
+day number in the low bits), so every entity's dates form a contiguous, date-sorted run. A window count is then
+two binary searches (np.searchsorted), O(log n) for one claim; a whole batch is scored with one vectorized
+searchsorted calls per rule. New keys go to a small sorted side array that is searched alongside the main one
+and folded into it with one sort once it outgrows 1/8 of it, so appending claims one by one or chunk by chunk
+never copies the whole array per claim. prune() drops keys older than a date, so a long-running stream only keeps
+the days its windows can still reach.
+
+The index does not remember claim ids: the caller adds every claim once and says, when it asks for counts, whether
+the claims asked about were already added (counted=True) or must be counted on top of the index.
+
+The rules can be replaced with a JSON file (VELOCITY_RULES_PATH) holding a list of
+{"name", "keys", "window_days", "max_claims", "message"} objects. Keys must be claim columns, and the message may
+only use claim columns plus {count} and {window_days} as placeholders; anything else is rejected when the file is
+loaded.
+"""
+VELOCITY_RULES_PATH = os.getenv("VELOCITY_RULES_PATH", "")
+
+VelocityRule = namedtuple("VelocityRule", ["name", "keys", "window_days", "max_claims", "message"])
+
+DEFAULT_VELOCITY_RULES = [
+    VelocityRule(
+        "provider_procedure_7d", ("provider", "procedure_code"), 7, 10,
+        "Provider {provider} billed {procedure_code} {count} times in {window_days} days",
+    ),
+    VelocityRule(
+        "patient_30d", ("patient_id",), 30, 6,
+        "Patient {patient_id} has {count} claims across providers in {window_days} days",
+    ),
+]
+
+_DAY_BITS = 32
+_DAY_OFFSET = 1 << 31    # day numbers before 1970 are negative
+_MERGE_MIN = 1 << 14
+_EPOCH = pd.Timestamp(0)
+
+
+def _check_rule(rule):
+    """Raise ValueError for a key or message placeholder that is not a claim column, count or window_days"""
+    columns = set(SCHEMAS["claims"])
+    unknown = [key for key in rule.keys if key not in columns]
+    if unknown:
+        raise ValueError(f"Velocity rule {rule.name!r}: keys {unknown} are not claim columns")
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(rule.message) if field is not None]
+    except ValueError as e:
+        raise ValueError(f"Velocity rule {rule.name!r}: malformed message ({e})") from None
+    # "{provider!r}" and "{count:>3}" are fine; "{provider.name}" or "{0}" are not
+    unknown = [field for field in fields if field not in columns | {"count", "window_days"}]
+    if unknown:
+        raise ValueError(f"Velocity rule {rule.name!r}: message placeholders {unknown} are not claim columns, "
+                         "count or window_days")
+    return rule
+
+
+def load_velocity_rules(path=VELOCITY_RULES_PATH):
+    """Rules from a JSON file, or DEFAULT_VELOCITY_RULES when no path is configured"""
+    if not path:
+        return list(DEFAULT_VELOCITY_RULES)
+    with open(path, encoding="utf-8") as f:
+        return [
+            _check_rule(VelocityRule(
+                r["name"], tuple(r["keys"]), int(r["window_days"]), int(r["max_claims"]), r["message"]
+            ))
+            for r in json.load(f)
+        ]
+
+
+def velocity_columns(rules):
+    """Claim columns the rules group on (besides claim_id and date)"""
+    return list(dict.fromkeys(column for rule in rules for column in rule.keys))
+
+
+def _day_numbers(dates):
+    """Days since 1970-01-01 as int64, and a mask of the dates that could be parsed"""
+    dates = pd.to_datetime(pd.Series(dates), errors="coerce", format="mixed")
+    valid = dates.notna().to_numpy()
+    days = np.zeros(len(dates), dtype=np.int64)
+    days[valid] = dates[valid].to_numpy().astype("datetime64[D]").astype(np.int64)
+    return days, valid
+
+
+def _key_days(keys):
+    return (keys & ((1 << _DAY_BITS) - 1)) - _DAY_OFFSET
+
+
+def _day_number(value):
+    """Day number of one date, or None; a parsed Timestamp skips the pandas parser"""
+    if isinstance(value, pd.Timestamp) and value.tzinfo is None:
+        return (value - _EPOCH).days
+    days, dated = _day_numbers([value])
+    return int(days[0]) if dated[0] else None
+
+
+class _RuleIndex:
+    """Sorted composite (entity, day) keys for one rule, plus the keys added since the last merge"""
+
+    def __init__(self, rule):
+        self.rule = rule
+        self._codes = {}
+        self._keys = np.empty(0, dtype=np.int64)
+        self._recent = np.empty(0, dtype=np.int64)
+        self._pending = []
+
+    def entity_codes(self, entities, create):
+        """Integer code per row of an entity frame (-1 for an unknown entity when create is False)"""
+        uniques = entities.drop_duplicates()
+        codes = []
+        for entity in uniques.itertuples(index=False, name=None):
+            code = self._codes.get(entity)
+            if code is None and create:
+                code = self._codes[entity] = len(self._codes)
+            codes.append(-1 if code is None else code)
+        positions = pd.MultiIndex.from_frame(uniques).get_indexer(pd.MultiIndex.from_frame(entities))
+        return np.asarray(codes, dtype=np.int64)[positions]
+
+    def add(self, composite):
+        """Buffer new composite keys; they are merged on the next lookup"""
+        self._pending.append(composite)
+
+    def _merge(self):
+        """
+        Fold the buffered keys into a small sorted side array, and that into the main array once it outgrows
+        1/8 of it: one claim at a time costs O(side array), not a copy of every key, and a chunk costs one sort.
+        """
+        if self._pending:
+            new = np.sort(np.concatenate(self._pending))
+            self._recent = np.insert(self._recent, np.searchsorted(self._recent, new), new)
+            self._pending = []
+        if len(self._recent) > max(_MERGE_MIN, len(self._keys) // 8):
+            self._keys = np.sort(np.concatenate([self._keys, self._recent]))
+            self._recent = np.empty(0, dtype=np.int64)
+
+    def prune(self, before_day):
+        """Drop the keys dated before before_day"""
+        self._merge()
+        self._keys, self._recent = (keys[_key_days(keys) >= before_day] for keys in (self._keys, self._recent))
+
+    def window_counts(self, codes, days):
+        """Indexed claims of each entity dated in (day - window_days, day]"""
+        self._merge()
+        upper = (codes << _DAY_BITS) + (days + _DAY_OFFSET)
+        lower = upper - (self.rule.window_days - 1)
+        return sum(
+            np.searchsorted(keys, upper, side="right") - np.searchsorted(keys, lower, side="left")
+            for keys in (self._keys, self._recent)
+        )
+
+
+class VelocityIndex:
+    """Sliding-window claim counts per rule entity, updated as claims are appended"""
+
+    def __init__(self, claims_df=None, rules=None):
+        self.rules = load_velocity_rules() if rules is None else list(rules)
+        self._indexes = [_RuleIndex(rule) for rule in self.rules]
+        self._lock = threading.Lock()
+        if claims_df is not None:
+            self.add_claims(claims_df)
+
+    def _usable(self, frame, rule):
+        return frame[list(rule.keys)].notna().all(axis=1).to_numpy()
+
+    # 1. Appending claims
+    def add_claims(self, claims_df):
+        """
+        Count a batch of claims. The caller adds each claim once (a claim_id repeated inside the batch counts once);
+        rows without a date or entity are skipped.
+        """
+        frame = claims_df.drop_duplicates("claim_id") if "claim_id" in claims_df.columns else claims_df
+        frame = frame.reindex(columns=["date"] + velocity_columns(self.rules))
+        days, dated = _day_numbers(frame["date"])
+        with self._lock:
+            for index in self._indexes:
+                usable = dated & self._usable(frame, index.rule)
+                if not usable.any():
+                    continue
+                codes = index.entity_codes(frame.loc[usable, list(index.rule.keys)], create=True)
+                index.add((codes << _DAY_BITS) + (days[usable] + _DAY_OFFSET))
+
+    def add_claim(self, claim):
+        """Count one claim (dict); the per-claim path skips building a DataFrame"""
+        day = _day_number(claim.get("date"))
+        if day is None:
+            return
+        with self._lock:
+            for index in self._indexes:
+                entity = _entity(claim, index.rule)
+                if entity is None:
+                    continue
+                code = index._codes.setdefault(entity, len(index._codes))
+                index.add(np.array([(code << _DAY_BITS) + day + _DAY_OFFSET], dtype=np.int64))
+
+    def prune(self, before):
+        """Forget the claims dated before `before` (a date); counts for windows that reach back past it shrink"""
+        day = _day_numbers([before])[0][0]
+        with self._lock:
+            for index in self._indexes:
+                index.prune(day)
+
+    # 2. Window counts
+    def window_counts(self, claims_df, counted=True):
+        """
+        One vectorized pass over a batch: a DataFrame (same index as claims_df, one column per rule) with the number
+        of claims of the rule's entity in the window ending on each claim's date. counted says whether the claims
+        were already added (a bool, or one bool per row); a claim that was not is counted on top of the index.
+        Rows without a date or entity get 0.
+        """
+        frame = claims_df.reindex(columns=["date"] + velocity_columns(self.rules))
+        days, dated = _day_numbers(frame["date"])
+        extra = ~np.broadcast_to(np.asarray(counted, dtype=bool), len(frame))
+        counts = pd.DataFrame(index=claims_df.index)
+        with self._lock:
+            for index in self._indexes:
+                usable = dated & self._usable(frame, index.rule)
+                column = np.zeros(len(frame), dtype=np.int64)
+                if usable.any():
+                    codes = index.entity_codes(frame.loc[usable, list(index.rule.keys)], create=False)
+                    known = codes >= 0
+                    found = np.zeros(len(codes), dtype=np.int64)
+                    found[known] = index.window_counts(codes[known], days[usable][known])
+                    column[usable] = found + extra[usable]
+                counts[index.rule.name] = column
+        return counts
+
+    def violations_batch(self, claims_df, counted=True):
+        """{claim_id: [messages]} for the claims of a batch that break at least one rule (first row per claim)"""
+        counts = self.window_counts(claims_df, counted)
+        results = {}
+        for rule in self.rules:
+            over = counts[rule.name].to_numpy() > rule.max_claims
+            for position in np.flatnonzero(over):
+                claim = claims_df.iloc[position].to_dict()
+                messages = results.setdefault(claim["claim_id"], {})
+                messages.setdefault(rule.name, _message(rule, claim, counts[rule.name].iloc[position]))
+        return {claim_id: list(messages.values()) for claim_id, messages in results.items()}
+
+    def violations(self, claim, counted=True):
+        """Messages for every rule one claim (dict) breaks; two binary searches per rule"""
+        day = _day_number(claim.get("date"))
+        if day is None:
+            return []
+        messages = []
+        with self._lock:
+            for index in self._indexes:
+                entity = _entity(claim, index.rule)
+                if entity is None:
+                    continue
+                code = index._codes.get(entity)
+                count = 0 if code is None else int(index.window_counts(np.array([code]), np.array([day]))[0])
+                count += not counted
+                if count > index.rule.max_claims:
+                    messages.append(_message(index.rule, claim, count))
+        return messages
+
+
+def _entity(claim, rule):
+    """The rule's entity tuple for one claim, or None when a part is missing"""
+    entity = tuple(claim.get(column) for column in rule.keys)
+    if any(part is None or pd.isna(part) for part in entity):
+        return None
+    return entity
+
+
+def _message(rule, claim, count):
+    return rule.message.format(**{**claim, "count": int(count), "window_days": rule.window_days})
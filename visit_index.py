@@ -0,0 +1,132 @@
+# src/visit_index.py
+import os
+import sqlite3
+import threading
+import time
+import pandas as pd
+from data_loader import load_table, get_table_version
+from dotenv import load_dotenv
+load_dotenv()
+
+"""
+This module keeps a visit-count index keyed on (patient_id, procedure_code, year) so the eligibility path can
+enforce max_visits_per_year from insurance_rules.csv in O(1) instead of scanning the patient's claim history.
+The index is built once from the approved claims in the claims table and bumped as the workflow approves
+claims. A claim is counted once, at its final decision, so two claims for the same patient and procedure that are
+in flight at the same moment can both pass the limit.
+Every approval the workflow records is also written to a SQLite ledger (VISIT_LEDGER_PATH), and the index is seeded
+from it when it is built, so visit counts survive a restart, a new batch run and a reload of the claims table.
+"""
+VISIT_LEDGER_PATH = os.getenv("VISIT_LEDGER_PATH", ".cache/visit_approvals.sqlite")  # "" keeps approvals in memory
+VISIT_STATUSES = ("Approved",)
+VISIT_COLUMNS = ["claim_id", "patient_id", "procedure_code", "date", "status"]
+
+
+def visit_year(date):
+    """Calendar year of a claim date (datetime or text like 8/15/25), or None when it cannot be parsed"""
+    if date is None or (not isinstance(date, str) and pd.isna(date)):
+        return None
+    if not isinstance(date, pd.Timestamp):
+        date = pd.to_datetime(date, errors="coerce")
+        if pd.isna(date):
+            return None
+    return int(date.year)
+
+
+class VisitIndex:
+    """(patient_id, procedure_code, year) -> number of approved claims, updated incrementally"""
+
+    def __init__(self, claims_df=None, ledger_path=VISIT_LEDGER_PATH):
+        self._counts = {}
+        self._counted = set()
+        self._lock = threading.Lock()
+        if claims_df is not None:
+            self.add_claims(claims_df[claims_df["status"].isin(VISIT_STATUSES)])
+
+        self._db = None
+        if ledger_path:
+            os.makedirs(os.path.dirname(ledger_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(ledger_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS visit_approvals ("
+                "claim_id TEXT PRIMARY KEY, patient_id TEXT, procedure_code TEXT, year INTEGER, approved_at REAL)"
+            )
+            self._db.commit()
+            rows = self._db.execute("SELECT claim_id, patient_id, procedure_code, year FROM visit_approvals")
+            for claim_id, patient_id, procedure_code, year in rows:
+                if claim_id not in self._counted:
+                    self._counted.add(claim_id)
+                    key = (patient_id, procedure_code, year)
+                    self._counts[key] = self._counts.get(key, 0) + 1
+
+    def add_claims(self, claims_df):
+        """Count every claim of a frame of approved claims (column-wise; claims already counted are skipped)"""
+        frame = claims_df[~claims_df["claim_id"].isin(self._counted)].drop_duplicates("claim_id")
+        years = pd.to_datetime(frame["date"], errors="coerce").dt.year
+        keys = pd.DataFrame({
+            "patient_id": frame["patient_id"].astype(object),
+            "procedure_code": frame["procedure_code"].astype(object),
+            "year": years,
+        }).dropna()
+        counts = keys.groupby(["patient_id", "procedure_code", "year"], observed=True).size()
+        with self._lock:
+            for (patient_id, procedure_code, year), count in counts.items():
+                key = (patient_id, procedure_code, int(year))
+                self._counts[key] = self._counts.get(key, 0) + int(count)
+            self._counted.update(frame.loc[keys.index, "claim_id"].tolist())
+
+    def record(self, claim):
+        """
+        Count one newly approved claim and write it to the ledger; returns False if it was already counted or has
+        no usable key
+        """
+        year = visit_year(claim.get("date"))
+        patient_id, procedure_code = claim.get("patient_id"), claim.get("procedure_code")
+        if year is None or patient_id is None or procedure_code is None:
+            return False
+        key = (patient_id, procedure_code, year)
+        with self._lock:
+            if claim.get("claim_id") in self._counted:
+                return False
+            self._counted.add(claim.get("claim_id"))
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO visit_approvals (claim_id, patient_id, procedure_code, year, approved_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (claim.get("claim_id"), str(patient_id), str(procedure_code), year, time.time()),
+                )
+                self._db.commit()
+            return True
+
+    def visits(self, patient_id, procedure_code, year):
+        return self._counts.get((patient_id, procedure_code, year), 0)
+
+    def visits_for_claim(self, claim):
+        """Approved visits for the claim's patient and procedure in the claim's year (not counting the claim itself)"""
+        year = visit_year(claim.get("date"))
+        if year is None:
+            return None
+        count = self.visits(claim.get("patient_id"), claim.get("procedure_code"), year)
+        if claim.get("claim_id") in self._counted:
+            count -= 1
+        return count
+
+
+_visit_index = None
+_visit_index_version = None
+_visit_index_lock = threading.Lock()
+
+
+def get_visit_index():
+    """
+    Return the process-wide visit index, rebuilt only after the claims table has been reloaded (a reload of the
+    patients or rules leaves it alone); a rebuild is seeded from the ledger, so recorded approvals are kept
+    """
+    global _visit_index, _visit_index_version
+    with _visit_index_lock:
+        version = get_table_version("claims")
+        if _visit_index is None or _visit_index_version != version:
+            _visit_index = VisitIndex(load_table("claims", VISIT_COLUMNS))
+            _visit_index_version = version
+        return _visit_index